@@ -16,7 +16,7 @@ import { DataGrid } from '@mui/x-data-grid';
 import AddIcon from '@mui/icons-material/Add';
 import EditIcon from '@mui/icons-material/Edit';
 import DeleteIcon from '@mui/icons-material/Delete';
-import api from '../../services/api';
+import api, { getAllPages } from '../../services/api';
 
 const BookManagement = () => {
   const [books, setBooks] = useState([]);
@@ -32,7 +32,7 @@ const BookManagement = () => {
 
   const fetchBooks = useCallback(async () => {
     try {
-      const response = await api.get('/books/');
+      const response = await getAllPages('/books/');
       setBooks(response.data);
     } catch (error) {
       console.error('Error fetching books:', error);
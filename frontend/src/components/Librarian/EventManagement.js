@@ -20,7 +20,7 @@ import { DatePicker, TimePicker } from '@mui/x-date-pickers';
 import { LocalizationProvider } from '@mui/x-date-pickers/LocalizationProvider';
 import { AdapterDayjs } from '@mui/x-date-pickers/AdapterDayjs';
 import dayjs from 'dayjs';
-import api from '../../services/api';
+import api, { getAllPages } from '../../services/api';
 
 const EventManagement = () => {
   const [events, setEvents] = useState([]);
@@ -36,7 +36,7 @@ const EventManagement = () => {
 
   const fetchEvents = useCallback(async () => {
     try {
-      const response = await api.get('/events/');
+      const response = await getAllPages('/events/');
       setEvents(response.data);
     } catch (error) {
       showSnackbar('Error fetching events', 'error');
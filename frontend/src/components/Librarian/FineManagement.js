@@ -9,7 +9,7 @@ import {
 } from '@mui/material';
 import { DataGrid } from '@mui/x-data-grid';
 import PaymentIcon from '@mui/icons-material/Payment';
-import api from '../../services/api';
+import api, { getAllPages } from '../../services/api';
 
 const FineManagement = () => {
   const [fines, setFines] = useState([]);
@@ -17,7 +17,7 @@ const FineManagement = () => {
 
   const fetchFines = useCallback(async () => {
     try {
-      const response = await api.get('/fines/');
+      const response = await getAllPages('/fines/');
       setFines(response.data);
     } catch (error) {
       showSnackbar('Error fetching fines', 'error');
@@ -23,7 +23,7 @@ import { DatePicker } from '@mui/x-date-pickers/DatePicker';
 import { LocalizationProvider } from '@mui/x-date-pickers/LocalizationProvider';
 import { AdapterDayjs } from '@mui/x-date-pickers/AdapterDayjs';
 import dayjs from 'dayjs';
-import api from '../../services/api';
+import api, { getAllPages } from '../../services/api';
 
 const LoanManagement = () => {
   const [loans, setLoans] = useState([]);
@@ -40,7 +40,7 @@ const LoanManagement = () => {
 
   const fetchLoans = useCallback(async () => {
     try {
-      const response = await api.get('/loans/');
+      const response = await getAllPages('/loans/');
       setLoans(response.data);
     } catch (error) {
       showSnackbar('Error fetching loans', 'error');
@@ -49,7 +49,7 @@ const LoanManagement = () => {
 
   const fetchMembers = useCallback(async () => {
     try {
-      const response = await api.get('/members/');
+      const response = await getAllPages('/members/');
       setMembers(response.data);
     } catch (error) {
       showSnackbar('Error fetching members', 'error');
@@ -58,12 +58,12 @@ const LoanManagement = () => {
 
   const fetchBookCopies = useCallback(async () => {
     try {
-      const response = await api.get('/book-copies/available/');
+      const response = await getAllPages('/book-copies/available/');
       setBookCopies(response.data);
     } catch (error) {
       // Fallback to the original endpoint if the new one doesn't exist
       try {
-        const response = await api.get('/book-copies/');
+        const response = await getAllPages('/book-copies/');
         setBookCopies(response.data.filter(copy => copy.status === 'Available'));
       } catch (error) {
         showSnackbar('Error fetching book copies', 'error');
@@ -16,7 +16,7 @@ import { DataGrid } from '@mui/x-data-grid';
 import AddIcon from '@mui/icons-material/Add';
 import EditIcon from '@mui/icons-material/Edit';
 import DeleteIcon from '@mui/icons-material/Delete';
-import api from '../../services/api';
+import api, { getAllPages } from '../../services/api';
 
 const MemberManagement = () => {
   const [members, setMembers] = useState([]);
@@ -32,7 +32,7 @@ const MemberManagement = () => {
 
   const fetchMembers = useCallback(async () => {
     try {
-      const response = await api.get('/members/');
+      const response = await getAllPages('/members/');
       setMembers(response.data);
     } catch (error) {
       showSnackbar('Error fetching members', 'error');
@@ -7,7 +7,7 @@ import {
   Alert,
 } from '@mui/material';
 import { DataGrid } from '@mui/x-data-grid';
-import api from '../../services/api';
+import { getAllPages } from '../../services/api';
 
 const BookCatalog = () => {
   const [books, setBooks] = useState([]);
@@ -15,7 +15,7 @@ const BookCatalog = () => {
 
   const fetchBooks = useCallback(async () => {
     try {
-      const response = await api.get('/books/');
+      const response = await getAllPages('/books/');
       setBooks(response.data);
     } catch (error) {
       showSnackbar('Error fetching books', 'error');
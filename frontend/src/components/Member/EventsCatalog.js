@@ -8,7 +8,7 @@ import {
 } from '@mui/material';
 import { DataGrid } from '@mui/x-data-grid';
 import EventIcon from '@mui/icons-material/Event';
-import api from '../../services/api';
+import { getAllPages } from '../../services/api';
 
 const EventsCatalog = () => {
   const [events, setEvents] = useState([]);
@@ -18,7 +18,7 @@ const EventsCatalog = () => {
   const fetchEvents = useCallback(async () => {
     try {
       setLoading(true);
-      const response = await api.get('/events/');
+      const response = await getAllPages('/events/');
       setEvents(response.data);
     } catch (error) {
       showSnackbar('Error fetching events', 'error');
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { Box, Typography, Chip, Alert } from '@mui/material';
 import { DataGrid } from '@mui/x-data-grid';
-import api from '../../services/api';
+import { getAllPages } from '../../services/api';
 
 const MyLoans = () => {
   const [loans, setLoans] = useState([]);
@@ -13,7 +13,7 @@ const MyLoans = () => {
       setLoading(true);
       setError(null);
       // Use the new member-loans endpoint
-      const response = await api.get('/member-loans/');
+      const response = await getAllPages('/member-loans/');
       console.log('My loans response:', response.data);
       setLoans(response.data);
     } catch (error) {
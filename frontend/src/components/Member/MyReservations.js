@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Box, Typography, Chip, IconButton } from '@mui/material';
 import { DataGrid } from '@mui/x-data-grid';
 import CancelIcon from '@mui/icons-material/Cancel';
-import api from '../../services/api';
+import api, { getAllPages } from '../../services/api';
 
 const MyReservations = () => {
   const [reservations, setReservations] = useState([]);
@@ -13,7 +13,7 @@ const MyReservations = () => {
 
   const fetchMyReservations = async () => {
     try {
-      const response = await api.get('/reservations/');
+      const response = await getAllPages('/reservations/');
       setReservations(response.data);
     } catch (error) {
       console.error('Error fetching reservations:', error);
@@ -46,6 +46,7 @@ const MyReservations = () => {
     { field: 'book_title', headerName: 'Book Title', width: 250 },
     { field: 'reservation_date', headerName: 'Reservation Date', width: 150 },
     { field: 'exp_return_date', headerName: 'Expected Return', width: 150 },
+    { field: 'hold_expires', headerName: 'Pick Up By', width: 150 },
     {
       field: 'status',
       headerName: 'Status',
@@ -55,4 +55,20 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints return one page at a time and link the next one in the
+// Link header; follow it until the last page and return all rows
+export const getAllPages = async (url) => {
+  const rows = [];
+  let next = url;
+  while (next) {
+    const response = await api.get(next);
+    rows.push(...response.data);
+    const link = (response.headers.link || '')
+      .split(',')
+      .find((part) => part.includes('rel="next"'));
+    next = link ? link.split(';')[0].trim().replace(/^<|>$/g, '') : null;
+  }
+  return { data: rows };
+};
+
 export default api;
\ No newline at end of file
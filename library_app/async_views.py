@@ -0,0 +1,170 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.dummy import DummyCache
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import CachedJWTAuthentication
+from .caching import CACHED_HEADERS, aresponse_keys, get_cache
+from .fastpath import fast_representation, fast_values
+from .instrumentation import serializer_timer
+from .models import Book, Event, Loan
+from .pagination import KeysetPagination, SearchResultPagination
+from .permissions import IsLibrarianOrReadOnly
+from .routers import read_from_replica
+from .search import search_books
+from .serializers import (
+    AccountSummarySerializer, BookSerializer, EventSerializer, LibrarySummarySerializer, LoanSerializer,
+)
+from .summaries import alibrary_summary, amember_summary
+
+authenticator = CachedJWTAuthentication()
+renderer = JSONRenderer()
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(renderer.render(data), status=status, headers=headers, content_type='application/json')
+
+
+def async_api_view(permission_class=IsAuthenticated):
+    """
+    Run an async view as a GET-only API endpoint.
+
+    Under an ASGI server other requests are served while the view awaits
+    its queries. The view receives a DRF request, authenticated with the project's JWT
+    authentication and checked against ``permission_class``. Failures get
+    the same status codes and bodies as DRF views return.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                detail = exceptions.MethodNotAllowed(request.method).detail
+                return json_response({'detail': detail}, status.HTTP_405_METHOD_NOT_ALLOWED, {'Allow': 'GET'})
+
+            request = Request(request)
+            try:
+                authenticated = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.AuthenticationFailed as e:
+                return json_response(
+                    e.detail if isinstance(e.detail, dict) else {'detail': e.detail}, status.HTTP_401_UNAUTHORIZED,
+                    {'WWW-Authenticate': authenticator.authenticate_header(request)},
+                )
+            if authenticated is not None:
+                request.user, request.auth = authenticated
+
+            if not permission_class().has_permission(request, None):
+                if authenticated is None:
+                    return json_response(
+                        {'detail': exceptions.NotAuthenticated.default_detail}, status.HTTP_401_UNAUTHORIZED,
+                        {'WWW-Authenticate': authenticator.authenticate_header(request)},
+                    )
+                return json_response({'detail': exceptions.PermissionDenied.default_detail}, status.HTTP_403_FORBIDDEN)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _paginated(paginator, data):
+    response = paginator.get_paginated_response(data)
+    return response.data, {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+
+
+async def _page(request, queryset, serializer_class):
+    """
+    One keyset page of ``queryset``, serialized, with its pagination headers.
+
+    The page is read as ``.values()`` rows with the async ORM and rendered
+    by the fast list path, so serializing it runs no further queries.
+    """
+    paginator = KeysetPagination()
+    rows = await paginator.apaginate_queryset(fast_values(queryset, serializer_class), request)
+    with serializer_timer():
+        data = fast_representation(rows, serializer_class)
+    return _paginated(paginator, data)
+
+
+async def _cached_page(request, namespace, queryset, serializer_class):
+    """``_page`` through the catalog cache, invalidated along with the DRF views of ``namespace``."""
+    cache = get_cache()
+    if isinstance(cache, DummyCache):
+        data, headers = await _page(request, queryset, serializer_class)
+        return json_response(data, headers=headers)
+
+    key, etag = await aresponse_keys(namespace, request)
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    cached = await cache.aget(key)
+    if cached is None:
+        with read_from_replica(False):
+            cached = await _page(request, queryset, serializer_class)
+        await cache.aset(key, cached)
+    data, headers = cached
+    return json_response(data, headers={**headers, 'ETag': etag})
+
+
+@async_api_view(IsLibrarianOrReadOnly)
+async def book_list(request):
+    """Async GET /api/books/"""
+    return await _cached_page(request, 'books', Book.objects.all(), BookSerializer)
+
+
+@async_api_view(IsLibrarianOrReadOnly)
+async def event_list(request):
+    """Async GET /api/events/"""
+    return await _cached_page(request, 'events', Event.objects.all(), EventSerializer)
+
+
+@async_api_view(IsLibrarianOrReadOnly)
+async def book_search(request):
+    """Async GET /api/books/search/"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return json_response({"error": "Query parameter 'q' is required."}, status.HTTP_400_BAD_REQUEST)
+
+    paginator = SearchResultPagination()
+    hits = await paginator.apaginate_queryset(search_books(query), request)
+    books = {
+        row['bookID']: row
+        async for row in fast_values(Book.objects.filter(pk__in=[hit['book'] for hit in hits]), BookSerializer)
+    }
+    hits = [hit for hit in hits if hit['book'] in books]
+    with serializer_timer():
+        results = fast_representation([books[hit['book']] for hit in hits], BookSerializer)
+    for row, hit in zip(results, hits):
+        row['score'] = hit['score']
+    data, headers = _paginated(paginator, results)
+    return json_response(data, headers=headers)
+
+
+@async_api_view()
+async def my_loans(request):
+    """Async GET /api/loans/my_loans/"""
+    if request.user.role != 'member':
+        return json_response({"error": "Not a member"}, status.HTTP_403_FORBIDDEN)
+    if request.user.member_id is None:
+        return json_response({"error": "User is not properly associated with a member"}, status.HTTP_400_BAD_REQUEST)
+
+    loans = Loan.objects.filter(member_id=request.user.member_id).order_by('-issue_date')
+    data, headers = await _page(request, loans, LoanSerializer)
+    return json_response(data, headers=headers)
+
+
+@async_api_view()
+async def dashboard(request):
+    """Async GET /api/dashboard/"""
+    if request.user.role == 'librarian':
+        return json_response(LibrarySummarySerializer(await alibrary_summary()).data)
+
+    if request.user.role != 'member':
+        return json_response({"error": "Not a member"}, status.HTTP_403_FORBIDDEN)
+
+    summary = await amember_summary(request.user.member_id) if request.user.member_id is not None else None
+    if summary is None:
+        return json_response({"error": "User is not properly associated with a member"}, status.HTTP_400_BAD_REQUEST)
+    return json_response(AccountSummarySerializer(summary).data)
@@ -0,0 +1,106 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class IdentityCache:
+    """
+    Short-lived, per-process cache of authenticated users, keyed by the
+    string form of the user id (simplejwt stores the id claim as a string).
+
+    Entries hold the user with its member/librarian already joined, so a
+    cache hit answers ``request.user.role`` and ``request.user.member``
+    without touching the database. Every caller gets its own copy of the
+    cached instance. Signal handlers drop entries when a user, member or
+    librarian changes; code writing users with ``update()`` or
+    ``bulk_update()``, which send no signals, calls ``invalidate`` itself.
+    The TTL bounds how long other worker processes can serve a stale entry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get_ttl(self):
+        return getattr(settings, 'LIBRARY_IDENTITY_CACHE_TTL', 60)
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+        return copy.deepcopy(user)
+
+    def set(self, user_id, user):
+        ttl = self.get_ttl()
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[str(user_id)] = (time.monotonic() + ttl, copy.deepcopy(user))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def invalidate_linked(self, member_id=None, librarian_id=None):
+        """Drop users linked to a member or librarian that just changed."""
+        with self._lock:
+            for user_id, (expires, user) in list(self._entries.items()):
+                if (member_id is not None and user.member_id == member_id) or \
+                        (librarian_id is not None and user.librarian_id == librarian_id):
+                    del self._entries[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that serves users from the identity cache.
+
+    On a miss the user is loaded together with its member and librarian in
+    one query; afterwards requests with the same token subject make no
+    identity queries at all. The active-user and password-change checks
+    of simplejwt still run against the cached copy.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = identity_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('member', 'librarian').get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            identity_cache.set(user_id, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
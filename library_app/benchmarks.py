@@ -0,0 +1,537 @@
+import asyncio
+import io
+import json
+import math
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.db.models import Exists, OuterRef
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .fastpath import fast_representation, fast_values
+from .models import BookCopy, Member, Reservation
+from .seeding import LIBRARIAN_USERNAME, SEED_PASSWORD, member_username
+from .views import BookCopyViewSet, BookViewSet, FineViewSet, LoanViewSet
+
+# Endpoints whose regressions the baseline comparison is meant to catch
+DEFAULT_SCENARIOS = ('catalog_list', 'catalog_search', 'fines_list', 'loans_list', 'my_loans', 'checkout', 'return')
+
+# Read endpoints with an async version: scenario -> (user, DRF path, async path)
+CONCURRENCY_SCENARIOS = {
+    'catalog_list': ('member', '/api/books/', '/api/async/books/'),
+    'catalog_search': ('member', '/api/books/search/?q=the', '/api/async/books/search/?q=the'),
+    'events': ('member', '/api/events/', '/api/async/events/'),
+    'my_loans': ('member', '/api/loans/my_loans/', '/api/async/my-loans/'),
+    'dashboard': ('librarian', '/api/dashboard/', '/api/async/dashboard/'),
+}
+# WSGI with DRF views, ASGI with the same DRF views, ASGI with the async views
+SERVER_MODES = ('wsgi', 'asgi', 'asgi_async')
+
+# List endpoints with a fast path, compared by SerializerBenchmark
+FAST_LISTS = {'books': BookViewSet, 'copies': BookCopyViewSet, 'loans': LoanViewSet, 'fines': FineViewSet}
+
+# Database connection settings compared by ConnectionModeBenchmark
+CONNECTION_MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistent_checked': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class ScenarioResult:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.queries = []
+
+    def summary(self):
+        total = sum(self.latencies)
+        return {
+            'requests': len(self.latencies),
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 3),
+            'mean_ms': round(total / len(self.latencies) * 1000, 3),
+            'throughput_rps': round(len(self.latencies) / total, 1) if total else None,
+            'queries_avg': round(sum(self.queries) / len(self.queries), 2),
+            'queries_max': max(self.queries),
+        }
+
+
+class BenchmarkRunner:
+    """
+    Drives the real URLconf through the Django test client.
+
+    Requests carry a JWT obtained from ``/api/token/``, so authentication,
+    permissions, pagination and caching run exactly as in production.
+    Expects a database filled by ``seeding.seed_library``. Each scenario
+    issues ``warmup`` unrecorded requests, then ``iterations`` timed ones.
+    """
+
+    def __init__(self, iterations=50, warmup=5):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.librarian = self.login(LIBRARIAN_USERNAME)
+        # The newest member is one seed_library just created
+        self.member_id = (
+            Member.objects.filter(user__isnull=False).order_by('-memberID')
+            .values_list('memberID', flat=True).first()
+        )
+        self.member = self.login(member_username(self.member_id))
+
+    def login(self, username):
+        client = Client()
+        response = client.post('/api/token/', {'username': username, 'password': SEED_PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f'Could not log in as {username}: {response.status_code}')
+        client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {response.json()['access']}"
+        return client
+
+    def request(self, client, method, path, data=None, expected=200):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            if method == 'post':
+                response = client.post(path, data, content_type='application/json')
+            else:
+                response = client.get(path, data)
+            elapsed = time.perf_counter() - start
+        if response.status_code != expected:
+            raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}, expected {expected}')
+        return response, elapsed, len(ctx.captured_queries)
+
+    def run(self, scenarios=DEFAULT_SCENARIOS):
+        results = {}
+        for name in scenarios:
+            scenario = getattr(self, f'scenario_{name}', None)
+            if scenario is None:
+                raise ValueError(f'Unknown scenario: {name}')
+            result = ScenarioResult(name)
+            for i in range(self.warmup + self.iterations):
+                elapsed, queries = scenario()
+                if i >= self.warmup:
+                    result.latencies.append(elapsed)
+                    result.queries.append(queries)
+            results[name] = result.summary()
+        return results
+
+    def get(self, client, path, data=None):
+        _, elapsed, queries = self.request(client, 'get', path, data)
+        return elapsed, queries
+
+    def scenario_catalog_list(self):
+        return self.get(self.member, '/api/books/')
+
+    def scenario_catalog_search(self):
+        return self.get(self.member, '/api/books/search/', {'q': 'the'})
+
+    def scenario_fines_list(self):
+        return self.get(self.librarian, '/api/fines/')
+
+    def scenario_loans_list(self):
+        return self.get(self.librarian, '/api/loans/')
+
+    def scenario_my_loans(self):
+        return self.get(self.member, '/api/loans/my_loans/')
+
+    def checkout(self):
+        # A copy nobody is queueing for, so the return puts it back on the shelf
+        copy_id = (
+            BookCopy.objects.filter(status='Available')
+            .exclude(Exists(Reservation.objects.filter(book=OuterRef('book'), status='Active')))
+            .values_list('copyID', flat=True).first()
+        )
+        due_date = timezone.now().date() + timedelta(days=14)
+        response, elapsed, queries = self.request(
+            self.librarian, 'post', '/api/loans/',
+            {'copy': copy_id, 'member': self.member_id, 'due_date': due_date.isoformat()},
+            expected=201,
+        )
+        return response.json()['loanID'], elapsed, queries
+
+    def give_back(self, loan_id):
+        _, elapsed, queries = self.request(self.librarian, 'post', f'/api/loans/{loan_id}/return_book/')
+        return elapsed, queries
+
+    def scenario_checkout(self):
+        # The copy goes straight back so the member never reaches the loan limit
+        loan_id, elapsed, queries = self.checkout()
+        self.give_back(loan_id)
+        return elapsed, queries
+
+    def scenario_return(self):
+        loan_id, _, _ = self.checkout()
+        return self.give_back(loan_id)
+
+
+@contextmanager
+def simulated_db_latency(seconds):
+    """
+    Make every query on connections opened meanwhile sleep ``seconds`` first.
+
+    Stands in for the network round trip to a database server, which is
+    what a request thread spends most of its time waiting on in
+    production but barely at all against a local SQLite file.
+    """
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # Outermost, so the request's own execute_wrapper() pops stay balanced.
+        # A reconnecting wrapper keeps its list, so install only once.
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, delay)
+
+    connection_created.connect(install, dispatch_uid='benchmark-db-latency')
+    try:
+        yield
+    finally:
+        connection_created.disconnect(dispatch_uid='benchmark-db-latency')
+
+
+class ConcurrencyBenchmark:
+    """
+    Compares a threaded WSGI deployment with an ASGI one under concurrent clients.
+
+    Everything runs in this process. ``concurrency`` clients each send
+    their share of ``requests`` back to back. Under WSGI the requests go
+    through the test client and at most ``threads`` run at once, as with
+    ``gunicorn --threads``. Under ASGI they go straight to Django's ASGI
+    application from one event loop, as under uvicorn. Latencies include
+    the time spent waiting for a free worker thread.
+    """
+
+    def __init__(self, requests=200, threads=4, db_latency_ms=2.0):
+        self.requests = requests
+        self.threads = threads
+        self.db_latency = db_latency_ms / 1000
+        runner = BenchmarkRunner(iterations=0, warmup=0)
+        self.authorization = {
+            'librarian': runner.librarian.defaults['HTTP_AUTHORIZATION'],
+            'member': runner.member.defaults['HTTP_AUTHORIZATION'],
+        }
+
+    def run(self, scenarios=tuple(CONCURRENCY_SCENARIOS), concurrency=(1, 8, 32)):
+        """Results per ``scenario@concurrency`` and server mode."""
+        results = {}
+        with simulated_db_latency(self.db_latency):
+            for name in scenarios:
+                if name not in CONCURRENCY_SCENARIOS:
+                    raise ValueError(f'Unknown scenario: {name}')
+                user, drf_path, async_path = CONCURRENCY_SCENARIOS[name]
+                for clients in concurrency:
+                    results[f'{name}@{clients}'] = {
+                        'wsgi': self.run_wsgi(drf_path, user, clients),
+                        'asgi': asyncio.run(self.run_asgi(drf_path, user, clients)),
+                        'asgi_async': asyncio.run(self.run_asgi(async_path, user, clients)),
+                    }
+        return results
+
+    def summary(self, latencies, elapsed):
+        return {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+        }
+
+    def run_wsgi(self, path, user, clients):
+        workers = threading.BoundedSemaphore(self.threads)
+        latencies, failures = [], []
+
+        def client():
+            http = Client(HTTP_AUTHORIZATION=self.authorization[user])
+            try:
+                for _ in range(max(self.requests // clients, 1)):
+                    start = time.perf_counter()
+                    with workers:
+                        response = http.get(path)
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if failures:
+            raise RuntimeError(f'GET {path} over WSGI returned {failures[0]}')
+        return self.summary(latencies, elapsed)
+
+    async def run_asgi(self, path, user, clients):
+        application = ASGIHandler()
+        latencies = []
+
+        async def client():
+            for _ in range(max(self.requests // clients, 1)):
+                start = time.perf_counter()
+                status = await self.asgi_get(application, path, self.authorization[user])
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    raise RuntimeError(f'GET {path} over ASGI returned {status}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        return self.summary(latencies, time.perf_counter() - start)
+
+    async def asgi_get(self, application, path, authorization):
+        """Send one GET through an ASGI application, as a server would; returns the status code."""
+        url = urlsplit(path)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(), 'root_path': '',
+            'query_string': url.query.encode(), 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'authorization', authorization.encode())],
+        }
+        requested = False
+        finished = asyncio.Event()
+        status = None
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application(scope, receive, send)
+        finished.set()
+        return status
+
+
+@contextmanager
+def simulated_connect_latency(seconds):
+    """
+    Make opening a database connection take ``seconds`` longer.
+
+    Stands in for the TCP, TLS and authentication handshake with a MySQL
+    server, which a local SQLite file does not have.
+    """
+    def delay(sender, connection, **kwargs):
+        time.sleep(seconds)
+
+    connection_created.connect(delay, dispatch_uid='benchmark-connect-latency')
+    try:
+        yield
+    finally:
+        connection_created.disconnect(dispatch_uid='benchmark-connect-latency')
+
+
+class ConnectionModeBenchmark:
+    """
+    Compares per-request latency under the database connection modes.
+
+    Each mode of ``CONNECTION_MODES`` is applied to every database alias,
+    then the read endpoints are requested one after another through
+    Django's WSGI handler, as under a WSGI server. Unlike the test client,
+    the handler closes connections at the end of a request when their
+    ``CONN_MAX_AGE`` says so, so per-request connections really reconnect.
+    """
+
+    def __init__(self, iterations=100, warmup=5, connect_latency_ms=3.0, db_latency_ms=0.5):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise ValueError('An in-memory SQLite database is never closed; use a database server or a SQLite file')
+        self.iterations = iterations
+        self.warmup = warmup
+        self.connect_latency = connect_latency_ms / 1000
+        self.db_latency = db_latency_ms / 1000
+        runner = BenchmarkRunner(iterations=0, warmup=0)
+        self.authorization = {
+            'librarian': runner.librarian.defaults['HTTP_AUTHORIZATION'],
+            'member': runner.member.defaults['HTTP_AUTHORIZATION'],
+        }
+        self.opened = 0
+
+    def run(self, scenarios=('catalog_search', 'my_loans', 'dashboard'), modes=tuple(CONNECTION_MODES)):
+        """Results per scenario and connection mode."""
+        for name in scenarios:
+            if name not in CONCURRENCY_SCENARIOS:
+                raise ValueError(f'Unknown scenario: {name}')
+        for mode in modes:
+            if mode not in CONNECTION_MODES:
+                raise ValueError(f'Unknown connection mode: {mode}')
+
+        handler = WSGIHandler()
+        saved = {alias: {key: database[key] for key in CONNECTION_MODES['per_request']}
+                 for alias, database in connections.settings.items()}
+        results = {name: {} for name in scenarios}
+        connection_created.connect(self.count, dispatch_uid='benchmark-connections-opened')
+        try:
+            with simulated_connect_latency(self.connect_latency), simulated_db_latency(self.db_latency):
+                for mode in modes:
+                    self.use(CONNECTION_MODES[mode])
+                    for name in scenarios:
+                        user, path, _ = CONCURRENCY_SCENARIOS[name]
+                        results[name][mode] = self.measure(handler, path, self.authorization[user])
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark-connections-opened')
+            for alias, values in saved.items():
+                connections.settings[alias].update(values)
+            connections.close_all()
+        return results
+
+    def count(self, sender, connection, **kwargs):
+        self.opened += 1
+
+    def use(self, values):
+        # The wrappers share these dicts; reconnect so the new CONN_MAX_AGE applies
+        for database in connections.settings.values():
+            database.update(values)
+        connections.close_all()
+
+    def measure(self, handler, path, authorization):
+        latencies = []
+        opened = 0
+        for i in range(self.warmup + self.iterations):
+            before = self.opened
+            start = time.perf_counter()
+            status = self.wsgi_get(handler, path, authorization)
+            elapsed = time.perf_counter() - start
+            if status != 200:
+                raise RuntimeError(f'GET {path} returned {status}')
+            if i >= self.warmup:
+                latencies.append(elapsed)
+                opened += self.opened - before
+        return {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'connects_per_request': round(opened / len(latencies), 2),
+        }
+
+    def wsgi_get(self, handler, path, authorization):
+        """Send one GET through a WSGI application, as a server would; returns the status code."""
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': authorization,
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        status = None
+
+        def start_response(line, headers, exc_info=None):
+            nonlocal status
+            status = int(line.split(' ', 1)[0])
+
+        response = handler(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            # Sends request_finished, which closes connections past their CONN_MAX_AGE
+            response.close()
+        return status
+
+
+class SerializerBenchmark:
+    """
+    Compares the DRF serializers of the list endpoints with their fast path.
+
+    Both render the same first ``rows`` rows of each list, query included,
+    ``repeat`` times; the best run counts. The outputs are checked to be
+    identical first.
+    """
+
+    def __init__(self, rows=5000, repeat=3):
+        self.rows = rows
+        self.repeat = repeat
+
+    def run(self, lists=tuple(FAST_LISTS)):
+        """Rows per second of each list, through the serializer and through the fast path."""
+        results = {}
+        for name in lists:
+            viewset = FAST_LISTS.get(name)
+            if viewset is None:
+                raise ValueError(f'Unknown list: {name}')
+            serializer_class = viewset.serializer_class
+            queryset = viewset().get_queryset().order_by('pk')
+
+            def serialized():
+                return serializer_class(queryset[:self.rows], many=True).data
+
+            def fast():
+                return fast_representation(
+                    fast_values(queryset, serializer_class)[:self.rows], serializer_class
+                )
+
+            rendered = fast()
+            if rendered != serialized():
+                raise RuntimeError(f'The fast path of {name} does not match its serializer')
+            serializer_time, fast_time = self.best(serialized), self.best(fast)
+            results[name] = {
+                'rows': len(rendered),
+                'serializer_rows_per_s': round(len(rendered) / serializer_time),
+                'fast_rows_per_s': round(len(rendered) / fast_time),
+                'speedup': round(serializer_time / fast_time, 1),
+            }
+        return results
+
+    def best(self, render):
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+
+def compare(results, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """
+    List the scenarios that got worse than ``baseline``.
+
+    A scenario regresses when its p95 grows by more than ``tolerance``
+    (and by at least ``min_delta_ms``, to ignore jitter on fast
+    endpoints) or when it issues more queries per request than before.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        p95_delta = current['p95_ms'] - before['p95_ms']
+        if p95_delta > before['p95_ms'] * tolerance and p95_delta >= min_delta_ms:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['queries_avg'] > before['queries_avg']:
+            regressions.append(f"{name}: queries/request {before['queries_avg']} -> {current['queries_avg']}")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def save_results(path, results, settings):
+    with open(path, 'w') as f:
+        json.dump({'settings': settings, 'results': results}, f, indent=2, sort_keys=True)
@@ -0,0 +1,127 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .routers import read_from_replica
+
+CACHE_ALIAS = 'catalog'
+CACHED_HEADERS = ('Link', 'X-Total-Count')
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_version(namespace):
+    """
+    Current version of a namespace.
+
+    A missing version (first use, or evicted) starts from the clock rather
+    than 1, so it can never match a version that older entries were
+    stored under.
+    """
+    cache = get_cache()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), int(time.time() * 1000), timeout=None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+async def aget_version(namespace):
+    """Async get_version."""
+    cache = get_cache()
+    version = await cache.aget(_version_key(namespace))
+    if version is None:
+        await cache.aadd(_version_key(namespace), int(time.time() * 1000), timeout=None)
+        version = await cache.aget(_version_key(namespace))
+    return version
+
+
+def bump_version(*namespaces):
+    """Invalidate every cached response of the given namespaces."""
+    cache = get_cache()
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            get_version(namespace)
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Bump the namespaces once the current transaction commits.
+
+    Bumping earlier would let a concurrent reader cache pre-commit rows
+    under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(*namespaces))
+
+
+def response_keys(namespace, request):
+    """Cache key and ETag of the response to ``request`` under the namespace's current version."""
+    return _keys(namespace, get_version(namespace), request)
+
+
+async def aresponse_keys(namespace, request):
+    """Async response_keys."""
+    return _keys(namespace, await aget_version(namespace), request)
+
+
+def _keys(namespace, version, request):
+    url_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{namespace}:{version}:{url_hash}', f'"{namespace}-{version}-{url_hash}"'
+
+
+class CachedCatalogMixin:
+    """
+    Caches list/retrieve responses of read-mostly ViewSets.
+
+    Responses are stored in the ``catalog`` cache (see ``CACHE_URL`` in
+    settings; the dummy backend turns caching off) under a key that includes the
+    namespace version, so one version bump invalidates them all. Each
+    response carries an ETag derived from the version and URL; a matching
+    If-None-Match is answered with 304 before the database is touched.
+    Responses must not depend on who is asking.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if isinstance(get_cache(), DummyCache):
+            # Caching is off: there is no version to build keys and ETags from
+            return handler(request, *args, **kwargs)
+
+        key, etag = response_keys(self.cache_namespace, request)
+
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            response = Response(data, headers=headers)
+        else:
+            # A lagging replica would get stale rows cached under the new version
+            with read_from_replica(False):
+                response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                cache.set(key, (response.data, headers))
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,157 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .caching import invalidate_on_commit
+from .fines import settle_fines
+from .inventory import adjust_availability
+from .models import BookCopy, Loan, Member, Reservation
+from .reservations import hold_or_shelve
+
+# Most copies one bulk request may handle
+MAX_BULK_ITEMS = 100
+LOAN_DAYS = 14
+
+NOT_AVAILABLE = "This book copy is not available for loan."
+
+
+def _failed(result, error):
+    return {**result, 'status': 'failed', 'error': error}
+
+
+def bulk_checkout(items, librarian_id, due_date=None):
+    """
+    Lend many copies at once; ``items`` is a list of ``{'copy': id, 'member': id}``.
+
+    Runs the same checks as a single checkout, but each kind of lookup is
+    one query for the whole batch. The copies are locked together, and
+    loan limits come from one grouped count. Accepted items are written
+    with batched UPDATEs and one bulk INSERT of loans. Items that fail a
+    check are reported and skipped, and the rest go through. Must run
+    inside a transaction. Returns one result per item, in order.
+    """
+    today = timezone.now().date()
+    due_date = due_date or today + timedelta(days=LOAN_DAYS)
+
+    copies = BookCopy.objects.select_for_update().in_bulk({item['copy'] for item in items})
+    members = set(Member.objects.filter(memberID__in={item['member'] for item in items}).values_list('memberID', flat=True))
+    active = dict(
+        Loan.objects.filter(member__in=members, loan_status__in=Loan.ACTIVE_STATUSES)
+        .order_by().values('member').annotate(count=Count('loanID')).values_list('member', 'count')
+    )
+    holders = dict(
+        Reservation.objects.filter(copy__in=[c for c in copies.values() if c.status == 'Reserved'], status='Active')
+        .values_list('copy', 'member')
+    )
+
+    results, seen, shelved, held, loans = [], set(), [], [], []
+    for item in items:
+        copy_id, member_id = item['copy'], item['member']
+        result = {'copy': copy_id, 'member': member_id}
+        copy = copies.get(copy_id)
+        if copy_id in seen:
+            results.append(_failed(result, "Copy is listed more than once."))
+        elif copy is None:
+            results.append(_failed(result, "Copy not found."))
+        elif member_id not in members:
+            results.append(_failed(result, "Member not found."))
+        elif copy.status == 'Reserved' and holders.get(copy_id) != member_id:
+            results.append(_failed(result, NOT_AVAILABLE))
+        elif copy.status not in ('Available', 'Reserved'):
+            results.append(_failed(result, NOT_AVAILABLE))
+        elif active.get(member_id, 0) >= Loan.LOAN_LIMIT:
+            results.append(_failed(result, "Member has reached maximum loan limit."))
+        else:
+            active[member_id] = active.get(member_id, 0) + 1
+            (shelved if copy.status == 'Available' else held).append(copy)
+            loans.append(Loan(
+                copy_id=copy_id, member_id=member_id, librarian_id=librarian_id,
+                issue_date=today, due_date=due_date,
+            ))
+            results.append({**result, 'status': 'ok'})
+        seen.add(copy_id)
+
+    if shelved:
+        BookCopy.objects.filter(copyID__in=[c.copyID for c in shelved], status='Available').update(status='Borrowed')
+        adjust_availability(Counter(c.book_id for c in shelved), -1)
+    if held:
+        # Held copies were never counted as available
+        BookCopy.objects.filter(copyID__in=[c.copyID for c in held], status='Reserved').update(status='Borrowed')
+        Reservation.objects.filter(copy__in=[c.copyID for c in held], status='Active').update(status='Fulfilled')
+        invalidate_on_commit('books')
+    if loans:
+        Loan.objects.bulk_create(loans)
+        # bulk_create does not return ids on every backend
+        loan_ids = dict(
+            Loan.objects.filter(copy__in=[loan.copy_id for loan in loans], loan_status='Borrowed')
+            .values_list('copy', 'loanID')
+        )
+        for result in results:
+            if result['status'] == 'ok':
+                result['loanID'] = loan_ids.get(result['copy'])
+    return results
+
+
+def bulk_return(copy_ids):
+    """
+    Take back many copies at once, closing their active loans.
+
+    The loans are locked and closed with one UPDATE. Copies of books that
+    nobody is queueing for go back on the shelf in batched UPDATEs. Copies
+    with a waiting queue are held for the next reservation one by one, as
+    a single return would be. Late loans are settled with
+    ``settle_fines``. Must run inside a transaction. Returns one result
+    per copy, in order.
+    """
+    today = timezone.now().date()
+    open_loans = {
+        copy_id: (loan_id, due_date)
+        for copy_id, loan_id, due_date in Loan.objects.select_for_update()
+        .filter(copy__in=set(copy_ids), loan_status__in=Loan.ACTIVE_STATUSES)
+        .values_list('copy', 'loanID', 'due_date')
+    }
+
+    results, returning = [], {}
+    for copy_id in copy_ids:
+        result = {'copy': copy_id}
+        if copy_id in returning:
+            results.append(_failed(result, "Copy is listed more than once."))
+        elif copy_id not in open_loans:
+            results.append(_failed(result, "No active loan for this copy."))
+        else:
+            returning[copy_id] = open_loans[copy_id]
+            results.append({**result, 'status': 'ok', 'loanID': open_loans[copy_id][0]})
+    if not returning:
+        return results
+
+    Loan.objects.filter(loanID__in=[loan_id for loan_id, _ in returning.values()]).update(
+        loan_status='Returned', return_date=today
+    )
+
+    # Only copies still Borrowed come back into circulation; a copy marked
+    # Lost or Damaged meanwhile keeps its status and stays off availability
+    books = dict(
+        BookCopy.objects.select_for_update()
+        .filter(copyID__in=list(returning), status='Borrowed')
+        .values_list('copyID', 'book')
+    )
+    queued = set(
+        Reservation.objects.filter(book__in=set(books.values()), status='Active', copy__isnull=True)
+        .values_list('book', flat=True).distinct()
+    )
+    shelved = [copy_id for copy_id in books if books[copy_id] not in queued]
+    if shelved:
+        BookCopy.objects.filter(copyID__in=shelved, status='Borrowed').update(status='Available')
+        adjust_availability(Counter(books[copy_id] for copy_id in shelved), 1)
+    for copy_id in books:
+        if books[copy_id] in queued:
+            hold_or_shelve(BookCopy(copyID=copy_id, book_id=books[copy_id]), 'Borrowed', today)
+
+    fines = settle_fines(dict(returning.values()), today)
+    for result in results:
+        if result['status'] == 'ok':
+            fine = fines.get(result['loanID'])
+            result['fine'] = str(fine) if fine is not None else None
+    return results
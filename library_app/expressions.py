@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.db.models import Func, IntegerField
+from django.db.models.functions import Cast
+
+
+class DaysBetween(Func):
+    """
+    Whole days from ``start`` to ``end``, two date expressions, computed by the database.
+
+    Negative when ``end`` is before ``start``; NULL if either is NULL.
+    PostgreSQL and Oracle subtract dates directly, MySQL has DATEDIFF()
+    and SQLite goes through julianday().
+    """
+    arity = 2
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='DATEDIFF(%(expressions)s)', arg_joiner=', ',
+                           **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)',
+                           arg_joiner=') - julianday(', **extra_context)
+
+
+class DecimalCast(Cast):
+    """
+    ``expression`` cast to ``output_field``, a DecimalField, with its decimal places.
+
+    SQLite keeps no scale, so an amount of 8 would come back as
+    ``Decimal('8')`` next to ``Decimal('1.00')`` read from a column; the
+    value is quantized on its way out as well.
+    """
+
+    def get_db_converters(self, connection):
+        places = Decimal(1).scaleb(-self.output_field.decimal_places)
+
+        def quantize(value, expression, connection):
+            return value if value is None else value.quantize(places)
+
+        return super().get_db_converters(connection) + [quantize]
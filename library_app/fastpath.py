@@ -0,0 +1,97 @@
+from functools import lru_cache
+
+from rest_framework.fields import SerializerMethodField
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from .exports import export_values
+from .instrumentation import serializer_timer
+
+
+@lru_cache(maxsize=None)
+def fast_fields(serializer_class):
+    """
+    ``(name, lookup, to_representation)`` for each output field of a serializer.
+
+    Model and dotted ``source=`` fields become ORM lookups
+    (``copy.book.title`` -> ``copy__book__title``) and keep the field's own
+    ``to_representation``, so dates, decimals and choices render exactly as
+    the serializer renders them. Primary-key relations come out of
+    ``.values()`` as the key itself. ``SerializerMethodField``s have no
+    lookup; the view supplies them as annotations.
+    """
+    fields = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, SerializerMethodField):
+            fields.append((name, None, None))
+        elif isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+            fields.append((name, '__'.join(field.source_attrs), None))
+        elif isinstance(field, (RelatedField, ManyRelatedField, BaseSerializer)) or not field.source_attrs:
+            raise ValueError(f'{serializer_class.__name__}.{name} cannot be read with .values()')
+        else:
+            fields.append((name, '__'.join(field.source_attrs), field.to_representation))
+    return tuple(fields)
+
+
+def fast_values(queryset, serializer_class):
+    """
+    ``queryset`` as a ``.values()`` query with one key per serializer field.
+
+    Joined fields are selected in the same query. The serializer's method
+    fields must be annotated on ``queryset`` under their own names.
+    """
+    columns = {}
+    for name, lookup, _ in fast_fields(serializer_class):
+        if lookup is None and name not in queryset.query.annotations:
+            raise ValueError(f'{serializer_class.__name__}.{name} needs an annotation')
+        columns[name] = lookup or name
+    # The paginator builds its cursors from the primary key and ordering fields of the rows
+    for name in (queryset.model._meta.pk.name, *queryset.query.order_by):
+        if isinstance(name, str):
+            columns.setdefault(name.lstrip('-'), name.lstrip('-'))
+    return export_values(queryset.prefetch_related(None), columns)
+
+
+def fast_representation(rows, serializer_class):
+    """The serializer's output for ``.values()`` rows from ``fast_values``."""
+    fields = fast_fields(serializer_class)
+    return [
+        {
+            name: row[name] if convert is None or row[name] is None else convert(row[name])
+            for name, _, convert in fields
+        }
+        for row in rows
+    ]
+
+
+class FastListMixin:
+    """
+    Serves list actions from ``.values()`` rows instead of model instances.
+
+    The response is the one the serializer would produce, but no model
+    instances are built and no DRF field machinery runs per row, which is
+    where most of the time goes on large pages. Method fields need a
+    database-side equivalent, annotated by ``get_queryset``. Set
+    ``fast_list`` to False to fall back to the serializer.
+    """
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        return self.list_page(self.filter_queryset(self.get_queryset()))
+
+    def list_page(self, queryset, serializer_class=None):
+        """One page of ``queryset`` as a paginated response, through the fast path unless it is off."""
+        serializer_class = serializer_class or self.get_serializer_class()
+        if self.fast_list:
+            queryset = fast_values(queryset, serializer_class)
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        if self.fast_list:
+            with serializer_timer():
+                data = fast_representation(rows, serializer_class)
+        else:
+            data = serializer_class(rows, many=True, context=self.get_serializer_context()).data
+        return Response(data) if page is None else self.get_paginated_response(data)
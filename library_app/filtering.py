@@ -0,0 +1,135 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+
+
+@lru_cache(maxsize=None)
+def serializer_field_names(serializer_class):
+    return tuple(serializer_class().fields)
+
+
+@lru_cache(maxsize=256)
+def sparse_serializer(serializer_class, fields):
+    """
+    Subclass of ``serializer_class`` rendering only ``fields``, a tuple of its field names.
+
+    Being a class of its own, it gets its own prefetch plan and fast-path
+    columns, so the query narrows along with the response.
+    """
+    removed = {name: None for name in serializer_class._declared_fields if name not in fields}
+    meta = type('Meta', (serializer_class.Meta,), {'fields': fields})
+    return type(serializer_class.__name__, (serializer_class,), {'Meta': meta, **removed})
+
+
+@lru_cache(maxsize=256)
+def only_lookups(serializer_class):
+    """
+    ``.only()`` lookups for the columns a serializer reads, or None if they cannot be told.
+
+    Dotted sources (``copy.book.title``) become ``copy__book__title``,
+    which keeps the joined table down to that column as well. Fields read
+    through many-valued relations are prefetched separately and need no
+    column here; method fields are assumed to read annotations.
+    """
+    model = serializer_class.Meta.model
+    lookups = []
+    for field in serializer_class().fields.values():
+        current, path = model, []
+        for attr in getattr(field, 'source_attrs', []):
+            try:
+                relation = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # A property or method; there is no telling which columns it reads
+                return None
+            if relation.many_to_many or relation.one_to_many:
+                path = []
+                break
+            path.append(attr)
+            if not relation.is_relation:
+                break
+            current = relation.related_model
+        if path:
+            lookups.append('__'.join(path))
+    return tuple(lookups)
+
+
+class QueryParamsMixin:
+    """
+    Server-side filtering, ordering and field selection from query parameters.
+
+    - ``filter_fields`` maps parameters to fields matched exactly; a
+      comma-separated value matches any of its items
+      (``?status=Borrowed,Overdue``).
+    - ``lookup_filters`` maps parameters to ORM lookups applied as given,
+      for ranges and text matches (``'due_to': 'due_date__lte'``).
+    - ``?ordering=-due_date,loanID`` sorts by any of ``ordering_fields``.
+      Keyset pagination compares values, so only non-null fields qualify;
+      it appends the primary key, so they need not be unique.
+    - ``?fields=loanID,book_title`` renders only those serializer fields
+      and narrows the SELECT to the columns they need.
+
+    Filter values are checked by the model fields; an invalid one is a 400.
+    Filters and ordering go through ``filter_queryset``, so they apply to
+    lists, detail lookups and exports alike; ``fields`` applies to GET
+    requests.
+    """
+    filter_fields = {}
+    lookup_filters = {}
+    ordering_fields = ()
+
+    def requested_fields(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method != 'GET' or 'fields' not in request.query_params:
+            return None
+        return [name.strip() for name in request.query_params['fields'].split(',') if name.strip()]
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        requested = self.requested_fields()
+        if requested is None:
+            return serializer_class
+        available = serializer_field_names(serializer_class)
+        unknown = [name for name in requested if name not in available]
+        if unknown or not requested:
+            raise ValidationError(
+                {"error": f"Unknown fields: {', '.join(unknown)}. Use any of: {', '.join(available)}."}
+            )
+        # Serializer order, so the same selection always maps to the same class
+        return sparse_serializer(serializer_class, tuple(name for name in available if name in requested))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.requested_fields() is None:
+            return queryset
+        lookups = only_lookups(self.get_serializer_class())
+        if lookups is None:
+            return queryset
+        return queryset.only(*lookups, *getattr(self, 'select_related_fields', ()))
+
+    def filter_queryset(self, queryset):
+        params = self.request.query_params
+        for param, field in self.filter_fields.items():
+            if param in params:
+                values = params[param].split(',')
+                lookup = {f'{field}__in': values} if len(values) > 1 else {field: values[0]}
+                queryset = self.filter_by(queryset, param, lookup)
+        for param, lookup in self.lookup_filters.items():
+            if param in params:
+                queryset = self.filter_by(queryset, param, {lookup: params[param]})
+
+        ordering = [name.strip() for name in params.get('ordering', '').split(',') if name.strip()]
+        if ordering:
+            invalid = [name for name in ordering if name.lstrip('-') not in self.ordering_fields]
+            if invalid:
+                raise ValidationError(
+                    {"error": f"Cannot order by {', '.join(invalid)}. Use one of: {', '.join(self.ordering_fields)}."}
+                )
+            queryset = queryset.order_by(*ordering)
+        return super().filter_queryset(queryset)
+
+    def filter_by(self, queryset, param, lookup):
+        try:
+            return queryset.filter(**lookup)
+        except (ValueError, TypeError, DjangoValidationError):
+            raise ValidationError({"error": f"Invalid value for '{param}'."})
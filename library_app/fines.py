@@ -0,0 +1,164 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .expressions import DaysBetween, DecimalCast
+from .models import Fine, Loan
+
+BATCH_SIZE = 10000
+CENT = Decimal('0.01')
+
+
+def fine_per_day():
+    """Daily overdue charge, configurable with the LIBRARY_FINE_PER_DAY setting."""
+    return Decimal(str(getattr(settings, 'LIBRARY_FINE_PER_DAY', '0.50')))
+
+
+def fine_for_days(days_overdue):
+    """Exact fine for a number of overdue days, rounded to the cent."""
+    return (fine_per_day() * max(days_overdue, 0)).quantize(CENT)
+
+
+def days_overdue(loan, today=None):
+    """Days ``loan`` is or was late: until its return, or until ``today`` while it is still out."""
+    today = today or timezone.now().date()
+    return max(((loan.return_date or today) - loan.due_date).days, 0)
+
+
+def overdue_amount(days):
+    """The fine for ``days``, an integer expression, computed by the database like ``fine_for_days()``."""
+    money = DecimalField(max_digits=10, decimal_places=2)
+    return DecimalCast(ExpressionWrapper(days * Value(fine_per_day()), output_field=money), money)
+
+
+def with_overdue(queryset, loan_path='', today=None):
+    """
+    Annotate ``days_overdue`` and ``accrued_fine`` onto a queryset of loans, or of rows with a loan.
+
+    The database computes both, the same way as ``days_overdue()`` and
+    ``fine_for_days()``, so they can be filtered and sorted on
+    (``accrued_fine__gte=10``, ``order_by('-days_overdue')``). ``loan_path``
+    reaches the loan from another model, e.g. ``'loan__'`` for fines.
+    """
+    today = today or timezone.now().date()
+    days = Greatest(
+        DaysBetween(Coalesce(F(f'{loan_path}return_date'), Value(today)), F(f'{loan_path}due_date')), Value(0)
+    )
+    return queryset.annotate(days_overdue=days).annotate(accrued_fine=overdue_amount(F('days_overdue')))
+
+
+def mark_overdue_loans(today, batch_size=BATCH_SIZE):
+    """
+    Flip Borrowed loans past their due date to Overdue.
+
+    Runs one UPDATE per ``batch_size`` range of loan ids so no single
+    statement holds locks on the whole table. Returns the number of loans
+    marked.
+    """
+    bounds = Loan.objects.filter(loan_status='Borrowed', due_date__lt=today).aggregate(
+        low=Min('loanID'), high=Max('loanID')
+    )
+    if bounds['low'] is None:
+        return 0
+    marked = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        with transaction.atomic():
+            marked += Loan.objects.filter(
+                loanID__gte=start, loanID__lt=start + batch_size,
+                loan_status='Borrowed', due_date__lt=today,
+            ).update(loan_status='Overdue')
+    return marked
+
+
+def accrue_overdue_fines(today, batch_size=BATCH_SIZE):
+    """
+    Bring the Unpaid fine of every Overdue loan up to date.
+
+    The amounts are computed by the database from each loan's due date:
+    per ``batch_size`` range of loan ids, one UPDATE re-prices the Unpaid
+    fines that changed and one ``INSERT ... SELECT`` creates the fines of
+    loans that have none yet. No loan or fine is read into Python. Running
+    it twice on the same day changes nothing. Paid fines are left alone.
+    Returns ``(updated, created)``.
+    """
+    bounds = Loan.objects.filter(loan_status='Overdue').aggregate(low=Min('loanID'), high=Max('loanID'))
+    if bounds['low'] is None:
+        return 0, 0
+
+    using = router.db_for_write(Fine)
+    fine_table = connections[using].ops.quote_name(Fine._meta.db_table)
+    columns = ', '.join(
+        connections[using].ops.quote_name(Fine._meta.get_field(name).column)
+        for name in ('loan', 'amount', 'payment_status')
+    )
+    due_date = Subquery(Loan.objects.filter(pk=OuterRef('loan')).values('due_date'))
+    repriced = overdue_amount(Greatest(DaysBetween(Value(today), due_date), Value(0)))
+
+    updated = created = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        overdue = Loan.objects.filter(loanID__gte=start, loanID__lt=start + batch_size, loan_status='Overdue')
+        without_fine = (
+            overdue.exclude(Exists(Fine.objects.filter(loan=OuterRef('pk'))))
+            .order_by()
+            .annotate(
+                fine_loan=F('loanID'),
+                fine_amount=overdue_amount(Greatest(DaysBetween(Value(today), F('due_date')), Value(0))),
+                fine_status=Value('Unpaid'),
+            )
+            .values('fine_loan', 'fine_amount', 'fine_status')
+        )
+        select_sql, params = without_fine.query.get_compiler(using).as_sql()
+        with transaction.atomic(using=using):
+            updated += Fine.objects.using(using).filter(
+                payment_status='Unpaid', loan__in=overdue.values('pk')
+            ).exclude(amount=repriced).update(amount=repriced)
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'INSERT INTO {fine_table} ({columns}) {select_sql}', params)
+                created += cursor.rowcount
+    return updated, created
+
+
+def settle_fine(loan):
+    """
+    Fix the final fine of a returned loan.
+
+    The Unpaid fine accrued while the loan was overdue is updated to the
+    final amount; a fine is only created if the loan never had one.
+    """
+    if not loan.return_date or loan.return_date <= loan.due_date:
+        return
+    amount = fine_for_days((loan.return_date - loan.due_date).days)
+    if not Fine.objects.filter(loan=loan, payment_status='Unpaid').update(amount=amount):
+        if not Fine.objects.filter(loan=loan).exists():
+            Fine.objects.create(loan=loan, amount=amount)
+
+
+def settle_fines(due_dates, return_date):
+    """
+    settle_fine for many loans returned together on ``return_date``.
+
+    ``due_dates`` maps loan ids to due dates. Unpaid fines are re-priced
+    with one UPDATE per distinct amount and loans that never had a fine get
+    theirs in one bulk INSERT. Returns the fine owed per late loan.
+    """
+    amounts = {
+        loan_id: fine_for_days((return_date - due_date).days)
+        for loan_id, due_date in due_dates.items() if return_date > due_date
+    }
+    if not amounts:
+        return {}
+    loans_by_amount = defaultdict(list)
+    for loan_id, amount in amounts.items():
+        loans_by_amount[amount].append(loan_id)
+    for amount, loan_ids in loans_by_amount.items():
+        Fine.objects.filter(loan__in=loan_ids, payment_status='Unpaid').update(amount=amount)
+    fined = set(Fine.objects.filter(loan__in=list(amounts)).values_list('loan', flat=True))
+    Fine.objects.bulk_create([
+        Fine(loan_id=loan_id, amount=amount) for loan_id, amount in amounts.items() if loan_id not in fined
+    ])
+    return amounts
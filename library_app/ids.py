@@ -0,0 +1,153 @@
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Max
+
+from .models import Book, IdSequence, Member
+
+
+class IdAllocator:
+    """
+    Hands out primary keys for one model from blocks reserved in IdSequence.
+
+    Reserving a block is a single ``UPDATE ... SET next_value = next_value + n``
+    followed by a read of the new value, so two workers can never receive
+    overlapping ranges. Each worker keeps the unused part of its block in
+    memory and serves later inserts without touching the database at all.
+
+    Reserve outside of transactions where possible: the UPDATE locks the
+    sequence row, and inside a transaction the lock is held until that
+    transaction ends, so every other worker needing a block waits for it.
+    The API views reserve their ids before opening their transaction. A
+    block reserved inside a transaction (e.g. ``Book.save()`` without an
+    id in an atomic block) is only cached once that transaction commits.
+    If it rolls back the reservation is undone with it, and the remaining
+    ids may already belong to another worker.
+    """
+
+    def __init__(self, name, model, start=1, block_size=None):
+        self.name = name
+        self.model = model
+        self.start = start
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._free = deque()  # (first, end) ranges, end exclusive
+
+    def get_block_size(self):
+        return self.block_size or getattr(settings, 'LIBRARY_ID_BLOCK_SIZE', 50)
+
+    def next_id(self):
+        return self.allocate(1)[0]
+
+    def allocate(self, count):
+        """Return ``count`` unused ids in ascending order."""
+        ids = self._take_cached(count)
+        missing = count - len(ids)
+        if missing:
+            first, end = self._reserve(max(missing, self.get_block_size()))
+            ids.extend(range(first, first + missing))
+            self._keep(first + missing, end)
+        return ids
+
+    def reserve_past(self, value):
+        """
+        Keep ``value`` out of the ids handed out from now on, e.g. for a row inserted with an explicit id.
+
+        Only this worker's cached ranges and the sequence are adjusted; a
+        block another worker already holds may still contain ``value``.
+        Inserts through ``create_with_new_ids`` take the next id when that
+        happens.
+        """
+        value = int(value)
+        with self._lock:
+            ranges = deque()
+            for first, end in self._free:
+                if first <= value < end:
+                    ranges.extend(r for r in ((first, value), (value + 1, end)) if r[0] < r[1])
+                else:
+                    ranges.append((first, end))
+            self._free = ranges
+        using = router.db_for_write(IdSequence)
+        IdSequence.objects.using(using).filter(name=self.name, next_value__lte=value).update(next_value=value + 1)
+
+    def discard_cached(self):
+        """Forget the ids cached by this worker; they are simply never used."""
+        with self._lock:
+            self._free.clear()
+
+    def _take_cached(self, count):
+        ids = []
+        with self._lock:
+            while self._free and len(ids) < count:
+                first, end = self._free.popleft()
+                take = min(count - len(ids), end - first)
+                ids.extend(range(first, first + take))
+                if first + take < end:
+                    self._free.appendleft((first + take, end))
+        return ids
+
+    def _keep(self, first, end):
+        if first >= end:
+            return
+        using = router.db_for_write(IdSequence)
+
+        def release():
+            with self._lock:
+                self._free.append((first, end))
+
+        if connections[using].in_atomic_block:
+            transaction.on_commit(release, using=using)
+        else:
+            release()
+
+    def _reserve(self, size):
+        using = router.db_for_write(IdSequence)
+        with transaction.atomic(using=using):
+            sequence = IdSequence.objects.using(using).filter(name=self.name)
+            if not sequence.update(next_value=F('next_value') + size):
+                self._create_sequence(using)
+                sequence.update(next_value=F('next_value') + size)
+            end = sequence.values_list('next_value', flat=True).get()
+        return end - size, end
+
+    def _create_sequence(self, using):
+        # One-off scan to start the sequence after any existing rows
+        pk_name = self.model._meta.pk.name
+        max_id = self.model._default_manager.using(using).aggregate(max_id=Max(pk_name))['max_id']
+        try:
+            with transaction.atomic(using=using):
+                IdSequence.objects.using(using).create(
+                    name=self.name, next_value=max((max_id or 0) + 1, self.start)
+                )
+        except IntegrityError:
+            # Another worker created it first
+            pass
+
+
+MAX_ID_ATTEMPTS = 3
+
+
+def create_with_new_ids(allocator, count, create):
+    """
+    Run ``create(ids)`` in a transaction with ``count`` freshly allocated ids.
+
+    A row inserted with an explicit id can take an id that this worker
+    still has cached; the insert then fails with an IntegrityError. If one
+    of the ids is indeed taken, they are dropped and ``create`` runs again
+    with new ones. The ids are allocated before the transaction opens.
+    """
+    for attempt in range(1, MAX_ID_ATTEMPTS + 1):
+        new_ids = allocator.allocate(count)
+        try:
+            with transaction.atomic():
+                return create(new_ids)
+        except IntegrityError:
+            taken = allocator.model._default_manager.filter(pk__in=new_ids).exists()
+            if attempt == MAX_ID_ATTEMPTS or not taken:
+                raise
+
+
+book_ids = IdAllocator('book', Book, start=1)
+member_ids = IdAllocator('member', Member, start=101)
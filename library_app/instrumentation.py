@@ -0,0 +1,326 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ContextDecorator, ExitStack, contextmanager
+from contextvars import ContextVar
+
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+
+    def quantile_ms(self, q):
+        """``quantile`` in milliseconds, or None above the largest bucket, where there is no finite bound."""
+        bound = self.quantile(q)
+        return None if bound == float('inf') else bound * 1000
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.db_connects = 0
+        self.errors = 0
+
+
+class RequestStats:
+    """Counters for the request being served, filled in by the DB and serializer hooks."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.db_connects = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+
+
+_current = ContextVar('library_request_stats', default=None)
+
+
+class MetricsRegistry:
+    """Per-process store of endpoint and timer metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.timers = {}
+        self.connections_opened = Counter()
+
+    def record_request(self, method, endpoint, status_code, seconds, stats):
+        with self._lock:
+            entry = self.endpoints.setdefault((method, endpoint), EndpointStats())
+            entry.latency.observe(seconds)
+            entry.db_queries += stats.db_queries
+            entry.db_time += stats.db_time
+            entry.serializer_time += stats.serializer_time
+            entry.db_connects += stats.db_connects
+            if status_code >= 500:
+                entry.errors += 1
+
+    def record_timer(self, name, seconds):
+        with self._lock:
+            self.timers.setdefault(name, Histogram()).observe(seconds)
+
+    def record_connection(self, alias):
+        with self._lock:
+            self.connections_opened[alias] += 1
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.timers.clear()
+            self.connections_opened.clear()
+
+    def databases(self):
+        """Connection settings of each database, with the connections opened to it so far."""
+        with self._lock:
+            opened = dict(self.connections_opened)
+        return [
+            {
+                'alias': alias,
+                'engine': database['ENGINE'].rsplit('.', 1)[-1],
+                'conn_max_age': database.get('CONN_MAX_AGE', 0),
+                'conn_health_checks': database.get('CONN_HEALTH_CHECKS', False),
+                'connections_opened': opened.get(alias, 0),
+            }
+            for alias, database in connections.settings.items()
+        ]
+
+    def snapshot(self):
+        """Plain-data summary for the JSON metrics endpoint."""
+        with self._lock:
+            endpoints = [
+                {
+                    'method': method,
+                    'endpoint': endpoint,
+                    'requests': stats.latency.count,
+                    'errors': stats.errors,
+                    'latency_avg_ms': round(stats.latency.sum / stats.latency.count * 1000, 3),
+                    'latency_p50_ms': stats.latency.quantile_ms(0.5),
+                    'latency_p95_ms': stats.latency.quantile_ms(0.95),
+                    'latency_p99_ms': stats.latency.quantile_ms(0.99),
+                    'db_queries_per_request': round(stats.db_queries / stats.latency.count, 2),
+                    'db_time_ms': round(stats.db_time * 1000, 3),
+                    'db_connects_per_request': round(stats.db_connects / stats.latency.count, 2),
+                    'serializer_time_ms': round(stats.serializer_time * 1000, 3),
+                }
+                for (method, endpoint), stats in sorted(self.endpoints.items())
+            ]
+            timers = [
+                {
+                    'name': name,
+                    'calls': histogram.count,
+                    'avg_ms': round(histogram.sum / histogram.count * 1000, 3),
+                    'p95_ms': histogram.quantile_ms(0.95),
+                }
+                for name, histogram in sorted(self.timers.items())
+            ]
+        return {'endpoints': endpoints, 'timers': timers, 'databases': self.databases()}
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def histogram_lines(name, labels, histogram):
+            for bound, total in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            lines += [
+                '# HELP library_request_duration_seconds Request latency by endpoint.',
+                '# TYPE library_request_duration_seconds histogram',
+            ]
+            for (method, endpoint), stats in endpoints:
+                histogram_lines('library_request_duration_seconds',
+                                f'method="{method}",endpoint="{endpoint}"', stats.latency)
+            for metric, attr, help_text in (
+                ('library_db_queries_total', 'db_queries', 'Database queries issued while serving requests.'),
+                ('library_db_time_seconds_total', 'db_time', 'Time spent in database queries.'),
+                ('library_serializer_time_seconds_total', 'serializer_time', 'Time spent serializing lists.'),
+                ('library_db_connects_total', 'db_connects', 'Database connections opened while serving requests.'),
+                ('library_request_errors_total', 'errors', 'Requests answered with a 5xx status.'),
+            ):
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+                for (method, endpoint), stats in endpoints:
+                    lines.append(f'{metric}{{method="{method}",endpoint="{endpoint}"}} {getattr(stats, attr)}')
+            lines += [
+                '# HELP library_timer_duration_seconds Duration of timed code sections.',
+                '# TYPE library_timer_duration_seconds histogram',
+            ]
+            for name, histogram in sorted(self.timers.items()):
+                histogram_lines('library_timer_duration_seconds', f'name="{name}"', histogram)
+        databases = self.databases()
+        for metric, kind, help_text, value in (
+            ('library_db_connections_opened_total', 'counter', 'Database connections opened by this process.',
+             lambda database: database['connections_opened']),
+            ('library_db_conn_max_age_seconds', 'gauge', 'CONN_MAX_AGE of the database (+Inf: never closed).',
+             lambda database: '+Inf' if database['conn_max_age'] is None else database['conn_max_age']),
+            ('library_db_conn_health_checks', 'gauge', 'Whether reused connections are health-checked.',
+             lambda database: int(database['conn_health_checks'])),
+        ):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+            for database in databases:
+                lines.append(f'{metric}{{alias="{database["alias"]}"}} {value(database)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _connection_opened(sender, connection, **kwargs):
+    metrics.record_connection(connection.alias)
+    stats = _current.get()
+    if stats is not None:
+        stats.db_connects += 1
+
+
+connection_created.connect(_connection_opened, dispatch_uid='library-instrumentation')
+
+
+class timed(ContextDecorator):
+    """
+    Record how long a block or function takes under ``name``.
+
+    Works as ``with timed('fines.accrue'):`` and as a decorator on views or
+    helpers; the durations show up as timers in the metrics endpoints.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _recreate_cm(self):
+        # A decorated view runs in many threads at once; give each call its own start time
+        return timed(self.name)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        metrics.record_timer(self.name, time.perf_counter() - self._start)
+        return False
+
+
+@contextmanager
+def serializer_timer():
+    """Add the time spent in the block to the current request's serializer time."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serializer_time += time.perf_counter() - start
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """List serializer that adds its rendering time to the current request's metrics."""
+
+    def to_representation(self, data):
+        with serializer_timer():
+            return super().to_representation(data)
+
+
+class InstrumentationMiddleware:
+    """
+    Records latency, query count, DB time and serializer time per endpoint.
+
+    Endpoints are labelled with the URL name (``loan-list``,
+    ``book-detail``), which keeps the number of series bounded. Works in
+    both handler modes, so under ASGI it does not force async views onto
+    a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.watch_connections(stack, stats)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, start, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # The ORM runs on the request's sync thread, so hook that thread's connections
+            await sync_to_async(self.watch_connections)(stack, stats)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        self.record(request, response, start, stats)
+        return response
+
+    def watch_connections(self, stack, stats):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+    def record(self, request, response, start, stats):
+        match = request.resolver_match
+        endpoint = (match.view_name or match.route) if match else 'unmatched'
+        metrics.record_request(request.method, endpoint, response.status_code,
+                               time.perf_counter() - start, stats)
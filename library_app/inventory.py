@@ -0,0 +1,165 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .caching import invalidate_on_commit
+from .models import Book, BookCopy, Reservation
+from .reservations import hold_or_shelve
+
+BATCH_SIZE = 500
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def add_copies(books_and_counts):
+    """
+    Create ``count`` Available copies for each ``(book, count)`` pair.
+
+    Copies are inserted with multi-row INSERTs of ``BATCH_SIZE`` rows, so a
+    500-copy order is one statement rather than 500. bulk_create sends no
+    signals, so the cached catalog is invalidated here.
+    """
+    copies = (
+        BookCopy(book=book, status='Available')
+        for book, count in books_and_counts
+        for _ in range(count)
+    )
+    created = 0
+    for batch in _batches(copies, BATCH_SIZE):
+        BookCopy.objects.bulk_create(batch)
+        created += len(batch)
+    if created:
+        invalidate_on_commit('books')
+    return created
+
+
+def remove_available_copies(book, count):
+    """
+    Delete ``count`` Available copies of ``book``.
+
+    Returns False, deleting nothing, if the book has fewer Available
+    copies than that. The chosen copies are locked until the surrounding
+    transaction ends and the DELETE checks their status again, so a copy
+    checked out meanwhile (and its active loan) is never deleted; if that
+    leaves fewer than ``count`` copies removed, nothing is.
+    """
+    with transaction.atomic():
+        copy_ids = list(
+            BookCopy.objects.select_for_update()
+            .filter(book=book, status='Available')
+            .order_by('-copyID')
+            .values_list('copyID', flat=True)[:count]
+        )
+        if len(copy_ids) < count:
+            return False
+        deleted = 0
+        for batch in _batches(copy_ids, BATCH_SIZE):
+            deleted += BookCopy.objects.filter(copyID__in=batch, status='Available').delete()[1].get(
+                BookCopy._meta.label, 0
+            )
+        if deleted < count:
+            transaction.set_rollback(True)
+            return False
+    return True
+
+
+def lock_copy(copy_id):
+    """Fetch a copy with a row lock held until the surrounding transaction ends."""
+    return BookCopy.objects.select_for_update().get(copyID=copy_id)
+
+
+def checkout_copy(copy):
+    """
+    Mark an Available copy Borrowed and take it off its book's availability.
+
+    Both writes are conditional single-statement UPDATEs, so two desks
+    racing for the same copy cannot both succeed and a concurrent return
+    cannot be lost. Returns False if the copy was not Available.
+    """
+    if not BookCopy.objects.filter(copyID=copy.copyID, status='Available').update(status='Borrowed'):
+        return False
+    Book.objects.filter(bookID=copy.book_id, available_copies__gt=0).update(
+        available_copies=F('available_copies') - 1
+    )
+    invalidate_on_commit('books')
+    copy.status = 'Borrowed'
+    return True
+
+
+def checkout_held_copy(copy, member_id):
+    """
+    Lend a Reserved copy to the member it is held for, fulfilling the reservation.
+
+    The book's availability is unchanged: a held copy was never counted as
+    available. Returns False if the copy is not held for that member.
+    """
+    if not Reservation.objects.filter(copy=copy.copyID, member_id=member_id, status='Active').update(status='Fulfilled'):
+        return False
+    if not BookCopy.objects.filter(copyID=copy.copyID, status='Reserved').update(status='Borrowed'):
+        return False
+    invalidate_on_commit('books')
+    copy.status = 'Borrowed'
+    return True
+
+
+def release_copy(copy):
+    """
+    Take back a Borrowed copy.
+
+    It is held for the first reservation waiting for its book, or put back
+    on the shelf if there is none. Returns False if it was not Borrowed.
+    """
+    return hold_or_shelve(copy, 'Borrowed')
+
+
+def adjust_availability(copies_per_book, sign):
+    """
+    Add (``sign`` 1) or take (``sign`` -1) copies off many books' availability.
+
+    ``copies_per_book`` maps book ids to copy counts, e.g. a Counter of
+    the copies' book ids. Books sharing a count share one UPDATE, so a desk
+    batch of 30 copies is usually one or two statements.
+    """
+    books_by_count = defaultdict(list)
+    for book_id, count in copies_per_book.items():
+        books_by_count[count].append(book_id)
+    for count, book_ids in books_by_count.items():
+        Book.objects.filter(bookID__in=book_ids).update(available_copies=F('available_copies') + sign * count)
+    if books_by_count:
+        invalidate_on_commit('books')
+
+
+def available_copy_count():
+    """Correlated count of a book's Available copies, for use in Book querysets."""
+    counts = (
+        BookCopy.objects.filter(book=OuterRef('pk'), status='Available')
+        .order_by()
+        .values('book')
+        .annotate(count=Count('copyID'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile_availability(dry_run=False):
+    """
+    Recompute ``Book.available_copies`` from copy statuses.
+
+    Mismatched books are found and fixed with one UPDATE whose value and
+    condition are the same correlated count, so nothing is read into
+    Python. Returns the number of books that were (or would be) corrected.
+    """
+    mismatched = Book.objects.exclude(available_copies=available_copy_count())
+    if dry_run:
+        return mismatched.count()
+    corrected = mismatched.update(available_copies=available_copy_count())
+    if corrected:
+        invalidate_on_commit('books')
+    return corrected
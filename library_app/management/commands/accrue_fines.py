@@ -0,0 +1,36 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from library_app.fines import BATCH_SIZE, accrue_overdue_fines, mark_overdue_loans
+
+class Command(BaseCommand):
+    help = 'Mark overdue loans and bring their fines up to date (safe to run repeatedly, e.g. nightly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Rows per UPDATE/INSERT batch')
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Run as of this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        today = options['date'] or timezone.now().date()
+        batch_size = options['batch_size']
+
+        started = time.monotonic()
+        marked = mark_overdue_loans(today, batch_size=batch_size)
+        mark_elapsed = time.monotonic() - started
+        self.stdout.write(f"Marked {marked} loans overdue in {mark_elapsed:.2f}s ({self.rate(marked, mark_elapsed)} rows/s)")
+
+        started = time.monotonic()
+        updated, created = accrue_overdue_fines(today, batch_size=batch_size)
+        fine_elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Updated {updated} and created {created} fines in {fine_elapsed:.2f}s "
+            f"({self.rate(updated + created, fine_elapsed)} rows/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Overdue run for {today} finished in {mark_elapsed + fine_elapsed:.2f}s"))
+
+    def rate(self, rows, elapsed):
+        return int(rows / elapsed) if elapsed else rows
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from library_app.benchmarks import DEFAULT_SCENARIOS, BenchmarkRunner, compare, load_results, save_results
+from library_app.seeding import seed_library
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway test database and benchmark the REST API (latency percentiles, throughput, queries)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=500)
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--copies-per-book', type=int, default=3)
+        parser.add_argument('--loans', type=int, default=2000)
+        parser.add_argument('--fines', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario')
+        parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS),
+                            help=f"Comma-separated subset of: {', '.join(DEFAULT_SCENARIOS)}")
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare against results saved earlier with --output')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative p95 growth before a scenario counts as a regression')
+
+    def handle(self, *args, **options):
+        volumes = {key: options[key] for key in ('members', 'books', 'copies_per_book', 'loans', 'fines', 'seed')}
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+
+        # Never touch the real data: run against a test database created for this run
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.monotonic()
+            counts = seed_library(**volumes)
+            self.stdout.write(f"Seeded {counts} in {time.monotonic() - started:.2f}s")
+
+            runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'])
+            try:
+                results = runner.run(scenarios)
+            except ValueError as e:
+                raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'scenario':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}{'queries':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<16}{result['p50_ms']:>8.2f}ms{result['p95_ms']:>8.2f}ms{result['p99_ms']:>8.2f}ms"
+                f"{result['throughput_rps']:>10}{result['queries_avg']:>9}"
+            )
+
+        if options['output']:
+            save_results(options['output'], results, volumes)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            regressions = compare(results, load_results(options['baseline']), tolerance=options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark finished'))
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from library_app.benchmarks import CONCURRENCY_SCENARIOS, SERVER_MODES, ConcurrencyBenchmark
+from library_app.seeding import seed_library
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway test database and compare WSGI and ASGI (sync and async views) under concurrent clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=500)
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--loans', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario, mode and concurrency')
+        parser.add_argument('--concurrency', default='1,8,32', help='Comma-separated numbers of concurrent clients')
+        parser.add_argument('--threads', type=int, default=4, help='Worker threads of the simulated WSGI server')
+        parser.add_argument('--db-latency', type=float, default=2.0,
+                            help='Milliseconds added to every query, standing in for a remote database')
+        parser.add_argument('--scenarios', default=','.join(CONCURRENCY_SCENARIOS),
+                            help=f"Comma-separated subset of: {', '.join(CONCURRENCY_SCENARIOS)}")
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        volumes = {key: options[key] for key in ('members', 'books', 'loans', 'seed')}
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        try:
+            concurrency = [int(clients) for clients in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of numbers')
+
+        # Never touch the real data: run against a test database created for this run
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed_library(**volumes)
+            benchmark = ConcurrencyBenchmark(
+                requests=options['requests'], threads=options['threads'], db_latency_ms=options['db_latency']
+            )
+            try:
+                results = benchmark.run(scenarios, concurrency)
+            except ValueError as e:
+                raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'scenario':<20}" + ''.join(f"{mode + ' req/s':>18}{'p95':>10}" for mode in SERVER_MODES))
+        for name, modes in results.items():
+            self.stdout.write(f"{name:<20}" + ''.join(
+                f"{modes[mode]['throughput_rps']:>18}{modes[mode]['p95_ms']:>8.1f}ms" for mode in SERVER_MODES
+            ))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'settings': {**volumes, 'threads': options['threads'],
+                                        'db_latency_ms': options['db_latency']}, 'results': results},
+                          f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
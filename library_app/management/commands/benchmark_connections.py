@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from library_app.benchmarks import CONCURRENCY_SCENARIOS, CONNECTION_MODES, ConnectionModeBenchmark
+from library_app.seeding import seed_library
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway test database and compare request latency with per-request and persistent database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=500)
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--loans', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--iterations', type=int, default=100, help='Timed requests per scenario and mode')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests before each scenario')
+        parser.add_argument('--connect-latency', type=float, default=3.0,
+                            help='Milliseconds added to opening a connection, standing in for the MySQL handshake')
+        parser.add_argument('--db-latency', type=float, default=0.5,
+                            help='Milliseconds added to every query, standing in for a remote database')
+        parser.add_argument('--scenarios', default='catalog_search,my_loans,dashboard',
+                            help=f"Comma-separated subset of: {', '.join(CONCURRENCY_SCENARIOS)}")
+        parser.add_argument('--modes', default=','.join(CONNECTION_MODES),
+                            help=f"Comma-separated subset of: {', '.join(CONNECTION_MODES)}")
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        volumes = {key: options[key] for key in ('members', 'books', 'loans', 'seed')}
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+
+        # Never touch the real data: run against a test database created for this run
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed_library(**volumes)
+            try:
+                benchmark = ConnectionModeBenchmark(
+                    iterations=options['iterations'], warmup=options['warmup'],
+                    connect_latency_ms=options['connect_latency'], db_latency_ms=options['db_latency'],
+                )
+                results = benchmark.run(scenarios, modes)
+            except ValueError as e:
+                raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'scenario':<16}" + ''.join(f"{mode + ' p50':>24}{'p95':>10}{'conn/req':>10}" for mode in modes))
+        for name, results_by_mode in results.items():
+            self.stdout.write(f"{name:<16}" + ''.join(
+                f"{results_by_mode[mode]['p50_ms']:>22.1f}ms{results_by_mode[mode]['p95_ms']:>8.1f}ms"
+                f"{results_by_mode[mode]['connects_per_request']:>10}"
+                for mode in modes
+            ))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'settings': {**volumes, 'connect_latency_ms': options['connect_latency'],
+                                        'db_latency_ms': options['db_latency']}, 'results': results},
+                          f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from library_app.benchmarks import FAST_LISTS, SerializerBenchmark
+from library_app.seeding import seed_library
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway test database and compare list serialization throughput of the DRF serializers and the fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=2000)
+        parser.add_argument('--books', type=int, default=5000)
+        parser.add_argument('--loans', type=int, default=20000)
+        parser.add_argument('--fines', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--rows', type=int, default=5000, help='Rows rendered per list')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per list and path; the best one counts')
+        parser.add_argument('--lists', default=','.join(FAST_LISTS),
+                            help=f"Comma-separated subset of: {', '.join(FAST_LISTS)}")
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        volumes = {key: options[key] for key in ('members', 'books', 'loans', 'fines', 'seed')}
+        lists = [name.strip() for name in options['lists'].split(',') if name.strip()]
+
+        # Never touch the real data: run against a test database created for this run
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed_library(**volumes)
+            try:
+                results = SerializerBenchmark(rows=options['rows'], repeat=options['repeat']).run(lists)
+            except ValueError as e:
+                raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'list':<10}{'rows':>8}{'serializer rows/s':>20}{'fast rows/s':>14}{'speedup':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<10}{result['rows']:>8}{result['serializer_rows_per_s']:>20}"
+                f"{result['fast_rows_per_s']:>14}{result['speedup']:>9}x"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'settings': {**volumes, 'rows': options['rows']}, 'results': results},
+                          f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
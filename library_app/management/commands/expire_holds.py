@@ -0,0 +1,23 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from library_app.reservations import BATCH_SIZE, expire_holds
+
+class Command(BaseCommand):
+    help = 'Expire reservation holds past their pickup date and pass the copies to the next reservation (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Holds expired per transaction')
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Run as of this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        today = options['date'] or timezone.now().date()
+
+        started = time.monotonic()
+        expired = expire_holds(today, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} holds as of {today} in {elapsed:.2f}s"))
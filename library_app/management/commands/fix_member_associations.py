@@ -1,51 +1,133 @@
+import time
+from functools import partial
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from library_app.authentication import identity_cache
 from library_app.models import Member
 
 User = get_user_model()
 
+CHUNK_SIZE = 2000
+
 class Command(BaseCommand):
-    help = 'Fix member and user associations'
+    help = 'Fix member and user associations: link member users to the member with their email, and create logins for members without one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Rows handled (and committed) per chunk')
+        parser.add_argument('--password', default='member123',
+                            help='Initial password of the created users')
 
     def handle(self, *args, **options):
-        # List all users and their associations
-        self.stdout.write("Checking user associations...")
-        
-        for user in User.objects.all():
-            self.stdout.write(f"\nUser: {user.username}")
-            self.stdout.write(f"  Role: {user.role}")
-            self.stdout.write(f"  Has member: {hasattr(user, 'member')}")
-            self.stdout.write(f"  Has librarian: {hasattr(user, 'librarian')}")
-            
-            if user.role == 'member' and not hasattr(user, 'member'):
-                # Try to find a member with the same email
-                try:
-                    member = Member.objects.get(email_address=user.email)
-                    user.member = member
-                    user.save()
-                    self.stdout.write(self.style.SUCCESS(f"  Fixed: Associated with member {member.memberID}"))
-                except Member.DoesNotExist:
-                    self.stdout.write(self.style.WARNING(f"  No member found with email {user.email}"))
-        
-        # List all members and their associations
-        self.stdout.write("\nChecking member associations...")
-        
-        for member in Member.objects.all():
-            associated_user = User.objects.filter(member=member).first()
-            if associated_user:
-                self.stdout.write(f"Member {member.memberID} ({member.name}) is associated with user {associated_user.username}")
-            else:
-                self.stdout.write(self.style.WARNING(f"Member {member.memberID} ({member.name}) has no associated user"))
-                
-                # Try to create a user for this member
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.verbosity = options['verbosity']
+        prefix = '[dry run] ' if self.dry_run else ''
+
+        started = time.monotonic()
+        linked = self.link_users()
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Linked {len(linked)} users to members in {time.monotonic() - started:.2f}s"
+        ))
+
+        started = time.monotonic()
+        created, skipped = self.create_missing_users(options['password'], linked)
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Created {created} users for members in {time.monotonic() - started:.2f}s"
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"{prefix}{skipped} members still have no user: their username is already taken"
+            ))
+
+    def chunks(self, queryset):
+        """Keyset walk of a queryset that shrinks as it is fixed; one chunk per transaction."""
+        pk_name = queryset.model._meta.pk.name
+        last_pk = None
+        while True:
+            chunk = queryset.order_by(pk_name)
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            chunk = list(chunk[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+
+    def progress(self, label, done, total, started):
+        elapsed = time.monotonic() - started
+        rate = int(done / elapsed) if elapsed else done
+        self.stdout.write(f"  {label}: {done}/{total} ({rate}/s)")
+
+    def link_users(self):
+        """Member users without a member get the unlinked member that has their email; returns the linked member ids."""
+        orphans = User.objects.filter(role='member', member__isnull=True).exclude(email='').only('id', 'email')
+        total = orphans.count()
+        # Members linked so far; on a dry run they are still unlinked in the database
+        taken = set()
+        started = time.monotonic()
+        seen = 0
+        for chunk in self.chunks(orphans):
+            members = dict(
+                Member.objects.filter(email_address__in={user.email for user in chunk}, user__isnull=True)
+                .values_list('email_address', 'memberID')
+            )
+            fixed = []
+            for user in chunk:
+                # Several users may share an email; the oldest one gets the member
+                member_id = members.pop(user.email, None)
+                if member_id is not None and member_id not in taken:
+                    taken.add(member_id)
+                    user.member_id = member_id
+                    fixed.append(user)
+                    if self.verbosity > 1:
+                        self.stdout.write(f"  User {user.username} -> member {member_id}")
+            if fixed and not self.dry_run:
+                with transaction.atomic():
+                    User.objects.bulk_update(fixed, ['member'])
+                    # bulk_update sends no post_save, so the cached identities are dropped here
+                    for user in fixed:
+                        transaction.on_commit(partial(identity_cache.invalidate, user.pk))
+            seen += len(chunk)
+            self.progress('users checked', seen, total, started)
+        return taken
+
+    def create_missing_users(self, password, linked):
+        """Each member without a user gets one named after its email's local part."""
+        orphans = Member.objects.filter(user__isnull=True).only('memberID', 'email_address')
+        total = orphans.count()
+        # PBKDF2 is slow on purpose; hash once and share the result
+        password = make_password(password)
+        claimed = set()
+        started = time.monotonic()
+        seen = created = skipped = 0
+        for chunk in self.chunks(orphans):
+            wanted = {member.email_address.split('@')[0] for member in chunk}
+            claimed.update(User.objects.filter(username__in=wanted).values_list('username', flat=True))
+            users = []
+            for member in chunk:
+                if member.memberID in linked:
+                    continue
                 username = member.email_address.split('@')[0]
-                if not User.objects.filter(username=username).exists():
-                    user = User.objects.create_user(
-                        username=username,
-                        email=member.email_address,
-                        password='member123',
-                        role='member'
-                    )
-                    user.member = member
-                    user.save()
-                    self.stdout.write(self.style.SUCCESS(f"Created user {username} for member {member.memberID}"))
\ No newline at end of file
+                if username in claimed:
+                    skipped += 1
+                    continue
+                claimed.add(username)
+                users.append(User(
+                    username=username, email=member.email_address, password=password,
+                    role='member', member_id=member.memberID,
+                ))
+                if self.verbosity > 1:
+                    self.stdout.write(f"  Member {member.memberID} -> new user {username}")
+            if users and not self.dry_run:
+                with transaction.atomic():
+                    User.objects.bulk_create(users)
+            seen += len(chunk)
+            created += len(users)
+            self.progress('members checked', seen, total, started)
+        return created, skipped
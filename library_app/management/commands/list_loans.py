@@ -1,23 +1,81 @@
+from datetime import date
+
 from django.core.management.base import BaseCommand
-from library_app.models import Loan, Member, User
+from library_app.exports import csv_lines, export_values, iterate_in_chunks, ndjson_lines
+from library_app.models import Loan
+from library_app.routers import read_from_replica
+
+# Output column -> ORM lookup; everything comes from one joined query
+COLUMNS = {
+    'loanID': 'loanID',
+    'book_title': 'copy__book__title',
+    'member': 'member',
+    'member_name': 'member__name',
+    'member_email': 'member__email_address',
+    'username': 'member__user__username',
+    'loan_status': 'loan_status',
+    'issue_date': 'issue_date',
+    'due_date': 'due_date',
+    'return_date': 'return_date',
+}
+
+TABLE_COLUMNS = (
+    ('loanID', 8), ('book_title', 32), ('member', 8), ('member_name', 24),
+    ('username', 16), ('loan_status', 10), ('issue_date', 11), ('due_date', 11), ('return_date', 11),
+)
 
 class Command(BaseCommand):
-    help = 'List all loans and their associations'
+    help = 'List loans with their book, member and user, streamed as a table, CSV or JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='append', choices=[choice for choice, _ in Loan.STATUS_CHOICES],
+                            help='Only loans with this status (repeatable)')
+        parser.add_argument('--member', type=int, help='Only loans of this member ID')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='Only loans issued on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Only loans issued on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=('table', 'csv', 'json'), default='table')
 
     def handle(self, *args, **options):
-        self.stdout.write("Listing all loans...")
-        
-        for loan in Loan.objects.all():
-            self.stdout.write(f"\nLoan ID: {loan.loanID}")
-            self.stdout.write(f"  Book: {loan.copy.book.title}")
-            self.stdout.write(f"  Member ID: {loan.member.memberID}")
-            self.stdout.write(f"  Member Name: {loan.member.name}")
-            self.stdout.write(f"  Member Email: {loan.member.email_address}")
-            self.stdout.write(f"  Status: {loan.loan_status}")
-            
-            # Check if member has associated user
-            try:
-                user = User.objects.get(member=loan.member)
-                self.stdout.write(f"  Associated User: {user.username}")
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f"  No user associated with this member"))
\ No newline at end of file
+        loans = Loan.objects.all()
+        if options['status']:
+            loans = loans.filter(loan_status__in=options['status'])
+        if options['member'] is not None:
+            loans = loans.filter(member_id=options['member'])
+        if options['date_from']:
+            loans = loans.filter(issue_date__gte=options['date_from'])
+        if options['date_to']:
+            loans = loans.filter(issue_date__lte=options['date_to'])
+
+        # Rows are fetched a chunk at a time and written as they arrive
+        rows = iterate_in_chunks(export_values(loans, COLUMNS))
+        if options['format'] == 'csv':
+            lines = csv_lines(list(COLUMNS), rows)
+        elif options['format'] == 'json':
+            lines = self.json_lines({name: row[name] for name in COLUMNS} for row in rows)
+        else:
+            lines = self.table_lines(rows)
+        # A report: keep it off the primary when there is a replica
+        with read_from_replica():
+            for line in lines:
+                self.stdout.write(line, ending='')
+
+    def json_lines(self, rows):
+        """A JSON array written one element per line."""
+        empty = True
+        for line in ndjson_lines(rows):
+            yield ('[' if empty else ',') + line
+            empty = False
+        yield '[]\n' if empty else ']\n'
+
+    def table_lines(self, rows):
+        yield ' '.join(name.ljust(width) for name, width in TABLE_COLUMNS).rstrip() + '\n'
+        yield ' '.join('-' * width for _, width in TABLE_COLUMNS) + '\n'
+        for row in rows:
+            cells = []
+            for name, width in TABLE_COLUMNS:
+                value = row[name]
+                value = '-' if value is None else str(value)
+                cells.append(value[:width].ljust(width))
+            yield ' '.join(cells).rstrip() + '\n'
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from library_app.models import Book, BookSearchToken
+from library_app.search import build_index_rows
+
+class Command(BaseCommand):
+    help = 'Rebuild the catalog search index from scratch, one batch of books at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of books indexed per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Each batch swaps its books' entries in one transaction, so searches
+        # running meanwhile see either the old or the new entries of a book,
+        # never none. Entries of deleted books go with the book (cascade).
+        books = Book.objects.order_by('bookID').prefetch_related('author_set', 'category_set')
+        last_id, indexed, tokens = None, 0, 0
+        while True:
+            batch = books if last_id is None else books.filter(bookID__gt=last_id)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            rows = build_index_rows(batch)
+            with transaction.atomic():
+                BookSearchToken.objects.filter(book_id__in=[book.bookID for book in batch]).delete()
+                BookSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+            last_id = batch[-1].bookID
+            indexed += len(batch)
+            tokens += len(rows)
+            self.stdout.write(f"  Indexed {indexed} books")
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} books ({tokens} tokens)"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from library_app.inventory import reconcile_availability
+
+class Command(BaseCommand):
+    help = 'Recompute Book.available_copies from the status of each book copy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many books are out of sync')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = reconcile_availability(dry_run=True)
+            self.stdout.write(f"{count} books have an incorrect available_copies count")
+            return
+
+        count = reconcile_availability()
+        self.stdout.write(self.style.SUCCESS(f"Corrected available_copies for {count} books"))
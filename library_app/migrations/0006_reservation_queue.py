@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0005_loan_overdue_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='copy',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='holds', to='library_app.bookcopy'),
+        ),
+        migrations.AlterField(
+            model_name='bookcopy',
+            name='status',
+            field=models.CharField(choices=[('Available', 'Available'), ('Borrowed', 'Borrowed'), ('Reserved', 'Reserved'), ('Lost', 'Lost'), ('Damaged', 'Damaged')], default='Available', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('Active', 'Active'), ('Fulfilled', 'Fulfilled'), ('Cancelled', 'Cancelled'), ('Expired', 'Expired')], default='Active', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['book', 'status', 'reservation_date', 'reservationID'], name='reservation_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'exp_return_date'], name='reservation_hold_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+def move_pickup_deadlines(apps, schema_editor):
+    # Holds used to keep their pickup deadline in exp_return_date
+    Reservation = apps.get_model('library_app', 'Reservation')
+    Reservation.objects.filter(status='Active', copy__isnull=False).update(hold_expires=models.F('exp_return_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_app', '0006_reservation_queue'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='reservation_queue_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='reservation_hold_idx',
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='hold_expires',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(move_pickup_deadlines, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['book', 'status', 'copy', 'reservation_date', 'reservationID'], name='reservation_waiting_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'hold_expires'], name='reservation_hold_expires_idx'),
+        ),
+    ]
@@ -25,8 +25,8 @@ class Member(models.Model):
     def save(self, *args, **kwargs):
         # If memberID is not set, generate it
         if not self.memberID:
-            max_id = Member.objects.aggregate(max_id=models.Max('memberID'))['max_id']
-            self.memberID = (max_id or 100) + 1
+            from .ids import member_ids
+            self.memberID = member_ids.next_id()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -54,14 +54,15 @@ class Book(models.Model):
     def save(self, *args, **kwargs):
         # If bookID is not set, generate it
         if not self.bookID:
-            max_id = Book.objects.aggregate(max_id=models.Max('bookID'))['max_id']
-            self.bookID = (max_id or 0) + 1
+            from .ids import book_ids
+            self.bookID = book_ids.next_id()
         super().save(*args, **kwargs)
 
 class BookCopy(models.Model):
     STATUS_CHOICES = (
         ('Available', 'Available'),
         ('Borrowed', 'Borrowed'),
+        ('Reserved', 'Reserved'),
         ('Lost', 'Lost'),
         ('Damaged', 'Damaged'),
     )
@@ -69,6 +70,14 @@ class BookCopy(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Available')
 
+    class Meta:
+        indexes = [
+            # copies of a book by status (copies action, resizing a book)
+            models.Index(fields=['book', 'status'], name='copy_book_status_idx'),
+            # available copies in keyset order (available action)
+            models.Index(fields=['status', 'copyID'], name='copy_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.book.title} - Copy {self.copyID}"
 
@@ -78,6 +87,10 @@ class Loan(models.Model):
         ('Returned', 'Returned'),
         ('Overdue', 'Overdue'),
     )
+    # Loans whose copy is still out with the member
+    ACTIVE_STATUSES = ('Borrowed', 'Overdue')
+    # Most active loans a member may have at once
+    LOAN_LIMIT = 5
     loanID = models.AutoField(primary_key=True)
     copy = models.ForeignKey(BookCopy, on_delete=models.CASCADE)
     member = models.ForeignKey(Member, on_delete=models.CASCADE)
@@ -87,6 +100,16 @@ class Loan(models.Model):
     loan_status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='Borrowed')
     librarian = models.ForeignKey(Librarian, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # loan-limit check: active loans of a member
+            models.Index(fields=['member', 'loan_status'], name='loan_member_status_idx'),
+            # a member's loans, newest first (my_loans, member-loans)
+            models.Index(fields=['member', '-issue_date'], name='loan_member_issued_idx'),
+            # nightly overdue sweep
+            models.Index(fields=['loan_status', 'due_date'], name='loan_status_due_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.due_date:
             # Set due date to 14 days from issue date if not provided
@@ -101,6 +124,7 @@ class Reservation(models.Model):
         ('Active', 'Active'),
         ('Fulfilled', 'Fulfilled'),
         ('Cancelled', 'Cancelled'),
+        ('Expired', 'Expired'),
     )
     reservationID = models.AutoField(primary_key=True)
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
@@ -108,6 +132,19 @@ class Reservation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Active')
     reservation_date = models.DateField(default=timezone.now)
     exp_return_date = models.DateField()
+    # Copy held for pickup once one came back, and the last day it can be picked up
+    copy = models.ForeignKey(BookCopy, on_delete=models.SET_NULL, null=True, blank=True, related_name='holds')
+    hold_expires = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['member', 'status'], name='reservation_member_idx'),
+            # per-book FIFO queue (copy is NULL while waiting): head of the queue and queue positions
+            models.Index(fields=['book', 'status', 'copy', 'reservation_date', 'reservationID'],
+                         name='reservation_waiting_idx'),
+            # nightly sweep of expired holds
+            models.Index(fields=['status', 'hold_expires'], name='reservation_hold_expires_idx'),
+        ]
 
 class Event(models.Model):
     eventID = models.AutoField(primary_key=True)
@@ -148,6 +185,11 @@ class Fine(models.Model):
     payment_status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='Unpaid')
     payment_date = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['payment_status'], name='fine_status_idx'),
+        ]
+
 class BookAuthor(models.Model):
     author = models.ForeignKey(Author, on_delete=models.CASCADE)
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
@@ -160,4 +202,23 @@ class BookCategory(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
 
     class Meta:
-        unique_together = ('category', 'book')
\ No newline at end of file
+        unique_together = ('category', 'book')
+
+class BookSearchToken(models.Model):
+    """Inverted index entry: one row per distinct token per book, maintained by signals."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=50)
+    weight = models.IntegerField(default=1)
+
+    class Meta:
+        # (token, book) doubles as the prefix-scan index for search queries
+        unique_together = ('token', 'book')
+
+
+class IdSequence(models.Model):
+    """Next unreserved primary key for a model, handed out in blocks by library_app.ids."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
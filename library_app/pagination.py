@@ -0,0 +1,196 @@
+import base64
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Model, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over the queryset's full ordering.
+
+    Pages are selected by comparing the whole ordering tuple with the last
+    row seen, ``(a > x) OR (a = x AND pk > y)``, instead of an OFFSET, so
+    every page costs the same and rows inserted while a client is paging
+    cannot shift or duplicate results. If the queryset is already ordered
+    (e.g. ``my_loans`` orders by ``-issue_date``) that ordering is kept and
+    the primary key is appended as the unique last key; the cursor carries
+    a value for every key, so any number of rows may share the leading
+    ones. Ordering fields must not be null.
+
+    The response body stays a plain list so existing clients keep working;
+    the next/previous cursors are sent in a ``Link`` header and the total
+    row count in ``X-Total-Count`` when the client asks for it with
+    ``?count=true``.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+    total_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        if self.count_requested(request):
+            self.total_count = queryset.count()
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async paginate_queryset, reading the page with the async ORM."""
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        if self.count_requested(request):
+            self.total_count = await queryset.acount()
+        return self.set_page([row async for row in page_queryset.aiterator()])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """The requested page of ``queryset`` plus one row, or None when pagination is off."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.total_count = None
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.reverse, self.cursor = self.decode_cursor(request)
+        ordering = [self.flip(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.after(ordering, self.cursor))
+        # One row more than a page tells whether there is anything beyond it
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = self.cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        pk_name = queryset.model._meta.pk.name
+        ordering = tuple(
+            field.replace('pk', pk_name, 1) if field.lstrip('-') == 'pk' else field
+            for field in queryset.query.order_by
+        ) or (pk_name,)
+        if pk_name not in {field.lstrip('-') for field in ordering}:
+            ordering += ('-' + pk_name if ordering[0].startswith('-') else pk_name,)
+        return ordering
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Rows strictly after ``position`` in ``ordering``.
+
+        The leading ``a >= x`` is implied by the OR below it, but keeps the
+        condition a range scan on an index led by the first key.
+        """
+        clauses, equal = [], {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            op = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{op}': value}))
+            equal[name] = value
+        first = ordering[0]
+        return Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]}) & reduce(
+            operator.or_, clauses
+        )
+
+    def position(self, row):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(row, dict):
+                value = row[name]
+            else:
+                value = row
+                for attr in name.split('__'):
+                    value = getattr(value, attr)
+            values.append(value.pk if isinstance(value, Model) else value)
+        return values
+
+    def encode_cursor(self, row, reverse):
+        # Dates and decimals travel as strings; the field lookups parse them back
+        payload = json.dumps({'r': reverse, 'p': self.position(row)}, default=str, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            reverse, position = bool(cursor['r']), cursor['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering) or None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        headers = {}
+        links = [
+            f'<{url}>; rel="{rel}"'
+            for url, rel in ((self.get_next_link(), 'next'), (self.get_previous_link(), 'prev'))
+            if url
+        ]
+        if links:
+            headers['Link'] = ', '.join(links)
+        if self.total_count is not None:
+            headers['X-Total-Count'] = str(self.total_count)
+        return Response(data, headers=headers)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
+
+
+class SearchResultPagination(KeysetPagination):
+    """
+    Keyset pagination over ranked search hits, best score first.
+
+    Hits are grouped per book, so ``book`` is the unique last key that
+    orders hits with equal scores.
+    """
+    ordering = ('-score', 'book')
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
@@ -44,7 +44,7 @@ class IsOwnerOrLibrarian(permissions.BasePermission):
             return True
         
         # Members can only access their own objects
-        if request.user.role == 'member' and hasattr(obj, 'member'):
-            return obj.member == request.user.member
+        if request.user.role == 'member' and hasattr(obj, 'member_id'):
+            return obj.member_id == request.user.member_id
         
         return False
\ No newline at end of file
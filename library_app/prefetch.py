@@ -0,0 +1,81 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import ManyRelatedField
+
+
+@lru_cache(maxsize=None)
+def plan_for_serializer(serializer_class):
+    """
+    Derive the (select_related, prefetch_related) lookups a serializer needs.
+
+    Every field whose ``source`` is a dotted path (``copy.book.title``) is
+    walked through the model's relations. Single-valued hops become a
+    ``select_related`` join; once the path crosses a many-valued relation
+    the remainder has to be fetched with ``prefetch_related``. Many-related
+    fields (e.g. ``Author.books`` under ``fields = '__all__'``) are
+    prefetched as well.
+    """
+    model = serializer_class.Meta.model
+    select_related, prefetch_related = set(), set()
+
+    for field in serializer_class().fields.values():
+        attrs = getattr(field, 'source_attrs', [])
+        if not isinstance(field, ManyRelatedField):
+            attrs = attrs[:-1]
+        current, path, many = model, [], False
+        for attr in attrs:
+            try:
+                relation = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not relation.is_relation:
+                break
+            path.append(attr)
+            many = many or relation.many_to_many or relation.one_to_many
+            current = relation.related_model
+        if path:
+            (prefetch_related if many else select_related).add('__'.join(path))
+
+    # 'loan__member' already joins 'loan'; keep only the longest paths
+    select_related = {
+        lookup for lookup in select_related
+        if not any(other.startswith(lookup + '__') for other in select_related)
+    }
+    return tuple(sorted(select_related)), tuple(sorted(prefetch_related))
+
+
+def plan_queryset(queryset, serializer_class, select_related=(), prefetch_related=()):
+    """Apply the serializer's derived plan plus any explicitly declared lookups."""
+    derived_select, derived_prefetch = plan_for_serializer(serializer_class)
+    select_lookups = set(derived_select) | set(select_related)
+    prefetch_lookups = set(derived_prefetch) | set(prefetch_related)
+    if select_lookups:
+        queryset = queryset.select_related(*sorted(select_lookups))
+    if prefetch_lookups:
+        queryset = queryset.prefetch_related(*sorted(prefetch_lookups))
+    return queryset
+
+
+class PrefetchPlanMixin:
+    """
+    ViewSet mixin that joins everything the serializer will touch up front.
+
+    The plan is derived from the serializer's dotted ``source=`` paths; a
+    view can add lookups the serializer reaches in code (e.g. inside a
+    ``SerializerMethodField``) with ``select_related_fields`` and
+    ``prefetch_related_fields``.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def get_queryset(self):
+        return self.plan_queryset(super().get_queryset())
+
+    def plan_queryset(self, queryset, serializer_class=None):
+        return plan_queryset(
+            queryset,
+            serializer_class or self.get_serializer_class(),
+            select_related=self.select_related_fields,
+            prefetch_related=self.prefetch_related_fields,
+        )
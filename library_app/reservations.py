@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .caching import invalidate_on_commit
+from .models import Book, BookCopy, Reservation
+
+BATCH_SIZE = 1000
+
+
+def hold_days():
+    """Days a returned copy is held for the next reservation, from the LIBRARY_HOLD_DAYS setting."""
+    return getattr(settings, 'LIBRARY_HOLD_DAYS', 3)
+
+
+def waiting_queue(book_id):
+    """
+    Active reservations of a book still waiting for a copy, first come first served.
+
+    Served by reservation_waiting_idx, so the head of the queue is one
+    index seek however long the queue is.
+    """
+    return Reservation.objects.filter(book_id=book_id, status='Active', copy__isnull=True).order_by(
+        'reservation_date', 'reservationID'
+    )
+
+
+def queue_position(reservation):
+    """
+    1-based place of a waiting reservation in its book's queue; None once it holds a copy or is closed.
+
+    A COUNT over the entries ahead of it in reservation_waiting_idx, which
+    holds every column the condition reads, so no table rows are read. The
+    cost grows with the position rather than O(log n): neither MySQL nor
+    SQLite can rank a key within a B-tree index, and a maintained rank
+    column would have to be rewritten for everyone behind a reservation
+    each time one ahead is served or cancelled.
+    """
+    if reservation.status != 'Active' or reservation.copy_id is not None:
+        return None
+    ahead = waiting_queue(reservation.book_id).filter(
+        Q(reservation_date__lt=reservation.reservation_date) |
+        Q(reservation_date=reservation.reservation_date, reservationID__lt=reservation.reservationID)
+    )
+    return ahead.count() + 1
+
+
+def hold_or_shelve(copy, from_status, today=None):
+    """
+    Give a copy that became free to the head of its book's queue, or shelve it.
+
+    The copy is first moved from ``from_status`` to Reserved with a
+    conditional UPDATE, so a copy can only be passed on once. The head of
+    the queue is then locked with SKIP LOCKED and claimed with another
+    conditional UPDATE. Two returns of the same title therefore serve two
+    different reservations. If nobody is waiting the copy becomes
+    Available again. The hold's ``hold_expires`` is ``hold_days()`` after
+    ``today``. Must run inside a transaction. Returns False if the copy
+    was not in ``from_status``.
+    """
+    if not BookCopy.objects.filter(copyID=copy.copyID, status=from_status).update(status='Reserved'):
+        return False
+    invalidate_on_commit('books')
+
+    expires = (today or timezone.now().date()) + timedelta(days=hold_days())
+    queue = waiting_queue(copy.book_id).select_for_update(skip_locked=True)
+    while (reservation := queue.first()) is not None:
+        claimed = Reservation.objects.filter(
+            reservationID=reservation.reservationID, status='Active', copy__isnull=True
+        ).update(copy_id=copy.copyID, hold_expires=expires)
+        if claimed:
+            copy.status = 'Reserved'
+            return True
+
+    BookCopy.objects.filter(copyID=copy.copyID).update(status='Available')
+    Book.objects.filter(bookID=copy.book_id).update(available_copies=F('available_copies') + 1)
+    copy.status = 'Available'
+    return True
+
+
+def release_hold(reservation):
+    """Pass the copy held for a reservation that is being closed on to the next one in line (inside a transaction)."""
+    if reservation.copy_id is None:
+        return
+    copy = BookCopy(copyID=reservation.copy_id, book_id=reservation.book_id)
+    Reservation.objects.filter(reservationID=reservation.reservationID).update(copy=None, hold_expires=None)
+    reservation.copy_id = None
+    hold_or_shelve(copy, 'Reserved')
+
+
+def expire_holds(today, batch_size=BATCH_SIZE):
+    """
+    Expire holds whose pickup deadline has passed and pass their copies on.
+
+    Works through the stale holds ``batch_size`` at a time, each batch in
+    its own transaction. The batch is marked Expired with one UPDATE, then
+    each copy goes to the next reservation in its queue or back on the
+    shelf. Returns the number of holds expired.
+    """
+    stale = Reservation.objects.filter(status='Active', copy__isnull=False, hold_expires__lt=today).order_by(
+        'reservationID'
+    )
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                stale.select_for_update(skip_locked=True).values_list('reservationID', 'copy', 'book')[:batch_size]
+            )
+            if not batch:
+                return expired
+            Reservation.objects.filter(reservationID__in=[row[0] for row in batch]).update(
+                status='Expired', copy=None, hold_expires=None
+            )
+            for _, copy_id, book_id in batch:
+                hold_or_shelve(BookCopy(copyID=copy_id, book_id=book_id), 'Reserved', today)
+        expired += len(batch)
@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+
+class _Routing:
+    """Where reads of the current request or command go."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_routing = ContextVar('library_db_routing', default=None)
+
+
+def replica_alias():
+    """The configured read replica's alias, or None when there is no replica."""
+    alias = getattr(settings, 'LIBRARY_REPLICA_DATABASE', 'replica')
+    return alias if alias in connections.settings else None
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """
+    Send reads inside the block to the replica, until the block writes.
+
+    After the first write every read goes to the primary again, so code
+    always sees its own writes. ``read_from_replica(False)`` keeps a block
+    on the primary inside a replica scope. Without a replica configured
+    this changes nothing.
+    """
+    routing = _Routing(enabled)
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica inside ``read_from_replica`` scopes.
+
+    Everything else, including every write and every read outside such a
+    scope, uses the primary. The replica is kept up to date by the
+    database's own replication, so it is never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None and routing.replica and not routing.wrote:
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == replica_alias():
+            return False
+        return None
+
+
+authenticator = JWTAuthentication()
+
+
+def token_user_id(request):
+    """User id in the request's JWT, checked but without a database query; None without a valid token."""
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serves GET/HEAD/OPTIONS requests from the replica.
+
+    A request that wrote pins its user to the primary for
+    ``LIBRARY_REPLICA_PIN_SECONDS``, so a client reading back a checkout or
+    return does not hit a replica that has not caught up yet. Pins live in
+    the default cache; set ``CACHE_URL`` to share them between worker
+    processes. Users are recognized from their JWT alone.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id = token_user_id(request)
+        with read_from_replica(self.use_replica(request, user_id)) as routing:
+            response = self.get_response(request)
+        self.pin(routing, user_id)
+        return response
+
+    async def __acall__(self, request):
+        user_id = token_user_id(request)
+        with read_from_replica(self.use_replica(request, user_id)) as routing:
+            response = await self.get_response(request)
+        self.pin(routing, user_id)
+        return response
+
+    def use_replica(self, request, user_id):
+        if request.method not in SAFE_METHODS or replica_alias() is None:
+            return False
+        return user_id is None or cache.get(_pin_key(user_id)) is None
+
+    def pin(self, routing, user_id):
+        if routing.wrote and user_id is not None and replica_alias() is not None:
+            cache.set(_pin_key(user_id), True, timeout=getattr(settings, 'LIBRARY_REPLICA_PIN_SECONDS', 10))
@@ -0,0 +1,117 @@
+import logging
+import re
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, When
+
+from .caching import invalidate_on_commit
+from .models import Book, BookSearchToken
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = BookSearchToken._meta.get_field('token').max_length
+MAX_QUERY_TERMS = 8
+
+# How much a hit in each field contributes to a book's score
+TITLE_WEIGHT = 3
+AUTHOR_WEIGHT = 2
+CATEGORY_WEIGHT = 1
+EDITION_WEIGHT = 1
+
+
+def tokenize(text):
+    """Lower-case word tokens, truncated to what the index column can hold."""
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+def book_tokens(book):
+    """
+    Map each token of a book to its weight.
+
+    Expects ``author_set`` and ``category_set`` to be prefetched when
+    indexing many books at once.
+    """
+    weights = {}
+    sources = [(book.title, TITLE_WEIGHT), (book.edition, EDITION_WEIGHT)]
+    sources += [(author.name, AUTHOR_WEIGHT) for author in book.author_set.all()]
+    sources += [(category.name, CATEGORY_WEIGHT) for category in book.category_set.all()]
+    for text, weight in sources:
+        for token in tokenize(text):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def build_index_rows(books):
+    return [
+        BookSearchToken(book=book, token=token, weight=weight)
+        for book in books
+        for token, weight in book_tokens(book).items()
+    ]
+
+
+def reindex_books(book_ids):
+    """Replace the index entries of the given books; ids of deleted books are skipped."""
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+    books = Book.objects.filter(pk__in=book_ids).prefetch_related('author_set', 'category_set')
+    with transaction.atomic():
+        BookSearchToken.objects.filter(book_id__in=book_ids).delete()
+        BookSearchToken.objects.bulk_create(build_index_rows(books), batch_size=1000)
+    invalidate_on_commit('books')
+
+
+def schedule_reindex(book_ids):
+    """
+    Reindex once the current transaction commits.
+
+    Deferring keeps the work out of cascaded deletes (a book's BookAuthor
+    rows are removed before the book itself) and lets rolled-back changes
+    leave the index untouched. The write has committed by then, so a
+    failed reindex (e.g. a lock timeout) is logged rather than failing the
+    request; ``rebuild_search_index`` repairs the index.
+    """
+    book_ids = set(book_ids)
+    if book_ids:
+        transaction.on_commit(lambda: reindex_or_log(book_ids), robust=True)
+
+
+def reindex_or_log(book_ids):
+    try:
+        reindex_books(book_ids)
+    except Exception:
+        logger.exception('Could not reindex books %s; run rebuild_search_index', sorted(book_ids))
+
+
+def search_books(query):
+    """
+    Return ranked hits as ``{'book': id, 'score': n}`` rows, best first.
+
+    Every query term must prefix-match at least one token of the book.
+    The lookups are range scans on the (token, book) index and the
+    grouping only touches matching rows, so cost depends on how many
+    books match rather than on the size of the catalog.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return BookSearchToken.objects.none().values('book')
+
+    matches = {
+        f'term_{i}': Max(Case(When(token__startswith=term, then=1), default=0, output_field=IntegerField()))
+        for i, term in enumerate(terms)
+    }
+    # Whole-word hits rank above prefix-only hits
+    score = Sum(Case(When(token__in=terms, then=F('weight') * 2), default=F('weight')))
+
+    prefix_filter = Q()
+    for term in terms:
+        prefix_filter |= Q(token__startswith=term)
+
+    return (
+        BookSearchToken.objects.filter(prefix_filter)
+        .values('book')
+        .annotate(score=score, **matches)
+        .filter(**{name: 1 for name in matches})
+        .order_by('-score', 'book')
+    )
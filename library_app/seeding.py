@@ -0,0 +1,289 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .exports import iterate_in_chunks
+from .fines import fine_for_days
+from .ids import book_ids, member_ids
+from .inventory import BATCH_SIZE, _batches, add_copies, reconcile_availability
+from .models import (
+    Author, Book, BookAuthor, BookCategory, BookCopy, Category, Fine, Librarian, Loan, Member, Reservation, User,
+)
+from .search import reindex_books
+
+SEED_PASSWORD = 'library-seed'
+LIBRARIAN_USERNAME = 'seed_librarian'
+LOAN_DAYS = 14
+
+WORDS = (
+    'silent', 'river', 'garden', 'night', 'stone', 'winter', 'glass', 'empire',
+    'shadow', 'ocean', 'letters', 'north', 'fire', 'city', 'forest', 'memory',
+    'light', 'harbor', 'secret', 'machine', 'summer', 'island', 'crown', 'road',
+)
+EDITIONS = ('1st', '2nd', '3rd', 'Revised', 'Anniversary')
+FIRST_NAMES = ('Ada', 'Ben', 'Chloe', 'Dev', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jonas', 'Kemi', 'Luca')
+LAST_NAMES = ('Adams', 'Brandt', 'Costa', 'Dubois', 'Eriksen', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jansen')
+GENRES = ('Fiction', 'History', 'Science', 'Poetry', 'Travel', 'Biography', 'Mystery', 'Fantasy', 'Children', 'Art')
+
+
+def member_username(member_id):
+    return f'member{member_id}'
+
+
+def seed_library(members=100, books=200, copies_per_book=3, loans=300, fines=100, reservations=50,
+                 authors=50, categories=10, seed=0, batch_size=BATCH_SIZE, report=None):
+    """
+    Fill the database with a reproducible library of the requested size.
+
+    The same ``seed`` gives the same names, titles, borrowers and dates.
+    Rows are generated and inserted ``batch_size`` at a time, each batch in
+    its own transaction, so memory stays flat at millions of rows; seed an
+    otherwise idle database. Every member gets a login
+    (``member<memberID>``), as does one librarian (``seed_librarian``), all
+    with the password ``SEED_PASSWORD``. Each loan borrows a different copy,
+    no member exceeds the loan limit, and copy statuses and
+    ``available_copies`` match the active loans.
+
+    ``report(step, rows, seconds)`` is called after each step. Returns the
+    number of rows created per step.
+    """
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    counts = {}
+
+    def done(step, rows, started):
+        counts[step] = rows
+        if report:
+            report(step, rows, time.monotonic() - started)
+
+    librarian = _seed_librarian()
+
+    started = time.monotonic()
+    seeded_members = _seed_members(rng, members, today, batch_size)
+    done('members', len(seeded_members), started)
+    counts['users'] = len(seeded_members)
+
+    started = time.monotonic()
+    author_ids = _seed_names(
+        Author, 'authorID', authors, lambda n: f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', batch_size
+    )
+    done('authors', len(author_ids), started)
+
+    started = time.monotonic()
+    category_ids = _seed_names(
+        Category, 'categoryID', categories, lambda n: f'{GENRES[n % len(GENRES)]} {n // len(GENRES) + 1}', batch_size
+    )
+    done('categories', len(category_ids), started)
+
+    started = time.monotonic()
+    seeded_books, copy_count = _seed_books(rng, books, copies_per_book, author_ids, category_ids, batch_size)
+    done('books', len(seeded_books), started)
+    counts['copies'] = copy_count
+
+    last_loan = Loan.objects.aggregate(last=Max('loanID'))['last'] or 0
+    started = time.monotonic()
+    loan_count = _seed_loans(rng, loans, seeded_books, copy_count, seeded_members, librarian, today, batch_size)
+    reconcile_availability()
+    done('loans', loan_count, started)
+
+    started = time.monotonic()
+    fine_count = _seed_fines(rng, fines, Loan.objects.filter(loanID__gt=last_loan), today, batch_size)
+    done('fines', fine_count, started)
+
+    started = time.monotonic()
+    reservation_count = _seed_reservations(rng, reservations, seeded_books, seeded_members, today, batch_size)
+    done('reservations', reservation_count, started)
+
+    # bulk_create skips the signals that keep the search index current
+    started = time.monotonic()
+    for batch in _batches(seeded_books, batch_size):
+        reindex_books(batch)
+    done('search index', len(seeded_books), started)
+    return counts
+
+
+def _seed_librarian():
+    librarian = Librarian.objects.filter(email_address='seed-librarian@example.com').first()
+    if librarian is None:
+        last_id = Librarian.objects.aggregate(last=Max('librarianID'))['last'] or 0
+        librarian = Librarian.objects.create(
+            librarianID=last_id + 1, name='Seed Librarian',
+            email_address='seed-librarian@example.com', phone_number='555-0100',
+        )
+    if not User.objects.filter(username=LIBRARIAN_USERNAME).exists():
+        User.objects.create_user(LIBRARIAN_USERNAME, password=SEED_PASSWORD, role='librarian', librarian=librarian)
+    return librarian
+
+
+def _seed_members(rng, count, today, batch_size):
+    """Members and their member logins; returns the new member ids."""
+    new_ids = member_ids.allocate(count)
+    # One hash for everyone: hashing is deliberately slow
+    password = make_password(SEED_PASSWORD)
+    for batch in _batches(new_ids, batch_size):
+        with transaction.atomic():
+            rows = Member.objects.bulk_create([
+                Member(
+                    memberID=member_id, name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    address=f'{member_id} {rng.choice(WORDS).title()} St',
+                    email_address=f'member{member_id}@example.com', phone_number=f'555-{member_id:07d}',
+                    start_date=today - timedelta(days=rng.randint(0, 1000)),
+                )
+                for member_id in batch
+            ])
+            User.objects.bulk_create([
+                User(username=member_username(member.memberID), password=password, role='member', member=member)
+                for member in rows
+            ])
+    return new_ids
+
+
+def _seed_names(model, pk_name, count, make_name, batch_size):
+    """Authors or categories, numbered after the existing ones; returns the new ids."""
+    first = (model.objects.aggregate(last=Max(pk_name))['last'] or 0) + 1
+    new_ids = list(range(first, first + count))
+    for batch in _batches(new_ids, batch_size):
+        model.objects.bulk_create([model(**{pk_name: pk, 'name': make_name(pk - first)}) for pk in batch])
+    return new_ids
+
+
+def _seed_books(rng, count, copies_per_book, author_ids, category_ids, batch_size):
+    """Books with their copies and author/category links; returns the new book ids and the copy count."""
+    new_ids = book_ids.allocate(count)
+    copies = 0
+    for batch in _batches(new_ids, batch_size):
+        with transaction.atomic():
+            rows = Book.objects.bulk_create([
+                Book(
+                    bookID=book_id, title=f'The {rng.choice(WORDS).title()} of {rng.choice(WORDS).title()}',
+                    edition=rng.choice(EDITIONS), total_copies=copies_per_book, available_copies=copies_per_book,
+                )
+                for book_id in batch
+            ])
+            copies += add_copies((book, copies_per_book) for book in rows)
+            BookAuthor.objects.bulk_create([
+                BookAuthor(book_id=book_id, author_id=author_id)
+                for book_id in batch
+                for author_id in rng.sample(author_ids, min(rng.randint(1, 2), len(author_ids)))
+            ])
+            BookCategory.objects.bulk_create([
+                BookCategory(book_id=book_id, category_id=rng.choice(category_ids))
+                for book_id in batch if category_ids
+            ])
+    return new_ids, copies
+
+
+def _pick(rng, rows, count):
+    """Iterator over ``count`` positions out of ``rows``, chosen by ``rng``, in ascending order."""
+    return iter(sorted(rng.sample(range(rows), min(count, rows))))
+
+
+def _seed_loans(rng, count, seeded_books, copy_count, seeded_members, librarian, today, batch_size):
+    """
+    Loans on distinct copies of the seeded books, out of their ``copy_count`` copies.
+
+    About half are returned; the rest stay Borrowed (or Overdue once past
+    due) and their copies are marked Borrowed. Copies are streamed one
+    batch of seeded books at a time, so only the chosen positions are held
+    in memory. The seeded ids need not be contiguous: books other writers
+    inserted in between are left alone.
+    """
+    if not seeded_books or not seeded_members:
+        return 0
+
+    def copies():
+        for batch in _batches(seeded_books, batch_size):
+            yield from BookCopy.objects.filter(book__in=batch).order_by('copyID').values_list('copyID', flat=True)
+
+    wanted = _pick(rng, copy_count, count)
+    next_wanted = next(wanted, None)
+    active_per_member = {}
+    loan_rows, active_copy_ids = [], []
+    created = 0
+
+    def flush():
+        with transaction.atomic():
+            Loan.objects.bulk_create(loan_rows)
+            BookCopy.objects.filter(copyID__in=active_copy_ids).update(status='Borrowed')
+        loan_rows.clear()
+        active_copy_ids.clear()
+
+    for position, copy_id in enumerate(copies()):
+        if next_wanted is None:
+            break
+        if position != next_wanted:
+            continue
+        next_wanted = next(wanted, None)
+        issue_date = today - timedelta(days=rng.randint(0, 60))
+        due_date = issue_date + timedelta(days=LOAN_DAYS)
+        member_id = rng.choice(seeded_members)
+        if rng.random() < 0.5 or active_per_member.get(member_id, 0) >= Loan.LOAN_LIMIT:
+            status = 'Returned'
+            return_date = min(issue_date + timedelta(days=rng.randint(1, 20)), today)
+        else:
+            status = 'Overdue' if due_date < today else 'Borrowed'
+            return_date = None
+            active_per_member[member_id] = active_per_member.get(member_id, 0) + 1
+            active_copy_ids.append(copy_id)
+        loan_rows.append(Loan(
+            copy_id=copy_id, member_id=member_id, librarian=librarian, issue_date=issue_date,
+            due_date=due_date, return_date=return_date, loan_status=status,
+        ))
+        created += 1
+        if len(loan_rows) >= batch_size:
+            flush()
+    if loan_rows:
+        flush()
+    return created
+
+
+def _seed_fines(rng, count, seeded_loans, today, batch_size):
+    """Fines on late loans, priced by the fine policy; only returned loans can have been paid."""
+    late = seeded_loans.filter(
+        Q(return_date__gt=F('due_date')) | Q(return_date__isnull=True, due_date__lt=today)
+    )
+    wanted = _pick(rng, late.count(), count)
+    next_wanted = next(wanted, None)
+    rows = []
+    created = 0
+    for position, loan in enumerate(iterate_in_chunks(late.values('loanID', 'due_date', 'return_date'))):
+        if next_wanted is None:
+            break
+        if position != next_wanted:
+            continue
+        next_wanted = next(wanted, None)
+        paid = loan['return_date'] is not None and rng.random() < 0.5
+        rows.append(Fine(
+            loan_id=loan['loanID'], amount=fine_for_days(((loan['return_date'] or today) - loan['due_date']).days),
+            payment_status='Paid' if paid else 'Unpaid', payment_date=loan['return_date'] if paid else None,
+        ))
+        if len(rows) >= batch_size:
+            Fine.objects.bulk_create(rows)
+            created += len(rows)
+            rows = []
+    Fine.objects.bulk_create(rows)
+    return created + len(rows)
+
+
+def _seed_reservations(rng, count, seeded_books, seeded_members, today, batch_size):
+    """Reservations of random seeded books by random seeded members, mostly still Active."""
+    if not seeded_books or not seeded_members:
+        return 0
+    created = 0
+    for batch in _batches(range(count), batch_size):
+        rows = []
+        for _ in batch:
+            reservation_date = today - timedelta(days=rng.randint(0, 30))
+            rows.append(Reservation(
+                book_id=rng.choice(seeded_books), member_id=rng.choice(seeded_members),
+                status=rng.choices(('Active', 'Fulfilled', 'Cancelled'), weights=(5, 3, 2))[0],
+                reservation_date=reservation_date, exp_return_date=reservation_date + timedelta(days=LOAN_DAYS),
+            ))
+        Reservation.objects.bulk_create(rows)
+        created += len(rows)
+    return created
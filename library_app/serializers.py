@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from .models import *
+from .instrumentation import TimedListSerializer
+from . import fines
 
 User = get_user_model()
 
@@ -15,6 +17,7 @@ class UserSerializer(serializers.ModelSerializer):
 class MemberSerializer(serializers.ModelSerializer):
     class Meta:
         model = Member
+        list_serializer_class = TimedListSerializer
         fields = ['memberID', 'name', 'email_address', 'phone_number', 'address', 'start_date']
         extra_kwargs = {
             'memberID': {'required': False},
@@ -29,6 +32,7 @@ class LibrarianSerializer(serializers.ModelSerializer):
 class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
+        list_serializer_class = TimedListSerializer
         fields = ['bookID', 'title', 'edition', 'total_copies', 'available_copies']
         extra_kwargs = {
             'bookID': {'required': False}
@@ -38,6 +42,7 @@ class BookCopySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = BookCopy
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
 
 class LoanSerializer(serializers.ModelSerializer):
@@ -46,6 +51,7 @@ class LoanSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Loan
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
         extra_kwargs = {
             'issue_date': {'required': False},
@@ -65,17 +71,20 @@ class EventSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Event
+        list_serializer_class = TimedListSerializer
         fields = ['eventID', 'name', 'start_date', 'end_date', 'event_time', 'librarian', 'librarian_name']
         read_only_fields = ['eventID', 'librarian']
 
 class AuthorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
 
 class FineSerializer(serializers.ModelSerializer):
@@ -85,12 +94,14 @@ class FineSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Fine
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
     
     def get_days_overdue(self, obj):
-        if obj.loan.return_date and obj.loan.due_date:
-            return (obj.loan.return_date - obj.loan.due_date).days
-        return 0
+        # FineViewSet annotates it (fines.with_overdue); fines fresh from a save are computed here
+        if hasattr(obj, 'days_overdue'):
+            return obj.days_overdue
+        return fines.days_overdue(obj.loan)
 
 class ReservationSerializer(serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.name', read_only=True)
@@ -98,4 +109,27 @@ class ReservationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Reservation
-        fields = '__all__'
\ No newline at end of file
+        list_serializer_class = TimedListSerializer
+        fields = '__all__'
+        read_only_fields = ['copy', 'hold_expires']
+
+class AccountSummarySerializer(serializers.Serializer):
+    memberID = serializers.IntegerField()
+    name = serializers.CharField()
+    active_loans = serializers.IntegerField()
+    overdue_loans = serializers.IntegerField()
+    unpaid_fines = serializers.DecimalField(max_digits=10, decimal_places=2)
+    active_reservations = serializers.IntegerField()
+    holds_ready = serializers.IntegerField()
+
+class LibrarySummarySerializer(serializers.Serializer):
+    books = serializers.IntegerField()
+    copies = serializers.IntegerField()
+    available_copies = serializers.IntegerField()
+    members = serializers.IntegerField()
+    active_loans = serializers.IntegerField()
+    overdue_loans = serializers.IntegerField()
+    unpaid_fines = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unpaid_fine_count = serializers.IntegerField()
+    active_reservations = serializers.IntegerField()
+    holds_ready = serializers.IntegerField()
\ No newline at end of file
@@ -0,0 +1,79 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import identity_cache
+from .caching import invalidate_on_commit
+from .models import Author, Book, BookAuthor, BookCategory, BookCopy, Category, Event, Librarian, Member, User
+from .search import schedule_reindex
+
+
+@receiver(post_save, sender=Book)
+def reindex_saved_book(sender, instance, **kwargs):
+    schedule_reindex([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created, **kwargs):
+    if not created:
+        schedule_reindex(BookAuthor.objects.filter(author=instance).values_list('book_id', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_books(sender, instance, created, **kwargs):
+    if not created:
+        schedule_reindex(BookCategory.objects.filter(category=instance).values_list('book_id', flat=True))
+
+
+@receiver(post_save, sender=BookAuthor)
+@receiver(post_delete, sender=BookAuthor)
+@receiver(post_save, sender=BookCategory)
+@receiver(post_delete, sender=BookCategory)
+def reindex_linked_book(sender, instance, **kwargs):
+    schedule_reindex([instance.book_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    identity_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def forget_member_users(sender, instance, **kwargs):
+    identity_cache.invalidate_linked(member_id=instance.pk)
+
+
+@receiver(post_save, sender=Librarian)
+@receiver(post_delete, sender=Librarian)
+def forget_librarian_users(sender, instance, **kwargs):
+    identity_cache.invalidate_linked(librarian_id=instance.pk)
+
+
+# Cached catalog namespaces whose responses include each model's rows
+CATALOG_DEPENDENCIES = {
+    Book: ('books', 'authors', 'categories'),
+    BookCopy: ('books',),
+    Author: ('authors',),
+    Category: ('categories',),
+    BookAuthor: ('books', 'authors'),
+    BookCategory: ('books', 'categories'),
+    Event: ('events',),
+    Librarian: ('events',),
+}
+
+
+def invalidate_catalog(sender, **kwargs):
+    invalidate_on_commit(*CATALOG_DEPENDENCIES[sender])
+
+
+for model in CATALOG_DEPENDENCIES:
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=BookAuthor)
+@receiver(m2m_changed, sender=BookCategory)
+def invalidate_catalog_links(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_catalog(sender)
@@ -0,0 +1,116 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Book, Fine, Loan, Member, Reservation
+
+
+def _per_member(queryset, member_path, aggregate, output_field):
+    """Correlated ``aggregate`` of a member's rows of ``queryset``, 0 when there are none."""
+    rows = (
+        queryset.filter(**{member_path: OuterRef('memberID')}).order_by()
+        .values(member_path).annotate(value=aggregate).values('value')
+    )
+    return Coalesce(Subquery(rows, output_field=output_field), Value(0), output_field=output_field)
+
+
+def with_account_summary(members, today=None):
+    """
+    Annotate members with their dashboard counters.
+
+    Each counter is a correlated subquery in the members' own SELECT, so a
+    summary of one member, or of a page of them, is one query whatever
+    their history. ``overdue_loans`` counts active loans past their due
+    date, whether or not the nightly job has marked them Overdue yet.
+    """
+    today = today or timezone.now().date()
+    active = Loan.objects.filter(loan_status__in=Loan.ACTIVE_STATUSES)
+    money = DecimalField(max_digits=10, decimal_places=2)
+    return members.annotate(
+        active_loans=_per_member(active, 'member', Count('loanID'), IntegerField()),
+        overdue_loans=_per_member(active.filter(due_date__lt=today), 'member', Count('loanID'), IntegerField()),
+        unpaid_fines=_per_member(
+            Fine.objects.filter(payment_status='Unpaid'), 'loan__member', Sum('amount'), money
+        ),
+        active_reservations=_per_member(
+            Reservation.objects.filter(status='Active'), 'member', Count('reservationID'), IntegerField()
+        ),
+        holds_ready=_per_member(
+            Reservation.objects.filter(status='Active', copy__isnull=False), 'member',
+            Count('reservationID'), IntegerField()
+        ),
+    )
+
+
+SUMMARY_FIELDS = ('memberID', 'name', 'active_loans', 'overdue_loans', 'unpaid_fines', 'active_reservations',
+                  'holds_ready')
+
+
+def member_summary(member_id, today=None):
+    """The counters of one member as a dict, or None if there is no such member."""
+    return with_account_summary(Member.objects.filter(memberID=member_id), today).values(*SUMMARY_FIELDS).first()
+
+
+async def amember_summary(member_id, today=None):
+    """Async member_summary."""
+    return await (
+        with_account_summary(Member.objects.filter(memberID=member_id), today).values(*SUMMARY_FIELDS).afirst()
+    )
+
+
+def _total(queryset, **aggregates):
+    """``aggregates`` over all rows of ``queryset`` as a one-row ``.values()`` query, without GROUP BY."""
+    return queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(**aggregates)
+
+
+def _scalar(queryset, aggregate):
+    """``aggregate`` over all rows of ``queryset`` as a scalar subquery."""
+    return Subquery(_total(queryset, value=aggregate).values('value'))
+
+
+LIBRARY_SUMMARY_FIELDS = ('books', 'copies', 'available_copies', 'members', 'active_loans', 'overdue_loans',
+                          'unpaid_fines', 'unpaid_fine_count', 'active_reservations', 'holds_ready')
+
+
+def _library_summary_query(today):
+    """
+    The library summary as a single query: the book totals plus one scalar subquery per counter.
+
+    Loans are counted through the active statuses, so the subqueries read
+    ``loan_status_due_idx`` instead of the whole loan history; fines and
+    reservations are narrowed by their status indexes the same way.
+    """
+    today = today or timezone.now().date()
+    active = Loan.objects.filter(loan_status__in=Loan.ACTIVE_STATUSES)
+    unpaid = Fine.objects.filter(payment_status='Unpaid')
+    reservations = Reservation.objects.filter(status='Active')
+    return _total(
+        Book.objects.all(),
+        books=Count('bookID'), copies=Sum('total_copies'), available_copies=Sum('available_copies'),
+        members=_scalar(Member.objects.all(), Count('memberID')),
+        active_loans=_scalar(active, Count('loanID')),
+        overdue_loans=_scalar(active.filter(due_date__lt=today), Count('loanID')),
+        unpaid_fines=_scalar(unpaid, Sum('amount')),
+        unpaid_fine_count=_scalar(unpaid, Count('fineID')),
+        active_reservations=_scalar(reservations, Count('reservationID')),
+        holds_ready=_scalar(reservations.filter(copy__isnull=False), Count('reservationID')),
+    ).values(*LIBRARY_SUMMARY_FIELDS)
+
+
+def _library_totals(summary):
+    for key in ('copies', 'available_copies'):
+        summary[key] = summary[key] or 0
+    summary['unpaid_fines'] = summary['unpaid_fines'] or Decimal('0.00')
+    return summary
+
+
+def library_summary(today=None):
+    """Library-wide counters for the librarian dashboard, in one query however large the library is."""
+    return _library_totals(_library_summary_query(today).get())
+
+
+async def alibrary_summary(today=None):
+    """Async library_summary."""
+    return _library_totals(await _library_summary_query(today).aget())
@@ -1,3 +1,1592 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import SkipTest, mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache as default_cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import exports, inventory
+from .authentication import identity_cache
+from .benchmarks import (
+    CONNECTION_MODES, DEFAULT_SCENARIOS, FAST_LISTS, SERVER_MODES, BenchmarkRunner, ConcurrencyBenchmark,
+    ConnectionModeBenchmark, SerializerBenchmark, compare,
+)
+from .caching import get_cache
+from .expressions import DaysBetween
+from .fastpath import FastListMixin
+from .fines import days_overdue, fine_for_days, with_overdue
+from .ids import IdAllocator, book_ids, member_ids
+from .instrumentation import RequestStats, metrics
+from .inventory import checkout_copy, lock_copy, reconcile_availability, release_copy
+from .models import *
+from .reservations import expire_holds, waiting_queue
+from .routers import ReplicaRouter, read_from_replica
+from .seeding import seed_library
+from .summaries import library_summary, member_summary
+
+
+class LibraryTestCase(TestCase):
+    """Shared fixtures: one librarian, one member and an API client for each."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = Librarian.objects.create(
+            librarianID=1, name='Librarian One',
+            email_address='librarian1@example.com', phone_number='123'
+        )
+        cls.librarian_user = User.objects.create_user(
+            username='librarian1', password='pass', role='librarian', librarian=cls.librarian
+        )
+        cls.member = Member.objects.create(
+            memberID=101, name='Member One', address='1 Main St',
+            email_address='member1@example.com', phone_number='456',
+            start_date=timezone.now().date()
+        )
+        cls.member_user = User.objects.create_user(
+            username='member1', password='pass', role='member', member=cls.member
+        )
+
+    def setUp(self):
+        # Blocks cached during earlier (rolled back) tests must not leak in
+        book_ids.discard_cached()
+        member_ids.discard_cached()
+        get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.librarian_user)
+        self.member_client = APIClient()
+        self.member_client.force_authenticate(self.member_user)
+
+    def make_book(self, title='Book', copies=1):
+        book = Book.objects.create(title=title, edition='1st', total_copies=copies, available_copies=copies)
+        for _ in range(copies):
+            BookCopy.objects.create(book=book)
+        return book
+
+    def make_loan(self, copy, member=None, days_ago=0, **kwargs):
+        issue_date = timezone.now().date() - timedelta(days=days_ago)
+        return Loan.objects.create(
+            copy=copy, member=member or self.member, librarian=self.librarian,
+            issue_date=issue_date, due_date=issue_date + timedelta(days=14), **kwargs
+        )
+
+
+class KeysetPaginationTests(LibraryTestCase):
+    def test_pages_follow_link_header_without_gaps_or_duplicates(self):
+        for i in range(5):
+            self.make_book(title=f'Book {i}')
+
+        seen = []
+        url = '/api/books/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data), 2)
+            seen.extend(book['bookID'] for book in response.data)
+            links = response.headers.get('Link', '')
+            url = next(
+                (part.split(';')[0].strip(' <>') for part in links.split(',') if 'rel="next"' in part),
+                None
+            )
+        self.assertEqual(seen, sorted(Book.objects.values_list('bookID', flat=True)))
+
+    def test_insert_during_paging_does_not_shift_pages(self):
+        for i in range(4):
+            self.make_book(title=f'Book {i}')
+        first = self.client.get('/api/books/?page_size=2')
+        self.make_book(title='Late arrival')
+        next_url = first.headers['Link'].split(';')[0].strip('<>')
+        second = self.client.get(next_url)
+        ids = [b['bookID'] for b in first.data] + [b['bookID'] for b in second.data]
+        self.assertEqual(ids, sorted(Book.objects.exclude(title='Late arrival').values_list('bookID', flat=True)))
+
+    def test_total_count_header_is_opt_in(self):
+        self.make_book(copies=3)
+        response = self.client.get('/api/book-copies/?page_size=1')
+        self.assertNotIn('X-Total-Count', response.headers)
+        response = self.client.get('/api/book-copies/?page_size=1&count=true')
+        self.assertEqual(response.headers['X-Total-Count'], '3')
+        self.assertEqual(len(response.data), 1)
+
+    def test_my_loans_keeps_issue_date_ordering(self):
+        book = self.make_book(copies=3)
+        copies = list(book.bookcopy_set.all())
+        for days_ago, copy in zip((5, 1, 3), copies):
+            self.make_loan(copy, days_ago=days_ago)
+        response = self.member_client.get('/api/loans/my_loans/?page_size=2')
+        dates = [loan['issue_date'] for loan in response.data]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertIn('rel="next"', response.headers['Link'])
+
+    def test_rows_sharing_the_leading_key_are_paged_through_once(self):
+        book = self.make_book(copies=7)
+        for copy in book.bookcopy_set.all():
+            self.make_loan(copy, days_ago=2)
+
+        pages, url = [], '/api/loans/my_loans/?page_size=3'
+        while url:
+            response = self.member_client.get(url)
+            pages.append([loan['loanID'] for loan in response.data])
+            url = next(
+                (part.split(';')[0].strip(' <>') for part in response.headers.get('Link', '').split(',')
+                 if 'rel="next"' in part),
+                None
+            )
+        seen = [loan_id for page in pages for loan_id in page]
+        self.assertEqual(seen, sorted(Loan.objects.values_list('loanID', flat=True), reverse=True))
+
+        # The previous link of the last page leads back to the page before it
+        prev_url = next(
+            part.split(';')[0].strip(' <>') for part in response.headers['Link'].split(',') if 'rel="prev"' in part
+        )
+        self.assertEqual([loan['loanID'] for loan in self.member_client.get(prev_url).data], pages[-2])
+
+    def test_malformed_cursor_is_not_found(self):
+        response = self.client.get('/api/books/', {'cursor': 'bm90LWpzb24'})
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryCountTests(LibraryTestCase):
+    """List endpoints must issue a fixed number of queries however many rows they return."""
+    MAX_QUERIES = 3
+
+    def seed(self, count):
+        event_date = timezone.now().date()
+        for _ in range(count):
+            book = self.make_book(copies=2)
+            author = Author.objects.create(authorID=Author.objects.count() + 1, name='Author')
+            BookAuthor.objects.create(author=author, book=book)
+            category = Category.objects.create(categoryID=Category.objects.count() + 1, name='Category')
+            BookCategory.objects.create(category=category, book=book)
+            loan = self.make_loan(book.bookcopy_set.first(), days_ago=20)
+            Fine.objects.create(loan=loan, amount='3.00')
+            Reservation.objects.create(book=book, member=self.member, exp_return_date=event_date)
+            Event.objects.create(
+                name='Story time', start_date=event_date, end_date=event_date,
+                event_time='10:00', librarian=self.librarian
+            )
+
+    def endpoints(self):
+        book_id = Book.objects.values_list('bookID', flat=True).first()
+        return [
+            (self.client, '/api/books/'),
+            (self.client, f'/api/books/{book_id}/copies/'),
+            (self.client, '/api/book-copies/'),
+            (self.client, '/api/book-copies/available/'),
+            (self.client, '/api/members/'),
+            (self.client, '/api/loans/'),
+            (self.client, '/api/events/'),
+            (self.client, '/api/reservations/'),
+            (self.client, '/api/fines/'),
+            (self.client, '/api/authors/'),
+            (self.client, '/api/categories/'),
+            (self.member_client, '/api/loans/my_loans/'),
+            (self.member_client, '/api/member-loans/'),
+            (self.member_client, '/api/reservations/'),
+        ]
+
+    def count_queries(self):
+        counts = {}
+        for client, url in self.endpoints():
+            # Count the database path, not catalog cache hits
+            get_cache().clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[url, client is self.member_client] = len(ctx.captured_queries)
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(2)
+        small = self.count_queries()
+        self.seed(20)
+        large = self.count_queries()
+        self.assertEqual(small, large)
+        for endpoint, queries in large.items():
+            self.assertLessEqual(queries, self.MAX_QUERIES, endpoint)
+
+
+class CatalogSearchTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dune = self.make_book(title='Dune')
+            self.messiah = self.make_book(title='Dune Messiah')
+            self.hobbit = self.make_book(title='The Hobbit')
+            herbert = Author.objects.create(authorID=1, name='Frank Herbert')
+            BookAuthor.objects.create(author=herbert, book=self.dune)
+            BookAuthor.objects.create(author=herbert, book=self.messiah)
+            fantasy = Category.objects.create(categoryID=1, name='Fantasy')
+            BookCategory.objects.create(category=fantasy, book=self.hobbit)
+
+    def search(self, query, **params):
+        response = self.member_client.get('/api/books/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [book['title'] for book in response.data]
+
+    def test_prefix_match_on_title_author_and_category(self):
+        self.assertEqual(self.search('du'), ['Dune', 'Dune Messiah'])
+        self.assertEqual(self.search('herb'), ['Dune', 'Dune Messiah'])
+        self.assertEqual(self.search('fant'), ['The Hobbit'])
+
+    def test_all_terms_must_match_and_better_hits_rank_first(self):
+        self.assertEqual(self.search('dune mess'), ['Dune Messiah'])
+        self.assertEqual(self.search('dune herbert'), ['Dune', 'Dune Messiah'])
+        self.assertEqual(self.search('messiah')[0], 'Dune Messiah')
+
+    def test_results_are_paginated(self):
+        first = self.member_client.get('/api/books/search/', {'q': 'dune', 'page_size': 1})
+        self.assertEqual(len(first.data), 1)
+        next_url = first.headers['Link'].split(';')[0].strip('<>')
+        second = self.member_client.get(next_url)
+        self.assertEqual([first.data[0]['title'], second.data[0]['title']], ['Dune', 'Dune Messiah'])
+
+    def test_hits_with_equal_scores_are_paged_through_once(self):
+        # More ties than DRF's cursor offset cutoff (1000) ever allowed
+        books = Book.objects.bulk_create(
+            Book(bookID=10000 + i, title='Same', edition='1st', total_copies=0, available_copies=0)
+            for i in range(1100)
+        )
+        BookSearchToken.objects.bulk_create(BookSearchToken(book=book, token='same', weight=3) for book in books)
+
+        seen, params = [], {'q': 'same', 'page_size': 400}
+        url = '/api/books/search/'
+        while url:
+            response = self.member_client.get(url, params)
+            seen.extend(book['bookID'] for book in response.data)
+            links = response.headers.get('Link', '')
+            url = next((part.split(';')[0].strip(' <>') for part in links.split(',') if 'rel="next"' in part), None)
+            params = None
+        self.assertEqual(seen, [book.bookID for book in books])
+
+    def test_index_follows_renames_and_unlinks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hobbit.title = 'There and Back Again'
+            self.hobbit.save()
+            BookAuthor.objects.filter(book=self.messiah).delete()
+        self.assertEqual(self.search('hobbit'), [])
+        self.assertEqual(self.search('there'), ['There and Back Again'])
+        self.assertEqual(self.search('herbert'), ['Dune'])
+
+    def test_deleting_a_book_removes_it_from_results(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dune.delete()
+        self.assertEqual(self.search('dune'), ['Dune Messiah'])
+
+    def test_rebuild_command_restores_index(self):
+        BookSearchToken.objects.all().delete()
+        BookSearchToken.objects.create(book=self.hobbit, token='stale')
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.search('herbert'), ['Dune', 'Dune Messiah'])
+        self.assertEqual(self.search('stale'), [])
+
+    def test_failed_reindex_is_logged_after_commit(self):
+        with mock.patch('library_app.search.reindex_books', side_effect=OperationalError('database is locked')):
+            with self.assertLogs('library_app.search', 'ERROR') as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.patch(f'/api/books/{self.dune.pk}/', {'title': 'Dune (1965)'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rebuild_search_index', logs.output[0])
+
+    def test_missing_query_is_rejected(self):
+        response = self.member_client.get('/api/books/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+class IdAllocatorTests(LibraryTestCase):
+    def test_sequence_starts_after_existing_rows(self):
+        Book.objects.create(bookID=40, title='Old', edition='1st', total_copies=0, available_copies=0)
+        self.assertEqual(self.make_book().bookID, 41)
+        self.assertEqual(Member.objects.create(
+            name='Member Two', address='2 Main St', email_address='member2@example.com',
+            phone_number='789', start_date=timezone.now().date()
+        ).memberID, 102)
+
+    def test_block_is_cached_only_after_commit(self):
+        allocator = IdAllocator('test-book', Book, block_size=10)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertEqual(allocator.allocate(3), [1, 2, 3])
+        self.assertEqual(allocator._take_cached(1), [])
+        callbacks[0]()
+        self.assertEqual(allocator.next_id(), 4)
+
+    def test_explicit_ids_are_skipped(self):
+        response = self.client.post('/api/books/', {
+            'bookID': 7, 'title': 'Explicit', 'edition': '1st', 'total_copies': 0
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post('/api/books/', {
+            'title': 'Next', 'edition': '1st', 'total_copies': 0
+        }).data['bookID'], 8)
+
+        self.assertEqual(self.client.post('/api/books/', {
+            'bookID': 'abc', 'title': 'Invalid', 'edition': '1st', 'total_copies': 0
+        }).status_code, 400)
+
+    def test_cached_id_taken_by_an_explicit_insert_is_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = book_ids.next_id()
+        # Another worker inserts the next cached ids with explicit values
+        for book_id in (first + 1, first + 3):
+            Book.objects.create(bookID=book_id, title='Taken', edition='1st', total_copies=0, available_copies=0)
+        response = self.client.post('/api/books/', {'title': 'Next', 'edition': '1st', 'total_copies': 1})
+        self.assertEqual((response.status_code, response.data['bookID']), (201, first + 2))
+        self.assertEqual(BookCopy.objects.filter(book=first + 2).count(), 1)
+        response = self.client.post('/api/books/bulk_ingest/', [
+            {'title': 'Batch', 'edition': '1st', 'total_copies': 0}
+        ] * 2, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn(first + 3, [book['bookID'] for book in response.data])
+
+
+    def test_member_ids_are_always_generated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = member_ids.next_id()
+        Member.objects.create(
+            memberID=first + 1, name='Taken', address='Street', email_address='taken@example.com',
+            phone_number='1', start_date=timezone.now().date()
+        )
+        response = self.client.post('/api/members/', {
+            'memberID': 5, 'name': 'New', 'address': 'Street', 'email_address': 'new@example.com',
+            'phone_number': '1'
+        })
+        self.assertEqual((response.status_code, response.data['memberID']), (201, first + 2))
+        self.assertEqual(User.objects.get(username='new').member_id, first + 2)
+
+
+class ConcurrentIdAllocationTests(TransactionTestCase):
+    """Several workers, each with its own cache, reserving ids in parallel threads."""
+    WORKERS = 4
+    THREADS_PER_WORKER = 3
+    ALLOCATIONS_PER_THREAD = 25
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('in-memory SQLite cannot serve concurrent connections')
+
+    def test_parallel_allocations_never_overlap(self):
+        allocated, errors = [], []
+
+        def allocate(allocator):
+            try:
+                for _ in range(self.ALLOCATIONS_PER_THREAD):
+                    allocated.append(allocator.next_id())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        allocators = [IdAllocator('stress-book', Book, block_size=5) for _ in range(self.WORKERS)]
+        # Created up front, so the threads only race on reserving blocks
+        allocators[0]._reserve(1)
+        threads = [
+            threading.Thread(target=allocate, args=(allocator,))
+            for allocator in allocators
+            for _ in range(self.THREADS_PER_WORKER)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(allocated), self.WORKERS * self.THREADS_PER_WORKER * self.ALLOCATIONS_PER_THREAD)
+        self.assertEqual(len(set(allocated)), len(allocated))
+        self.assertGreater(IdSequence.objects.get(name='stress-book').next_value, max(allocated))
+
+        # Every id is usable as a primary key
+        Book.objects.bulk_create(
+            Book(bookID=book_id, title='Stress', edition='1st', total_copies=0, available_copies=0)
+            for book_id in allocated
+        )
+        self.assertEqual(Book.objects.count(), len(allocated))
+
+    def test_views_reserve_ids_outside_their_transaction(self):
+        depths = []
+        reserve = IdAllocator._reserve
+
+        def record_depth(allocator, size):
+            depths.append(connection.in_atomic_block)
+            return reserve(allocator, size)
+
+        user = User.objects.create_user(username='librarian', password='pass', role='librarian')
+        client = APIClient()
+        client.force_authenticate(user)
+        book_ids.discard_cached()
+        with mock.patch.object(IdAllocator, '_reserve', record_depth):
+            response = client.post('/api/books/', {'title': 'Dune', 'edition': '1st', 'total_copies': 1})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(depths, [False])
+
+
+class BulkCopyProvisioningTests(LibraryTestCase):
+    def test_create_and_resize_use_batched_statements(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/books/', {'title': 'Textbook', 'edition': '1st', 'total_copies': 300})
+        self.assertEqual(response.status_code, 201)
+        copy_inserts = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('INSERT') and 'library_app_bookcopy' in q['sql']
+        ]
+        self.assertEqual(len(copy_inserts), 1)
+        book = Book.objects.get(pk=response.data['bookID'])
+        self.assertEqual(book.bookcopy_set.count(), 300)
+
+        response = self.client.patch(f'/api/books/{book.pk}/', {'total_copies': 100})
+        self.assertEqual(response.status_code, 200)
+        book.refresh_from_db()
+        self.assertEqual((book.total_copies, book.available_copies, book.bookcopy_set.count()), (100, 100, 100))
+
+    def test_cannot_remove_borrowed_copies(self):
+        book = self.make_book(copies=2)
+        BookCopy.objects.filter(book=book).update(status='Borrowed')
+        response = self.client.patch(f'/api/books/{book.pk}/', {'total_copies': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(book.bookcopy_set.count(), 2)
+
+    def test_copy_checked_out_while_removing_is_kept(self):
+        book = self.make_book(copies=3)
+        batches = inventory._batches
+
+        def checkout_first(copy_ids, size):
+            # A desk lends one of the chosen copies between the SELECT and the DELETE
+            checkout_copy(BookCopy.objects.get(copyID=copy_ids[0]))
+            return batches(copy_ids, size)
+
+        with mock.patch.object(inventory, '_batches', checkout_first):
+            self.assertFalse(inventory.remove_available_copies(book, 2))
+        self.assertEqual(book.bookcopy_set.count(), 3)
+
+    def test_bulk_ingest(self):
+        payload = [
+            {'title': f'Shipment {i}', 'edition': '2nd', 'total_copies': 40}
+            for i in range(25)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/books/bulk_ingest/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 25)
+        self.assertEqual(BookCopy.objects.filter(book__title__startswith='Shipment').count(), 1000)
+        self.assertEqual(len({book['bookID'] for book in response.data}), 25)
+        self.assertTrue(BookSearchToken.objects.filter(token='shipment').exists())
+
+    def test_bulk_ingest_rejects_invalid_rows(self):
+        response = self.client.post('/api/books/bulk_ingest/', [{'title': 'No edition'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Book.objects.filter(title='No edition').exists())
+
+
+class StreamingExportTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        book = self.make_book(title='Export, Me', copies=3)
+        for copy in book.bookcopy_set.all():
+            loan = self.make_loan(copy, days_ago=20)
+            Fine.objects.create(loan=loan, amount='3.00')
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_loans_csv(self):
+        response = self.client.get('/api/loans/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(self.read(response).splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['book_title'], 'Export, Me')
+        self.assertEqual(rows[0]['member_name'], 'Member One')
+
+    def test_fines_ndjson_is_fetched_in_chunks(self):
+        with mock.patch.object(exports, 'CHUNK_SIZE', 2), CaptureQueriesContext(connection) as ctx:
+            body = self.read(self.client.get('/api/fines/export/', {'output': 'ndjson'}))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['amount'] for row in rows], ['3.00'] * 3)
+        self.assertEqual(rows[0]['accrued_fine'], str(fine_for_days(6)))
+        self.assertEqual(rows[0]['book_title'], 'Export, Me')
+        fine_selects = [q for q in ctx.captured_queries if 'library_app_fine' in q['sql']]
+        self.assertEqual(len(fine_selects), 2)
+
+    def test_fines_csv_money_columns_share_a_format(self):
+        rows = list(csv.DictReader(self.read(self.client.get('/api/fines/export/')).splitlines()))
+        self.assertEqual({(row['amount'], row['accrued_fine']) for row in rows}, {('3.00', str(fine_for_days(6)))})
+        self.assertRegex(rows[0]['accrued_fine'], r'^\d+\.\d{2}$')
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get('/api/members/export/', {'output': 'xml'}).status_code, 400)
+
+
+class AvailabilityTests(LibraryTestCase):
+    def test_checkout_and_return_keep_counts_in_sync(self):
+        book = self.make_book(copies=2)
+        copy = book.bookcopy_set.first()
+        response = self.client.post('/api/loans/', {
+            'copy': copy.copyID, 'member': self.member.memberID,
+            'due_date': (timezone.now().date() + timedelta(days=14)).isoformat()
+        })
+        self.assertEqual(response.status_code, 201)
+        book.refresh_from_db()
+        self.assertEqual(book.available_copies, 1)
+
+        second = self.client.post('/api/loans/', {
+            'copy': copy.copyID, 'member': self.member.memberID,
+            'due_date': (timezone.now().date() + timedelta(days=14)).isoformat()
+        })
+        self.assertEqual(second.status_code, 400)
+
+        loan_id = response.data['loanID']
+        self.assertEqual(self.client.post(f'/api/loans/{loan_id}/return_book/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/loans/{loan_id}/return_book/').status_code, 400)
+        book.refresh_from_db()
+        self.assertEqual(book.available_copies, 2)
+
+    def test_resizing_keeps_checkouts_made_meanwhile(self):
+        book = self.make_book(copies=2)
+        add_copies = inventory.add_copies
+
+        def add_during_checkout(books_and_counts):
+            # A desk lends a copy after the update read the book
+            checkout_copy(book.bookcopy_set.first())
+            return add_copies(books_and_counts)
+
+        with mock.patch('library_app.views.add_copies', add_during_checkout):
+            response = self.client.patch(f'/api/books/{book.pk}/', {
+                'title': 'Resized', 'total_copies': 3, 'available_copies': 2
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_copies'], response.data['available_copies']), (3, 2))
+        book.refresh_from_db()
+        self.assertEqual((book.title, book.total_copies, book.available_copies), ('Resized', 3, 2))
+
+    def test_reconcile_fixes_drifted_counts(self):
+        drifted = self.make_book(copies=3)
+        in_sync = self.make_book(copies=2)
+        BookCopy.objects.filter(pk=drifted.bookcopy_set.first().pk).update(status='Lost')
+        Book.objects.filter(pk=drifted.pk).update(available_copies=7)
+        Book.objects.create(title='No copies', edition='1st', total_copies=0, available_copies=2)
+
+        out = StringIO()
+        call_command('reconcile_availability', dry_run=True, stdout=out)
+        self.assertIn('2 books', out.getvalue())
+        call_command('reconcile_availability', stdout=StringIO())
+        self.assertEqual(
+            list(Book.objects.order_by('bookID').values_list('available_copies', flat=True)),
+            [2, 2, 0]
+        )
+
+
+class ConcurrentAvailabilityTests(TransactionTestCase):
+    """Checkouts and returns racing from parallel threads must never lose an update."""
+    THREADS = 8
+    ROUNDS = 15
+
+    def run_threads(self, target):
+        errors = []
+
+        def run():
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('in-memory SQLite cannot serve concurrent connections')
+
+    def in_transaction(self, func, *args):
+        for attempt in range(50):
+            try:
+                with transaction.atomic():
+                    return func(*args)
+            except OperationalError:
+                # SQLite reports lock contention instead of waiting
+                time.sleep(0.005 * (attempt + 1))
+        raise AssertionError('database stayed locked')
+
+    def test_hammering_checkout_and_return(self):
+        book = Book.objects.create(bookID=1, title='Popular', edition='1st', total_copies=3, available_copies=3)
+        copy_ids = [BookCopy.objects.create(book=book).copyID for _ in range(3)]
+        winners = []
+
+        def checkout(copy_id):
+            return checkout_copy(lock_copy(copy_id))
+
+        def hammer():
+            for i in range(self.ROUNDS):
+                copy_id = copy_ids[i % len(copy_ids)]
+                if self.in_transaction(checkout, copy_id):
+                    winners.append(copy_id)
+                    self.in_transaction(lambda: release_copy(lock_copy(copy_id)))
+
+        self.run_threads(hammer)
+        book.refresh_from_db()
+        self.assertTrue(winners)
+        self.assertEqual(book.available_copies, 3)
+        self.assertEqual(BookCopy.objects.filter(status='Available').count(), 3)
+
+    def test_only_one_desk_wins_the_same_copy(self):
+        book = Book.objects.create(bookID=1, title='Popular', edition='1st', total_copies=1, available_copies=1)
+        copy_id = BookCopy.objects.create(book=book).copyID
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def race():
+            barrier.wait()
+            results.append(self.in_transaction(lambda: checkout_copy(lock_copy(copy_id))))
+
+        self.run_threads(race)
+        book.refresh_from_db()
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(book.available_copies, 0)
+
+
+class QueryPlanTests(LibraryTestCase):
+    """Hot-path queries must be served from an index, never a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        book = Book.objects.create(bookID=1, title='Book', edition='1st', total_copies=20, available_copies=20)
+        BookCopy.objects.bulk_create([BookCopy(book=book) for _ in range(20)])
+        today = timezone.now().date()
+        loans = Loan.objects.bulk_create([
+            Loan(copy=copy, member=cls.member, librarian=cls.librarian,
+                 issue_date=today, due_date=today)
+            for copy in BookCopy.objects.all()
+        ])
+        Fine.objects.bulk_create([Fine(loan=loan, amount='1.00') for loan in loans])
+        Reservation.objects.bulk_create([
+            Reservation(book=book, member=cls.member, exp_return_date=today) for _ in range(20)
+        ])
+
+    def full_scans(self, queryset):
+        vendor = connection.vendor
+        if vendor == 'mysql':
+            plan = queryset.explain(format='json')
+            return ['access_type ALL'] if '"access_type": "ALL"' in plan else []
+        plan = queryset.explain()
+        if vendor == 'sqlite':
+            return [line for line in plan.splitlines() if ' SCAN ' in f' {line} ' and 'USING' not in line]
+        if vendor == 'postgresql':
+            return [line for line in plan.splitlines() if 'Seq Scan' in line]
+        self.skipTest(f'no plan check for {vendor}')
+
+    def assertUsesIndex(self, queryset):
+        self.assertEqual(self.full_scans(queryset), [], queryset.query)
+
+    def test_loan_limit_check(self):
+        self.assertUsesIndex(Loan.objects.filter(member=self.member, loan_status='Borrowed'))
+
+    def test_member_loans_newest_first(self):
+        self.assertUsesIndex(Loan.objects.filter(member=self.member).order_by('-issue_date')[:100])
+
+    def test_copies_of_a_book(self):
+        self.assertUsesIndex(BookCopy.objects.filter(book_id=1, status='Available'))
+        self.assertUsesIndex(BookCopy.objects.filter(book_id=1).order_by('copyID')[:100])
+
+    def test_available_copies(self):
+        self.assertUsesIndex(BookCopy.objects.filter(status='Available').order_by('copyID')[:100])
+
+    def test_member_reservations(self):
+        self.assertUsesIndex(Reservation.objects.filter(member=self.member))
+
+    def test_unpaid_fines(self):
+        self.assertUsesIndex(Fine.objects.filter(payment_status='Unpaid'))
+
+    def test_detector_flags_unindexed_filters(self):
+        self.assertNotEqual(self.full_scans(Fine.objects.filter(amount='1.00')), [])
+
+
+class OverdueAccrualTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.now().date()
+        copies = list(self.make_book(copies=4).bookcopy_set.all())
+        self.late = self.make_loan(copies[0], days_ago=20)        # due 6 days ago
+        self.later = self.make_loan(copies[1], days_ago=24)       # due 10 days ago
+        self.on_time = self.make_loan(copies[2], days_ago=3)
+        self.returned = self.make_loan(copies[3], days_ago=30, loan_status='Returned')
+
+    def accrue(self, day=None):
+        out = StringIO()
+        call_command('accrue_fines', date=day or self.today, batch_size=1, stdout=out)
+        return out.getvalue()
+
+    def fines(self):
+        return dict(Fine.objects.values_list('loan_id', 'amount'))
+
+    def test_marks_overdue_and_accrues_fines_idempotently(self):
+        self.accrue()
+        self.assertEqual(
+            set(Loan.objects.filter(loan_status='Overdue').values_list('loanID', flat=True)),
+            {self.late.loanID, self.later.loanID}
+        )
+        self.assertEqual(self.fines(), {self.late.loanID: Decimal('3.00'), self.later.loanID: Decimal('5.00')})
+
+        output = self.accrue()
+        self.assertIn('Updated 0 and created 0 fines', output)
+        self.assertEqual(Fine.objects.count(), 2)
+
+        self.accrue(self.today + timedelta(days=2))
+        self.assertEqual(self.fines(), {self.late.loanID: Decimal('4.00'), self.later.loanID: Decimal('6.00')})
+
+    def test_paid_fines_are_not_repriced(self):
+        self.accrue()
+        Fine.objects.filter(loan=self.late).update(payment_status='Paid')
+        self.accrue(self.today + timedelta(days=2))
+        self.assertEqual(self.fines()[self.late.loanID], Decimal('3.00'))
+        self.assertEqual(Fine.objects.filter(loan=self.late).count(), 1)
+
+    def test_return_settles_the_accrued_fine(self):
+        self.accrue()
+        response = self.client.post(f'/api/loans/{self.late.loanID}/return_book/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Fine.objects.filter(loan=self.late).values_list('amount', flat=True)), [Decimal('3.00')])
+        self.assertEqual(Book.objects.get().available_copies, 4)
+
+    def test_overdue_annotations_follow_the_fine_policy(self):
+        with self.settings(LIBRARY_FINE_PER_DAY='0.25'):
+            loans = with_overdue(Loan.objects.exclude(pk=self.returned.pk), today=self.today).order_by('-days_overdue')
+            self.assertEqual(
+                [(loan.loanID, loan.days_overdue, loan.accrued_fine) for loan in loans],
+                [(self.later.loanID, 10, Decimal('2.50')), (self.late.loanID, 6, Decimal('1.50')),
+                 (self.on_time.loanID, 0, Decimal('0.00'))]
+            )
+            self.assertEqual(days_overdue(self.later, self.today), 10)
+            self.assertEqual(fine_for_days(10), Decimal('2.50'))
+
+    def test_fines_filter_and_sort_on_overdue_days(self):
+        self.accrue()
+        response = self.client.get('/api/fines/', {'ordering': '-days_overdue'})
+        self.assertEqual([fine['days_overdue'] for fine in response.data], [10, 6])
+        response = self.client.get('/api/fines/', {'min_amount': '4', 'ordering': '-days_overdue'})
+        self.assertEqual([fine['loan'] for fine in response.data], [self.later.loanID])
+
+        response = self.client.get('/api/fines/', {'ordering': 'days_overdue', 'page_size': 1})
+        self.assertEqual(response.data[0]['loan'], self.late.loanID)
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        self.assertEqual(self.client.get(next_url).data[0]['loan'], self.later.loanID)
+
+        self.assertEqual(self.client.get('/api/fines/', {'ordering': 'member'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/fines/', {'min_amount': 'ten'}).status_code, 400)
+
+    def test_accrual_is_computed_in_the_database(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.accrue()
+        loan_reads = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'library_app_loan' in q['sql'] and 'MIN(' not in q['sql']
+        ]
+        self.assertEqual(loan_reads, [])
+        self.assertEqual(self.fines(), {self.late.loanID: Decimal('3.00'), self.later.loanID: Decimal('5.00')})
+
+    def test_overdue_loans_count_towards_the_limit(self):
+        self.accrue()
+        book = self.make_book(copies=4)
+        for copy in book.bookcopy_set.all()[:2]:
+            self.make_loan(copy)
+        # 2 overdue + 1 on time + 2 new = 5 active loans
+        response = self.client.post('/api/loans/', {
+            'copy': book.bookcopy_set.filter(status='Available').last().copyID,
+            'member': self.member.memberID,
+            'due_date': (self.today + timedelta(days=14)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class IdentityCacheTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        identity_cache.clear()
+        self.addCleanup(identity_cache.clear)
+        response = self.client.post('/api/token/', {'username': 'member1', 'password': 'pass'})
+        self.token = response.data['access']
+        self.jwt_client = APIClient()
+        self.jwt_client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_repeated_requests_make_no_identity_queries(self):
+        self.assertEqual(self.jwt_client.get('/api/debug-token/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.jwt_client.get('/api/debug-token/')
+        self.assertEqual(response.data['member_id'], 101)
+        self.assertTrue(response.data['has_member'])
+
+    def test_user_changes_invalidate_the_cache(self):
+        self.jwt_client.get('/api/debug-token/')
+        self.member_user.is_active = False
+        self.member_user.save()
+        self.assertEqual(self.jwt_client.get('/api/debug-token/').status_code, 401)
+
+    def test_member_changes_invalidate_the_cache(self):
+        self.jwt_client.get('/api/debug-token/')
+        self.member.name = 'Renamed'
+        self.member.save()
+        with self.assertNumQueries(1):
+            self.jwt_client.get('/api/debug-token/')
+
+
+class CatalogCacheTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.book = self.make_book('Cached', copies=2)
+
+    def test_repeated_reads_are_served_from_memory(self):
+        first = self.member_client.get('/api/books/')
+        with self.assertNumQueries(0):
+            second = self.member_client.get('/api/books/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_matching_etag_returns_304(self):
+        etag = self.member_client.get(f'/api/books/{self.book.bookID}/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.member_client.get(f'/api/books/{self.book.bookID}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_after_commit(self):
+        etag = self.member_client.get('/api/books/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = 'Renamed'
+            self.book.save()
+        response = self.member_client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['title'], 'Renamed')
+
+    def test_checkout_invalidates_availability(self):
+        self.member_client.get('/api/books/')
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout_copy(self.book.bookcopy_set.first())
+        self.assertEqual(self.member_client.get('/api/books/').data[0]['available_copies'], 1)
+
+    def test_author_links_invalidate_author_list(self):
+        author = Author.objects.create(authorID=1, name='Writer')
+        self.member_client.get('/api/authors/')
+        with self.captureOnCommitCallbacks(execute=True):
+            author.books.add(self.book)
+        self.assertEqual(self.member_client.get('/api/authors/').data[0]['books'], [self.book.bookID])
+
+    def test_dummy_backend_turns_caching_off(self):
+        dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with self.settings(CACHES={'default': dummy, 'catalog': dummy}):
+            response = self.member_client.get('/api/books/')
+            self.assertNotIn('ETag', response)
+            Book.objects.filter(pk=self.book.pk).update(title='Renamed')
+            self.assertEqual(self.member_client.get('/api/books/').data[0]['title'], 'Renamed')
+
+
+    def test_file_backend_shares_entries_and_invalidations(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'}
+        with self.settings(CACHES={
+            'default': {**file_cache, 'LOCATION': os.path.join(directory, 'default')},
+            'catalog': {**file_cache, 'LOCATION': os.path.join(directory, 'catalog')},
+        }):
+            etag = self.member_client.get('/api/books/')['ETag']
+            with self.assertNumQueries(0):
+                self.assertEqual(self.member_client.get('/api/books/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.book.title = 'Renamed'
+                self.book.save()
+            self.assertEqual(self.member_client.get('/api/books/').data[0]['title'], 'Renamed')
+
+class InstrumentationTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.make_loan(self.make_book().bookcopy_set.first())
+
+    def test_requests_are_recorded_per_endpoint(self):
+        self.member_client.get('/api/loans/my_loans/')
+        self.member_client.get('/api/loans/my_loans/')
+        snapshot = self.client.get('/api/metrics/').data
+        endpoint = next(e for e in snapshot['endpoints'] if e['endpoint'] == 'loan-my-loans')
+        self.assertEqual(endpoint['requests'], 2)
+        self.assertGreater(endpoint['db_queries_per_request'], 0)
+        self.assertGreater(endpoint['serializer_time_ms'], 0)
+        self.assertIn('loans.my_loans', [timer['name'] for timer in snapshot['timers']])
+
+    def test_observations_above_the_largest_bucket_are_reported(self):
+        metrics.record_timer('slow.job', 11.0)
+        metrics.record_request('GET', 'slow', 200, 11.0, RequestStats())
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(next(t for t in response.data['timers'] if t['name'] == 'slow.job')['p95_ms'])
+        endpoint = next(e for e in response.data['endpoints'] if e['endpoint'] == 'slow')
+        self.assertEqual((endpoint['latency_p50_ms'], endpoint['latency_avg_ms']), (None, 11000.0))
+
+    def test_my_loans_makes_no_count_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.member_client.get('/api/loans/my_loans/')
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_prometheus_dump(self):
+        self.member_client.get('/api/member-loans/')
+        response = self.client.get('/api/metrics/prometheus/')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('library_request_duration_seconds_count{method="GET",endpoint="member-loans"} 1', body)
+        self.assertIn('library_db_queries_total{method="GET",endpoint="member-loans"}', body)
+
+    def test_database_connections_are_reported(self):
+        connection_created.send(sender=type(connection), connection=connection)
+        database = next(d for d in self.client.get('/api/metrics/').data['databases'] if d['alias'] == 'default')
+        self.assertEqual(database['conn_max_age'], connection.settings_dict['CONN_MAX_AGE'])
+        self.assertEqual(database['connections_opened'], 1)
+        body = self.client.get('/api/metrics/prometheus/').content.decode()
+        self.assertIn('library_db_connections_opened_total{alias="default"} 1', body)
+        self.assertIn('library_db_conn_health_checks{alias="default"}', body)
+
+    def test_metrics_are_librarian_only(self):
+        self.assertEqual(self.member_client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(self.member_client.get('/api/metrics/prometheus/').status_code, 403)
+
+
+class FastListTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        book = self.make_book(title='Fast', copies=3)
+        copies = list(book.bookcopy_set.all())
+        late = self.make_loan(copies[0], days_ago=30, return_date=timezone.now().date(), loan_status='Returned')
+        Fine.objects.create(loan=late, amount=Decimal('8.00'))
+        overdue = self.make_loan(copies[1], days_ago=20, loan_status='Overdue')
+        Fine.objects.create(loan=overdue, amount=Decimal('3.50'), payment_status='Paid',
+                            payment_date=timezone.now().date())
+        self.book = book
+
+    def test_fast_lists_match_serializers(self):
+        paths = [
+            (self.client, '/api/books/'), (self.client, '/api/book-copies/'),
+            (self.client, '/api/book-copies/available/'), (self.client, f'/api/books/{self.book.bookID}/copies/'),
+            (self.client, '/api/loans/'), (self.client, '/api/fines/'), (self.member_client, '/api/loans/my_loans/'),
+        ]
+        for client, path in paths:
+            fast = client.get(path)
+            get_cache().clear()
+            with mock.patch.object(FastListMixin, 'fast_list', False):
+                expected = client.get(path)
+            self.assertEqual(fast.status_code, 200, path)
+            self.assertTrue(fast.json(), path)
+            self.assertEqual(fast.json(), expected.json(), path)
+
+    def test_fast_path_pages_with_the_same_cursors(self):
+        response = self.client.get('/api/loans/?page_size=1')
+        self.assertEqual(len(response.data), 1)
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        self.assertEqual(self.client.get(next_url).data[0]['loanID'], Loan.objects.order_by('loanID')[1].loanID)
+
+    def test_days_between(self):
+        fines = Fine.objects.annotate(days=DaysBetween('loan__return_date', 'loan__due_date')).order_by('fineID')
+        self.assertEqual([fine.days for fine in fines], [16, None])
+
+    def test_serializer_benchmark(self):
+        seed_library(members=5, books=6, copies_per_book=2, loans=8, fines=4, reservations=1, seed=3)
+        results = SerializerBenchmark(rows=20, repeat=1).run()
+        self.assertEqual(set(results), set(FAST_LISTS))
+        self.assertTrue(all(result['fast_rows_per_s'] > 0 for result in results.values()))
+
+
+class QueryParamsTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Member.objects.create(
+            memberID=102, name='Member Two', address='2 Main St', email_address='member2@example.com',
+            phone_number='789', start_date=timezone.now().date()
+        )
+        self.book = self.make_book(title='Filtered', copies=3)
+        copies = list(self.book.bookcopy_set.all())
+        self.old = self.make_loan(copies[0], days_ago=40, loan_status='Returned', return_date=timezone.now().date())
+        self.overdue = self.make_loan(copies[1], days_ago=20, loan_status='Overdue')
+        self.recent = self.make_loan(copies[2], member=self.other, days_ago=1)
+
+    def loan_ids(self, params):
+        response = self.client.get('/api/loans/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [loan['loanID'] for loan in response.data]
+
+    def test_filters(self):
+        self.assertEqual(self.loan_ids({'status': 'Borrowed,Overdue'}), [self.overdue.loanID, self.recent.loanID])
+        self.assertEqual(self.loan_ids({'member': self.other.memberID}), [self.recent.loanID])
+        self.assertEqual(self.loan_ids({'book': self.book.bookID, 'status': 'Returned'}), [self.old.loanID])
+        issued_from = (timezone.now().date() - timedelta(days=30)).isoformat()
+        self.assertEqual(self.loan_ids({'issued_from': issued_from}), [self.overdue.loanID, self.recent.loanID])
+        response = self.client.get('/api/members/', {'name': 'two'})
+        self.assertEqual([member['memberID'] for member in response.data], [self.other.memberID])
+
+    def test_ordering(self):
+        self.assertEqual(self.loan_ids({'ordering': '-issue_date'}),
+                         [self.recent.loanID, self.overdue.loanID, self.old.loanID])
+        response = self.client.get('/api/loans/', {'ordering': 'due_date', 'page_size': 2})
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        self.assertEqual([loan['loanID'] for loan in self.client.get(next_url).data], [self.recent.loanID])
+
+    def test_ordering_by_a_shared_value_pages_through_every_row_once(self):
+        Book.objects.bulk_create(
+            Book(bookID=10000 + i, title='same', edition='1st', total_copies=0, available_copies=0)
+            for i in range(1100)
+        )
+        seen, url, params = [], '/api/books/', {'ordering': 'title', 'page_size': 400}
+        while url:
+            response = self.member_client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(book['bookID'] for book in response.data)
+            links = response.headers.get('Link', '')
+            url = next((part.split(';')[0].strip(' <>') for part in links.split(',') if 'rel="next"' in part), None)
+            params = None
+        self.assertEqual(len(seen), Book.objects.count())
+        self.assertEqual(len(set(seen)), len(seen))
+
+    def test_invalid_parameters(self):
+        for params in ({'issued_from': 'yesterday'}, {'member': 'me'}, {'ordering': 'return_date'},
+                       {'fields': 'loanID,secret'}):
+            response = self.client.get('/api/loans/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
+
+    def test_fields_narrow_the_response_and_the_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/loans/', {'fields': 'loanID,due_date,book_title'})
+        self.assertEqual(set(response.data[0]), {'loanID', 'due_date', 'book_title'})
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('"title"', sql)
+        self.assertNotIn('library_app_member', sql)
+        with mock.patch.object(FastListMixin, 'fast_list', False), CaptureQueriesContext(connection) as ctx:
+            expected = self.client.get('/api/loans/', {'fields': 'loanID,due_date,book_title'})
+        self.assertEqual(response.json(), expected.json())
+        self.assertNotIn('issue_date', ctx.captured_queries[-1]['sql'])
+
+        # Members are served from model instances, narrowed with .only()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/members/', {'fields': 'name'})
+        self.assertEqual(response.data[0], {'name': 'Member One'})
+        self.assertNotIn('address', ctx.captured_queries[-1]['sql'])
+
+        response = self.client.get(f'/api/loans/{self.recent.loanID}/', {'fields': 'member_name'})
+        self.assertEqual(response.data, {'member_name': 'Member Two'})
+        response = self.member_client.get('/api/loans/my_loans/', {'fields': 'loanID', 'status': 'Overdue'})
+        self.assertEqual(response.data, [{'loanID': self.overdue.loanID}])
+
+
+class BenchmarkHarnessTests(LibraryTestCase):
+    def test_seeding_is_consistent(self):
+        counts = seed_library(
+            members=10, books=8, copies_per_book=2, loans=12, fines=4, reservations=3, authors=3, categories=2, seed=1
+        )
+        self.assertEqual(counts, {
+            'members': 10, 'users': 10, 'authors': 3, 'categories': 2, 'books': 8, 'copies': 16,
+            'loans': 12, 'fines': 4, 'reservations': 3, 'search index': 8,
+        })
+        self.assertEqual(reconcile_availability(dry_run=True), 0)
+        active = Loan.objects.filter(loan_status__in=Loan.ACTIVE_STATUSES)
+        self.assertEqual(BookCopy.objects.filter(status='Borrowed').count(), active.count())
+        self.assertFalse(active.values('member').annotate(n=models.Count('loanID')).filter(n__gt=5).exists())
+        self.assertFalse(Book.objects.filter(bookauthor__isnull=True).exists())
+
+    def test_seeding_leaves_books_between_the_seeded_ids_alone(self):
+        outsider = Book.objects.create(bookID=1002, title='Outsider', edition='1st', total_copies=2,
+                                       available_copies=2)
+        BookCopy.objects.bulk_create([BookCopy(book=outsider), BookCopy(book=outsider)])
+        # Ids from a cached block and a new one, with another writer's book in the gap
+        with mock.patch.object(book_ids, 'allocate', return_value=[1000, 1001, 1003, 1004]):
+            counts = seed_library(members=4, books=4, copies_per_book=2, loans=8, fines=0, reservations=0, seed=2)
+        self.assertEqual(counts['loans'], 8)
+        self.assertFalse(Loan.objects.filter(copy__book=outsider).exists())
+
+    def test_seeding_is_deterministic(self):
+        def titles_and_borrowers():
+            seed_library(members=5, books=6, loans=8, fines=2, seed=7)
+            books = list(Book.objects.order_by('-bookID').values_list('title', 'edition')[:6])
+            loans = list(Loan.objects.order_by('-loanID').values_list('loan_status', 'issue_date')[:8])
+            return books, loans
+
+        self.assertEqual(titles_and_borrowers(), titles_and_borrowers())
+
+    def test_runner_reports_every_scenario(self):
+        seed_library(members=3, books=4, copies_per_book=2, loans=3, fines=1, reservations=2)
+        results = BenchmarkRunner(iterations=3, warmup=1).run()
+        self.assertEqual(set(results), set(DEFAULT_SCENARIOS))
+        for result in results.values():
+            self.assertEqual(result['requests'], 3)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_compare_flags_slower_and_chattier_endpoints(self):
+        baseline = {'checkout': {'p95_ms': 10.0, 'queries_avg': 8}, 'return': {'p95_ms': 10.0, 'queries_avg': 5}}
+        results = {'checkout': {'p95_ms': 15.0, 'queries_avg': 8}, 'return': {'p95_ms': 10.5, 'queries_avg': 6}}
+        regressions = compare(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('checkout: p95'))
+        self.assertTrue(regressions[1].startswith('return: queries'))
+
+
+class FixMemberAssociationsTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.members = [
+            Member.objects.create(
+                name=f'Member {n}', address='Street', email_address=f'reader{n}@example.com',
+                phone_number='1', start_date=timezone.now().date()
+            )
+            for n in range(5)
+        ]
+        # An unlinked member user with a member's email, and a taken username
+        User.objects.create_user('stray', email='reader0@example.com', password='x', role='member')
+        User.objects.create_user('reader1', password='x', role='librarian')
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('fix_member_associations', '--chunk-size=2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        output = self.run_command('--dry-run')
+        self.assertIn('Linked 1 users', output)
+        self.assertIn('Created 3 users', output)
+        self.assertEqual(User.objects.filter(member__in=self.members).count(), 0)
+
+    def test_links_and_creates_users_in_bulk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.run_command()
+        self.assertEqual(User.objects.get(username='stray').member, self.members[0])
+        created = User.objects.filter(member__in=self.members[2:])
+        self.assertEqual(sorted(created.values_list('username', flat=True)), ['reader2', 'reader3', 'reader4'])
+        self.assertTrue(created[0].check_password('member123'))
+        self.assertFalse(User.objects.filter(member=self.members[1]).exists())
+        # Per-chunk statements only, never one per row
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertIn('Linked 0 users', self.run_command())
+
+    def test_linked_users_leave_the_identity_cache(self):
+        stray = User.objects.get(username='stray')
+        identity_cache.set(stray.pk, stray)
+        self.addCleanup(identity_cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_command()
+        self.assertIsNone(identity_cache.get(stray.pk))
+
+
+class ListLoansCommandTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        copies = self.make_book('Report', copies=3).bookcopy_set.all()
+        self.old = self.make_loan(copies[0], days_ago=40, loan_status='Returned')
+        self.overdue = self.make_loan(copies[1], days_ago=20, loan_status='Overdue')
+        self.recent = self.make_loan(copies[2], days_ago=1)
+
+    def run_command(self, *args):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('list_loans', *args, stdout=out)
+        return out.getvalue(), len(ctx.captured_queries)
+
+    def test_one_joined_query_regardless_of_rows(self):
+        output, queries = self.run_command('--format=json')
+        rows = json.loads(output)
+        self.assertEqual([row['loanID'] for row in rows], [self.old.pk, self.overdue.pk, self.recent.pk])
+        self.assertEqual(rows[0]['username'], 'member1')
+        self.assertEqual(rows[0]['book_title'], 'Report')
+        self.assertEqual(queries, 1)
+
+    def test_filters(self):
+        since = (timezone.now().date() - timedelta(days=30)).isoformat()
+        output, _ = self.run_command('--format=csv', '--status=Overdue', '--status=Borrowed', f'--from={since}')
+        lines = output.splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'loanID')
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(self.overdue.pk), str(self.recent.pk)])
+        output, _ = self.run_command('--member=999')
+        self.assertEqual(len(output.splitlines()), 2)
+
+
+class ReservationQueueTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.book = self.make_book('Popular', copies=1)
+        self.copy = self.book.bookcopy_set.get()
+        checkout_copy(self.copy)
+        self.loan = self.make_loan(self.copy)
+        self.others = [
+            Member.objects.create(
+                name=f'Reader {n}', address='Street', email_address=f'queue{n}@example.com',
+                phone_number='1', start_date=timezone.now().date()
+            )
+            for n in range(3)
+        ]
+        today = timezone.now().date()
+        self.queue = [
+            Reservation.objects.create(
+                book=self.book, member=member, reservation_date=today - timedelta(days=3 - n), exp_return_date=today
+            )
+            for n, member in enumerate(self.others)
+        ]
+
+    def return_loan(self):
+        return self.client.post(f'/api/loans/{self.loan.pk}/return_book/')
+
+    def test_queue_positions(self):
+        positions = [self.client.get(f'/api/reservations/{r.pk}/position/').data['queue_position'] for r in self.queue]
+        self.assertEqual(positions, [1, 2, 3])
+
+    def test_return_holds_copy_for_head_of_queue(self):
+        self.assertEqual(self.return_loan().status_code, 200)
+        self.copy.refresh_from_db()
+        self.book.refresh_from_db()
+        head = Reservation.objects.get(pk=self.queue[0].pk)
+        self.assertEqual((self.copy.status, self.book.available_copies), ('Reserved', 0))
+        self.assertEqual(head.copy_id, self.copy.pk)
+        self.assertEqual(head.hold_expires, timezone.now().date() + timedelta(days=3))
+        self.assertEqual(head.exp_return_date, self.queue[0].exp_return_date)
+        self.assertEqual(self.client.get(f'/api/reservations/{self.queue[1].pk}/position/').data['queue_position'], 1)
+
+    def test_only_the_holder_can_borrow_a_held_copy(self):
+        self.return_loan()
+        due = (timezone.now().date() + timedelta(days=14)).isoformat()
+        data = {'copy': self.copy.pk, 'due_date': due}
+        self.assertEqual(self.client.post('/api/loans/', {**data, 'member': self.others[1].pk}).status_code, 400)
+        self.assertEqual(self.client.post('/api/loans/', {**data, 'member': self.others[0].pk}).status_code, 201)
+        self.assertEqual(Reservation.objects.get(pk=self.queue[0].pk).status, 'Fulfilled')
+        self.assertEqual(BookCopy.objects.get(pk=self.copy.pk).status, 'Borrowed')
+
+    def test_cancelling_a_hold_passes_the_copy_on(self):
+        self.return_loan()
+        self.client.post(f'/api/reservations/{self.queue[0].pk}/cancel/')
+        self.assertEqual(Reservation.objects.get(pk=self.queue[1].pk).copy_id, self.copy.pk)
+
+    def test_expired_holds_move_down_the_queue_then_to_the_shelf(self):
+        self.return_loan()
+        later = timezone.now().date() + timedelta(days=10)
+        for expected_holder in (self.queue[1], self.queue[2], None):
+            self.assertEqual(expire_holds(later), 1)
+            held_by = Reservation.objects.filter(copy=self.copy, status='Active').first()
+            self.assertEqual(held_by, expected_holder)
+            # A fresh hold runs from today, so push the clock past it for the next round
+            Reservation.objects.filter(copy=self.copy).update(hold_expires=later - timedelta(days=1))
+        self.copy.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual((self.copy.status, self.book.available_copies), ('Available', 1))
+        self.assertEqual(Reservation.objects.filter(status='Expired').count(), 3)
+
+    def test_head_of_queue_and_positions_use_the_index(self):
+        self.assertIn('reservation_waiting_idx', waiting_queue(self.book.pk)[:1].explain())
+        last = self.queue[-1]
+        ahead = waiting_queue(self.book.pk).filter(reservation_date__lt=last.reservation_date)
+        self.assertIn('COVERING INDEX reservation_waiting_idx', ahead.order_by().values('pk').explain())
+
+
+class BulkCirculationTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = [self.make_book(f'Desk {n}', copies=3) for n in range(4)]
+        self.copies = list(BookCopy.objects.filter(book__in=self.books).order_by('copyID'))
+
+    def bulk_checkout(self, copies, member=None):
+        return self.client.post(
+            '/api/loans/bulk_checkout/', {'member': (member or self.member).pk, 'copies': copies}, format='json'
+        )
+
+    def test_checkout_reports_each_item(self):
+        copy_ids = [copy.pk for copy in self.copies[:4]]
+        response = self.bulk_checkout(copy_ids + [copy_ids[0], 999999])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (4, 2))
+        self.assertEqual(
+            [result['error'] for result in response.data['results'][4:]],
+            ["Copy is listed more than once.", "Copy not found."]
+        )
+        self.assertEqual(BookCopy.objects.filter(pk__in=copy_ids, status='Borrowed').count(), 4)
+        self.assertEqual(Loan.objects.filter(copy__in=copy_ids, loan_status='Borrowed').count(), 4)
+        self.assertEqual(
+            [Book.objects.get(pk=book.pk).available_copies for book in self.books], [0, 2, 3, 3]
+        )
+
+    def test_checkout_enforces_loan_limit_across_the_batch(self):
+        response = self.bulk_checkout([copy.pk for copy in self.copies[:Loan.LOAN_LIMIT + 2]])
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (Loan.LOAN_LIMIT, 2))
+        self.assertEqual(response.data['results'][-1]['error'], "Member has reached maximum loan limit.")
+
+    def test_checkout_query_count_does_not_grow_with_batch(self):
+        members = [
+            Member.objects.create(
+                name=f'Pupil {n}', address='School', email_address=f'pupil{n}@example.com',
+                phone_number='1', start_date=timezone.now().date()
+            )
+            for n in range(6)
+        ]
+
+        def checkout(copies):
+            items = [{'copy': copy.pk, 'member': members[n % len(members)].pk} for n, copy in enumerate(copies)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/loans/bulk_checkout/', {'items': items}, format='json')
+            self.assertEqual(response.data['failed'], 0)
+            return len(queries)
+
+        # Only the availability UPDATEs vary: one per distinct number of copies taken from a book
+        self.assertLessEqual(checkout(self.copies[2:12]), checkout(self.copies[:2]) + 1)
+
+    def test_return_settles_fines_and_shelves_copies(self):
+        late = self.make_loan(self.copies[0], days_ago=20)
+        on_time = self.make_loan(self.copies[1])
+        for copy in self.copies[:2]:
+            checkout_copy(copy)
+        response = self.client.post(
+            '/api/loans/bulk_return/', {'copies': [self.copies[0].pk, self.copies[1].pk, self.copies[5].pk]},
+            format='json'
+        )
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (2, 1))
+        self.assertEqual(Fine.objects.get(loan=late).amount, Decimal(response.data['results'][0]['fine']))
+        self.assertIsNone(response.data['results'][1]['fine'])
+        self.assertFalse(Fine.objects.filter(loan=on_time).exists())
+        self.assertEqual(Loan.objects.filter(loan_status='Returned').count(), 2)
+        self.assertEqual(Book.objects.get(pk=self.books[0].pk).available_copies, 3)
+
+    def test_return_leaves_lost_copies_off_the_shelf(self):
+        for copy in self.copies[:2]:
+            self.make_loan(copy)
+            checkout_copy(copy)
+        BookCopy.objects.filter(pk=self.copies[1].pk).update(status='Lost')
+        response = self.client.post(
+            '/api/loans/bulk_return/', {'copies': [self.copies[0].pk, self.copies[1].pk]}, format='json'
+        )
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertEqual(BookCopy.objects.get(pk=self.copies[1].pk).status, 'Lost')
+        self.assertEqual(Book.objects.get(pk=self.books[0].pk).available_copies, 2)
+
+    def test_return_holds_copy_for_a_waiting_reservation(self):
+        loan = self.make_loan(self.copies[0])
+        checkout_copy(self.copies[0])
+        today = timezone.now().date()
+        reservation = Reservation.objects.create(
+            book=self.books[0], member=self.member, reservation_date=today, exp_return_date=today
+        )
+        self.client.post('/api/loans/bulk_return/', {'copies': [self.copies[0].pk]}, format='json')
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).copy_id, self.copies[0].pk)
+        self.assertEqual(BookCopy.objects.get(pk=self.copies[0].pk).status, 'Reserved')
+        self.assertEqual(Loan.objects.get(pk=loan.pk).loan_status, 'Returned')
+
+    def test_batch_size_is_limited(self):
+        response = self.client.post('/api/loans/bulk_return/', {'copies': list(range(1, 200))}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AccountSummaryTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        book = self.make_book('Summary', copies=3)
+        copies = list(book.bookcopy_set.order_by('copyID'))
+        for copy in copies[:2]:
+            checkout_copy(copy)
+        self.make_loan(copies[0])
+        late = self.make_loan(copies[1], days_ago=20)
+        returned = self.make_loan(copies[2], days_ago=30, loan_status='Returned', return_date=timezone.now().date())
+        Fine.objects.create(loan=late, amount=Decimal('3.00'))
+        Fine.objects.create(loan=returned, amount=Decimal('8.00'), payment_status='Paid')
+        today = timezone.now().date()
+        Reservation.objects.create(book=book, member=self.member, reservation_date=today, exp_return_date=today)
+
+    def test_member_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            summary = member_summary(self.member.pk)
+        self.assertEqual(
+            (summary['active_loans'], summary['overdue_loans'], summary['unpaid_fines'],
+             summary['active_reservations'], summary['holds_ready']),
+            (2, 1, Decimal('3.00'), 1, 0)
+        )
+
+    def test_library_summary_is_one_query_over_active_loans(self):
+        with CaptureQueriesContext(connection) as ctx:
+            summary = library_summary()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            (summary['members'], summary['active_loans'], summary['overdue_loans'], summary['unpaid_fine_count']),
+            (1, 2, 1, 1)
+        )
+        # Loans are only read through the active statuses, never the whole history
+        self.assertEqual(ctx.captured_queries[0]['sql'].count('"loan_status" IN'), 2)
+
+    def test_library_summary_of_an_empty_catalog(self):
+        Book.objects.all().delete()
+        summary = library_summary()
+        self.assertEqual((summary['books'], summary['copies'], summary['members']), (0, 0, 1))
+
+    def test_summary_endpoints(self):
+        response = self.client.get(f'/api/members/{self.member.pk}/summary/')
+        self.assertEqual((response.data['active_loans'], response.data['unpaid_fines']), (2, '3.00'))
+        self.assertEqual(self.client.get('/api/members/999999/summary/').status_code, 404)
+        self.assertEqual(self.client.get('/api/members/abc/summary/').status_code, 404)
+        self.assertEqual(self.member_client.get('/api/dashboard/').data, response.data)
+
+        dashboard = self.client.get('/api/dashboard/').data
+        self.assertEqual(
+            (dashboard['books'], dashboard['available_copies'], dashboard['overdue_loans'],
+             dashboard['unpaid_fines'], dashboard['active_reservations']),
+            (1, 1, 1, '3.00', 1)
+        )
+
+
+class AsyncViewTests(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        with self.captureOnCommitCallbacks(execute=True):
+            for title in ('Async River', 'Async Stone'):
+                self.make_loan(self.make_book(title).bookcopy_set.first())
+        Event.objects.create(
+            name='Reading', start_date=timezone.now().date(), end_date=timezone.now().date(),
+            event_time='10:00', librarian=self.librarian,
+        )
+
+    def auth(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    async def test_async_endpoints_match_drf(self):
+        for user, client, path, params in (
+            (self.member_user, self.member_client, 'books/', {'page_size': 1, 'count': 'true'}),
+            (self.member_user, self.member_client, 'books/search/', {'q': 'async'}),
+            (self.member_user, self.member_client, 'events/', {}),
+            (self.member_user, self.member_client, 'loans/my_loans/', {}),
+            (self.member_user, self.member_client, 'dashboard/', {}),
+            (self.librarian_user, self.client, 'dashboard/', {}),
+        ):
+            expected = await sync_to_async(client.get)(f'/api/{path}', params)
+            async_path = '/api/async/my-loans/' if path == 'loans/my_loans/' else f'/api/async/{path}'
+            response = await self.async_client.get(async_path, params, headers=self.auth(user))
+            self.assertEqual(response.status_code, 200, async_path)
+            self.assertTrue(response.json(), async_path)
+            self.assertEqual(response.json(), expected.json(), async_path)
+            self.assertEqual(response.has_header('Link'), expected.has_header('Link'), async_path)
+            self.assertEqual(response.get('X-Total-Count'), expected.get('X-Total-Count'), async_path)
+
+    async def test_async_permissions(self):
+        self.assertEqual((await self.async_client.get('/api/async/books/')).status_code, 401)
+        response = await self.async_client.get('/api/async/my-loans/', headers=self.auth(self.librarian_user))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.post('/api/async/books/', headers=self.auth(self.librarian_user))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_async_requests_are_instrumented(self):
+        await self.async_client.get('/api/async/my-loans/', headers=self.auth(self.member_user))
+        endpoint = next(e for e in metrics.snapshot()['endpoints'] if e['endpoint'] == 'async-my-loans')
+        self.assertGreater(endpoint['db_queries_per_request'], 0)
+        self.assertGreater(endpoint['serializer_time_ms'], 0)
+
+
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    def test_every_mode_serves_the_scenarios(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('in-memory SQLite cannot serve concurrent connections')
+        seed_library(members=3, books=4, copies_per_book=2, loans=3, fines=1, reservations=1)
+        results = ConcurrencyBenchmark(requests=4, threads=2, db_latency_ms=0).run(
+            ['my_loans', 'dashboard'], concurrency=(1, 2)
+        )
+        self.assertEqual(set(results), {'my_loans@1', 'my_loans@2', 'dashboard@1', 'dashboard@2'})
+        for modes in results.values():
+            self.assertEqual(set(modes), set(SERVER_MODES))
+            self.assertTrue(all(mode['requests'] == 4 for mode in modes.values()))
+
+    def test_connection_modes(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('in-memory SQLite connections are never closed')
+        seed_library(members=3, books=4, copies_per_book=2, loans=3, fines=1, reservations=1)
+        conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+        results = ConnectionModeBenchmark(iterations=3, warmup=1, connect_latency_ms=0, db_latency_ms=0).run(
+            ['my_loans']
+        )
+        self.assertEqual(set(results['my_loans']), set(CONNECTION_MODES))
+        self.assertEqual(results['my_loans']['per_request']['connects_per_request'], 1)
+        self.assertEqual(results['my_loans']['persistent']['connects_per_request'], 0)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], conn_max_age)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """A copy of the primary SQLite file, taken before a change, stands in for a lagging replica."""
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        # Checked here rather than at import, when the test database does not exist yet
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise SkipTest('needs SQLite database files')
+        cls.directory = tempfile.mkdtemp()
+        connections.settings['replica'] = {
+            **connections.settings['default'], 'NAME': os.path.join(cls.directory, 'replica.sqlite3')
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        get_cache().clear()
+        default_cache.clear()
+        identity_cache.clear()
+        self.desk, self.office = [
+            User.objects.create_user(name, password='pass', role='librarian', librarian=Librarian.objects.create(
+                librarianID=n, name=name, email_address=f'{name}@example.com', phone_number='1'
+            ))
+            for n, name in enumerate(('desk', 'office'), 1)
+        ]
+        Member.objects.create(
+            memberID=1, name='Before', address='Street', email_address='m@example.com',
+            phone_number='1', start_date=timezone.now().date()
+        )
+
+        # "Replicate", then change the primary behind the replica's back
+        connections['replica'].close()
+        connection.ensure_connection()
+        with closing(sqlite3.connect(connections['replica'].settings_dict['NAME'])) as replica:
+            connection.connection.backup(replica)
+        Member.objects.filter(pk=1).update(name='After')
+
+    def api(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def member_name(self, client):
+        return client.get('/api/members/1/').data['name']
+
+    def test_reads_use_the_replica_until_the_user_writes(self):
+        desk, office = self.api(self.desk), self.api(self.office)
+        self.assertEqual(self.member_name(desk), 'Before')
+        self.assertEqual(desk.patch('/api/members/1/', {'phone_number': '2'}).status_code, 200)
+        self.assertEqual(self.member_name(desk), 'After')
+        self.assertEqual(self.member_name(office), 'Before')
+
+    def test_scoped_reads_and_migrations(self):
+        self.assertEqual(Member.objects.get(pk=1).name, 'After')
+        with read_from_replica():
+            self.assertEqual(Member.objects.get(pk=1).name, 'Before')
+            Member.objects.filter(pk=1).update(phone_number='3')
+            self.assertEqual(Member.objects.get(pk=1).name, 'After')
+        self.assertFalse(ReplicaRouter().allow_migrate('replica', 'library_app'))
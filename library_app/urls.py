@@ -1,11 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     CustomTokenObtainPairView,
     BookViewSet,
     BookCopyViewSet,
+    DashboardView,
     DebugTokenView,
     MemberLoansView,
+    MetricsView,
+    PrometheusMetricsView,
     MemberViewSet,
     LoanViewSet,
     EventViewSet,
@@ -32,5 +36,13 @@ urlpatterns = [
     path('debug-token/', DebugTokenView.as_view(), name='debug-token'),
     path('my-loans/', LoanViewSet.as_view({'get': 'my_loans'}), name='my-loans'),
     path('member-loans/', MemberLoansView.as_view(), name='member-loans'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('metrics/prometheus/', PrometheusMetricsView.as_view(), name='metrics-prometheus'),
+    path('async/books/', async_views.book_list, name='async-book-list'),
+    path('async/books/search/', async_views.book_search, name='async-book-search'),
+    path('async/events/', async_views.event_list, name='async-event-list'),
+    path('async/my-loans/', async_views.my_loans, name='async-my-loans'),
+    path('async/dashboard/', async_views.dashboard, name='async-dashboard'),
     
 ]
\ No newline at end of file
@@ -4,14 +4,32 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.db import transaction, models
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta, datetime
 from .models import *
 from .serializers import *
 from .permissions import IsLibrarian, IsMember, IsLibrarianOrReadOnly
+from .pagination import KeysetPagination, SearchResultPagination
+from .prefetch import PrefetchPlanMixin, plan_queryset
+from .fastpath import FastListMixin
+from .filtering import QueryParamsMixin
+from .search import schedule_reindex, search_books
+from .exports import ExportMixin
+from .caching import CachedCatalogMixin, invalidate_on_commit
+from .instrumentation import metrics, timed
+from .circulation import MAX_BULK_ITEMS, bulk_checkout, bulk_return
+from .fines import settle_fine, with_overdue
+from .inventory import BATCH_SIZE, add_copies, checkout_copy, checkout_held_copy, release_copy, remove_available_copies
+from .reservations import queue_position, release_hold
+from .summaries import library_summary, member_summary
+from .ids import book_ids, create_with_new_ids, member_ids
 from rest_framework.views import APIView
+from django.http import HttpResponse
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
@@ -20,42 +38,61 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         data['username'] = self.user.username
         data['email'] = self.user.email
         
-        if self.user.role == 'librarian' and hasattr(self.user, 'librarian'):
-            data['librarian_id'] = self.user.librarian.librarianID
+        if self.user.role == 'librarian' and self.user.librarian_id is not None:
+            data['librarian_id'] = self.user.librarian_id
         
-        if self.user.role == 'member' and hasattr(self.user, 'member'):
-            data['member_id'] = self.user.member.memberID
+        if self.user.role == 'member' and self.user.member_id is not None:
+            data['member_id'] = self.user.member_id
             
         return data
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedCatalogMixin, QueryParamsMixin, FastListMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_namespace = 'books'
+    filter_fields = {'edition': 'edition'}
+    lookup_filters = {'title': 'title__icontains', 'min_available': 'available_copies__gte'}
+    ordering_fields = ('bookID', 'title', 'edition', 'total_copies', 'available_copies')
 
     @action(detail=True, methods=['get'])
     def copies(self, request, pk=None):
         """Get all copies of a specific book"""
         book = self.get_object()
-        copies = BookCopy.objects.filter(book=book)
-        serializer = BookCopySerializer(copies, many=True)
-        return Response(serializer.data)
+        copies = self.plan_queryset(BookCopy.objects.filter(book=book), BookCopySerializer)
+        return self.list_page(copies, BookCopySerializer)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked prefix search over titles, editions, authors and categories"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "Query parameter 'q' is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = SearchResultPagination()
+        hits = paginator.paginate_queryset(search_books(query), request, view=self)
+        books = self.get_queryset().in_bulk([hit['book'] for hit in hits])
+        hits = [hit for hit in hits if hit['book'] in books]
+
+        serializer = self.get_serializer([books[hit['book']] for hit in hits], many=True)
+        results = serializer.data
+        for row, hit in zip(results, hits):
+            row['score'] = hit['score']
+        return paginator.get_paginated_response(results)
 
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """Create a book and its copies"""
         book_data = request.data.copy()
         
         # Auto-generate bookID if not provided
-        if 'bookID' not in book_data or not book_data['bookID']:
-            max_id = Book.objects.aggregate(max_id=models.Max('bookID'))['max_id']
-            if max_id is None:
-                book_data['bookID'] = 1
-            else:
-                book_data['bookID'] = max_id + 1
+        if 'bookID' in book_data and not book_data['bookID']:
+            del book_data['bookID']
         
         total_copies = int(book_data.get('total_copies', 0))
         available_copies = int(book_data.get('available_copies', total_copies))
@@ -63,14 +100,20 @@ class BookViewSet(viewsets.ModelViewSet):
         # Restrict available_copies to total_copies
         book_data['available_copies'] = min(available_copies, total_copies)
         
-        # Create the book
         serializer = self.get_serializer(data=book_data)
         serializer.is_valid(raise_exception=True)
-        book = serializer.save()
-        
-        # Create book copies
-        for _ in range(total_copies):
-            BookCopy.objects.create(book=book, status='Available')
+
+        def create_book(new_ids=None):
+            book = serializer.save() if new_ids is None else serializer.save(bookID=new_ids[0])
+            # Create book copies
+            add_copies([(book, total_copies)])
+
+        if 'bookID' in serializer.validated_data:
+            book_ids.reserve_past(serializer.validated_data['bookID'])
+            with transaction.atomic():
+                create_book()
+        else:
+            create_with_new_ids(book_ids, 1, create_book)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -80,10 +123,13 @@ class BookViewSet(viewsets.ModelViewSet):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
         
-        # Don't allow changing the bookID
+        # Don't allow changing the bookID. available_copies follows the
+        # copies' statuses and is only ever adjusted relative to the stored
+        # value, so a client's (possibly stale) copy of it is ignored.
         data = request.data.copy()
-        if 'bookID' in data:
-            del data['bookID']
+        for field in ('bookID', 'available_copies'):
+            if field in data:
+                del data[field]
         
         serializer = self.get_serializer(instance, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
@@ -94,91 +140,161 @@ class BookViewSet(viewsets.ModelViewSet):
         
         if new_total > current_total:
             # Add more copies
-            for _ in range(new_total - current_total):
-                BookCopy.objects.create(book=instance, status='Available')
-            instance.available_copies += (new_total - current_total)
+            add_copies([(instance, new_total - current_total)])
         elif new_total < current_total:
             # Remove copies (only available ones)
-            copies_to_remove = current_total - new_total
-            available_copies = BookCopy.objects.filter(book=instance, status='Available')[:copies_to_remove]
-            if available_copies.count() < copies_to_remove:
+            if not remove_available_copies(instance, current_total - new_total):
                 return Response(
                     {"error": "Cannot reduce total copies below number of borrowed copies"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            available_copies.delete()
-            instance.available_copies = max(0, instance.available_copies - copies_to_remove)
         
-        instance.total_copies = new_total
-        instance.save()
-        serializer.save()
+        if new_total != current_total:
+            # F() updates keep checkouts and returns committed meanwhile
+            delta = new_total - current_total
+            Book.objects.filter(pk=instance.pk).update(
+                total_copies=F('total_copies') + delta,
+                available_copies=Greatest(F('available_copies') + delta, 0),
+            )
+            instance.refresh_from_db(fields=['total_copies', 'available_copies'])
+            invalidate_on_commit('books')
+        
+        # Save only the plain fields; a full-row save would write back the counts read above
+        fields = [name for name in serializer.validated_data if name not in ('total_copies', 'available_copies')]
+        for name in fields:
+            setattr(instance, name, serializer.validated_data[name])
+        if fields:
+            instance.save(update_fields=fields)
         
-        return Response(serializer.data)
+        return Response(self.get_serializer(instance).data)
 
     def partial_update(self, request, *args, **kwargs):
         """Handle PATCH requests"""
         kwargs['partial'] = True
         return self.update(request, *args, **kwargs)
 
-class BookCopyViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk_ingest(self, request):
+        """Create many books and all of their copies in a few batched statements"""
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                {"error": "Expected a non-empty list of books."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        books_data = []
+        for item in request.data:
+            # IDs are allocated below, which also spares a uniqueness query per book
+            book_data = {key: value for key, value in dict(item).items() if key != 'bookID'}
+            try:
+                total_copies = int(book_data.get('total_copies', 0))
+                available_copies = int(book_data.get('available_copies', total_copies))
+            except (TypeError, ValueError):
+                total_copies = available_copies = None
+            if total_copies is not None:
+                book_data['available_copies'] = min(available_copies, total_copies)
+            books_data.append(book_data)
+
+        serializer = self.get_serializer(data=books_data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        def create_books(new_ids):
+            books = Book.objects.bulk_create(
+                [Book(bookID=bookID, **data) for bookID, data in zip(new_ids, serializer.validated_data)],
+                batch_size=BATCH_SIZE
+            )
+            add_copies((book, book.total_copies) for book in books)
+            # bulk_create skips post_save, so the search index and cached catalog are updated here
+            schedule_reindex(book.bookID for book in books)
+            invalidate_on_commit('books')
+            return books
+
+        books = create_with_new_ids(book_ids, len(serializer.validated_data), create_books)
+
+        return Response(self.get_serializer(books, many=True).data, status=status.HTTP_201_CREATED)
+
+class BookCopyViewSet(QueryParamsMixin, FastListMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = BookCopy.objects.all()
     serializer_class = BookCopySerializer
     permission_classes = [IsLibrarian]
+    filter_fields = {'status': 'status', 'book': 'book'}
+    ordering_fields = ('copyID', 'status')
     
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get all available book copies"""
-        copies = BookCopy.objects.filter(status='Available')
-        serializer = self.get_serializer(copies, many=True)
-        return Response(serializer.data)
+        copies = self.filter_queryset(self.get_queryset().filter(status='Available'))
+        return self.list_page(copies)
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(ExportMixin, QueryParamsMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
     permission_classes = [IsLibrarian]
+    filter_fields = {'email': 'email_address'}
+    lookup_filters = {'name': 'name__icontains', 'joined_from': 'start_date__gte', 'joined_to': 'start_date__lte'}
+    ordering_fields = ('memberID', 'name', 'start_date')
+    export_filename = 'members'
+    export_columns = {
+        'memberID': 'memberID',
+        'name': 'name',
+        'email_address': 'email_address',
+        'phone_number': 'phone_number',
+        'address': 'address',
+        'start_date': 'start_date',
+    }
+
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Loan, fine and reservation counters of a member in one query"""
+        try:
+            summary = member_summary(Member._meta.pk.to_python(pk))
+        except DjangoValidationError:
+            summary = None
+        if summary is None:
+            return Response({"error": "Member not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(AccountSummarySerializer(summary).data)
 
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """Create a member and associated user account"""
         member_data = request.data.copy()
         
-        # Auto-generate memberID
-        max_id = Member.objects.aggregate(max_id=models.Max('memberID'))['max_id']
-        if max_id is None:
-            member_data['memberID'] = 101  # Start from 101 for new members
-        else:
-            member_data['memberID'] = max_id + 1
+        # memberID is always generated below
+        member_data.pop('memberID', None)
         
         # Set start_date if not provided
         if 'start_date' not in member_data:
             member_data['start_date'] = timezone.now().date().isoformat()
         
-        # Create member first
         serializer = self.get_serializer(data=member_data)
         serializer.is_valid(raise_exception=True)
-        member = serializer.save()
-        
-        # Create user account
-        username = member_data.get('email_address', '').split('@')[0]
-        if not username:
-            username = f"member{member.memberID}"
-        
-        # Check if user already exists
-        if not User.objects.filter(username=username).exists():
-            user = User.objects.create_user(
-                username=username,
-                email=member_data['email_address'],
-                password='member123',  # Default password
-                role='member'
-            )
-            user.member = member
-            user.save()
-        else:
-            # If user exists, associate with member
-            user = User.objects.get(username=username)
-            user.member = member
-            user.role = 'member'
-            user.save()
+
+        def create_member(new_ids):
+            # Create member first
+            member = serializer.save(memberID=new_ids[0])
+        
+            # Create user account
+            username = member_data.get('email_address', '').split('@')[0]
+            if not username:
+                username = f"member{member.memberID}"
+        
+            # Check if user already exists
+            if not User.objects.filter(username=username).exists():
+                user = User.objects.create_user(
+                    username=username,
+                    email=member_data['email_address'],
+                    password='member123',  # Default password
+                    role='member'
+                )
+                user.member = member
+                user.save()
+            else:
+                # If user exists, associate with member
+                user = User.objects.get(username=username)
+                user.member = member
+                user.role = 'member'
+                user.save()
+
+        create_with_new_ids(member_ids, 1, create_member)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -202,45 +318,52 @@ class MemberViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class LoanViewSet(viewsets.ModelViewSet):
+class LoanViewSet(ExportMixin, QueryParamsMixin, FastListMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
     permission_classes = [IsLibrarian]
+    filter_fields = {
+        'status': 'loan_status', 'member': 'member', 'book': 'copy__book', 'copy': 'copy', 'librarian': 'librarian',
+    }
+    lookup_filters = {
+        'issued_from': 'issue_date__gte', 'issued_to': 'issue_date__lte',
+        'due_from': 'due_date__gte', 'due_to': 'due_date__lte',
+        'returned_from': 'return_date__gte', 'returned_to': 'return_date__lte',
+    }
+    ordering_fields = ('loanID', 'issue_date', 'due_date', 'loan_status')
+    export_filename = 'loans'
+    export_columns = {
+        'loanID': 'loanID',
+        'copy': 'copy',
+        'book_title': 'copy__book__title',
+        'member': 'member',
+        'member_name': 'member__name',
+        'issue_date': 'issue_date',
+        'due_date': 'due_date',
+        'return_date': 'return_date',
+        'loan_status': 'loan_status',
+        'librarian': 'librarian',
+    }
     
     # Override action map to set different permissions for my_loans
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    @timed('loans.my_loans')
     def my_loans(self, request):
         """Get all loans for the current member"""
-        # Debug prints
-        print(f"User: {request.user}")
-        print(f"User role: {request.user.role}")
-        print(f"Is authenticated: {request.user.is_authenticated}")
-        print(f"Has member attribute: {hasattr(request.user, 'member')}")
-        
         if not request.user.is_authenticated:
             return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
             
         if request.user.role != 'member':
             return Response({"error": "Not a member"}, status=status.HTTP_403_FORBIDDEN)
         
-        try:
-            member = request.user.member
-            print(f"Member ID: {member.memberID}")
-            loans = Loan.objects.filter(member=member).order_by('-issue_date')
-            print(f"Found {loans.count()} loans")
-            serializer = self.get_serializer(loans, many=True)
-            return Response(serializer.data)
-        except AttributeError:
+        if request.user.member_id is None:
             return Response(
                 {"error": "User is not properly associated with a member"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
-            print(f"Error: {str(e)}")
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+
+        loans = self.get_queryset().filter(member_id=request.user.member_id).order_by('-issue_date')
+        return self.list_page(self.filter_queryset(loans))
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -248,9 +371,9 @@ class LoanViewSet(viewsets.ModelViewSet):
         copy_id = request.data.get('copy')
         member_id = request.data.get('member')
         
-        # Validate book copy availability
-        copy = get_object_or_404(BookCopy, copyID=copy_id)
-        if copy.status != 'Available':
+        # Validate book copy availability; the row stays locked until commit
+        copy = get_object_or_404(BookCopy.objects.select_for_update(), copyID=copy_id)
+        if copy.status not in ('Available', 'Reserved'):
             return Response(
                 {"error": "This book copy is not available for loan."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -258,25 +381,23 @@ class LoanViewSet(viewsets.ModelViewSet):
         
         # Check member loan limit
         member = get_object_or_404(Member, memberID=member_id)
-        active_loans = Loan.objects.filter(member=member, loan_status='Borrowed').count()
-        if active_loans >= 5:
+        active_loans = Loan.objects.filter(member=member, loan_status__in=Loan.ACTIVE_STATUSES).count()
+        if active_loans >= Loan.LOAN_LIMIT:
             return Response(
                 {"error": "Member has reached maximum loan limit."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Set librarian
-        if not hasattr(self.request.user, 'librarian'):
+        if self.request.user.librarian_id is None:
             return Response(
                 {"error": "User is not associated with a librarian."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        librarian = self.request.user.librarian
-        
         # Prepare data for serializer
         loan_data = request.data.copy()
-        loan_data['librarian'] = librarian.librarianID
+        loan_data['librarian'] = self.request.user.librarian_id
         
         # Ensure dates are properly formatted
         if 'issue_date' not in loan_data:
@@ -291,14 +412,18 @@ class LoanViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=loan_data)
         serializer.is_valid(raise_exception=True)
         
-        loan = serializer.save()
-        
-        copy.status = 'Borrowed'
-        copy.save()
+        # A Reserved copy can only go to the member it is held for
+        if copy.status == 'Reserved':
+            checked_out = checkout_held_copy(copy, member.memberID)
+        else:
+            checked_out = checkout_copy(copy)
+        if not checked_out:
+            return Response(
+                {"error": "This book copy is not available for loan."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        book = copy.book
-        book.available_copies -= 1
-        book.save()
+        loan = serializer.save()
         
         response_serializer = self.get_serializer(loan)
         headers = self.get_success_headers(response_serializer.data)
@@ -317,45 +442,92 @@ class LoanViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update loan status
+        # Update loan status; the conditional update stops a double return
+        return_date = timezone.now().date()
+        returned = Loan.objects.filter(loanID=loan.loanID).exclude(loan_status='Returned').update(
+            loan_status='Returned', return_date=return_date
+        )
+        if not returned:
+            return Response(
+                {"error": "This book has already been returned."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         loan.loan_status = 'Returned'
-        loan.return_date = timezone.now().date()
-        loan.save()
+        loan.return_date = return_date
         
-        copy = loan.copy
-        copy.status = 'Available'
-        copy.save()
+        release_copy(loan.copy)
         
-        book = copy.book
-        book.available_copies += 1
-        book.save()
-        
-        # Check for overdue and create fine if necessary (Just a note: we have not implemented this in the model)
-        if loan.return_date > loan.due_date:
-            days_overdue = (loan.return_date - loan.due_date).days
-            fine_amount = days_overdue * 0.50  # $0.50 per day
-            Fine.objects.create(loan=loan, amount=fine_amount)
+        # Settle the fine if the book came back late
+        settle_fine(loan)
         
         serializer = self.get_serializer(loan)
         return Response(serializer.data)
 
+    def bulk_response(self, results):
+        failed = sum(1 for result in results if result['status'] == 'failed')
+        return Response({'results': results, 'succeeded': len(results) - failed, 'failed': failed})
+
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def bulk_checkout(self, request):
+        """Check out many copies in one request; takes items of copy and member, or one member and its copies"""
+        if self.request.user.librarian_id is None:
+            return Response(
+                {"error": "User is not associated with a librarian."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        items = request.data.get('items')
+        if items is None and 'member' in request.data:
+            items = [{'copy': copy_id, 'member': request.data['member']} for copy_id in request.data.get('copies') or []]
+        try:
+            items = [{'copy': int(item['copy']), 'member': int(item['member'])} for item in items or []]
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "Each item needs a numeric copy and member."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not items or len(items) > MAX_BULK_ITEMS:
+            return Response(
+                {"error": f"Send between 1 and {MAX_BULK_ITEMS} items."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        due_date = request.data.get('due_date')
+        if due_date:
+            try:
+                due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "Invalid due_date format. Use YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        return self.bulk_response(bulk_checkout(items, self.request.user.librarian_id, due_date or None))
+
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def bulk_return(self, request):
+        """Return many copies in one request, settling fines for the late ones"""
+        try:
+            copy_ids = [int(copy_id) for copy_id in request.data.get('copies') or []]
+        except (TypeError, ValueError):
+            return Response({"error": "copies must be a list of copy IDs."}, status=status.HTTP_400_BAD_REQUEST)
+        if not copy_ids or len(copy_ids) > MAX_BULK_ITEMS:
+            return Response(
+                {"error": f"Send between 1 and {MAX_BULK_ITEMS} copies."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.bulk_response(bulk_return(copy_ids))
+
     @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """Delete a loan and update book availability if necessary"""
         instance = self.get_object()
         
         # If the loan is still active (book not returned), update the book copy status
-        if instance.loan_status == 'Borrowed':
-            copy = instance.copy
-            book = copy.book
-            
-            # Update copy status back to available
-            copy.status = 'Available'
-            copy.save()
-            
-            # Update book available copies
-            book.available_copies += 1
-            book.save()
+        if instance.loan_status in Loan.ACTIVE_STATUSES:
+            release_copy(instance.copy)
         
         # Delete any associated fines
         Fine.objects.filter(loan=instance).delete()
@@ -365,24 +537,27 @@ class LoanViewSet(viewsets.ModelViewSet):
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(CachedCatalogMixin, QueryParamsMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_namespace = 'events'
+    filter_fields = {'librarian': 'librarian'}
+    lookup_filters = {'name': 'name__icontains', 'starts_from': 'start_date__gte', 'starts_to': 'start_date__lte'}
+    ordering_fields = ('eventID', 'name', 'start_date', 'end_date')
 
     def create(self, request, *args, **kwargs):
         """Create an event"""
         event_data = request.data.copy()
         
         # Get librarian
-        if not hasattr(request.user, 'librarian'):
+        if request.user.librarian_id is None:
             return Response(
                 {"error": "User is not associated with a librarian."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        librarian = request.user.librarian
-        event_data['librarian'] = librarian.librarianID
+        event_data['librarian'] = request.user.librarian_id
         
         # Parse dates if they're strings
         if 'start_date' in event_data and isinstance(event_data['start_date'], str):
@@ -456,15 +631,19 @@ class EventViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(QueryParamsMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
     permission_classes = [IsAuthenticated]
+    filter_fields = {'status': 'status', 'member': 'member', 'book': 'book', 'copy': 'copy'}
+    lookup_filters = {'reserved_from': 'reservation_date__gte', 'reserved_to': 'reservation_date__lte'}
+    ordering_fields = ('reservationID', 'reservation_date', 'exp_return_date', 'status')
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         if self.request.user.role == 'member':
-            return Reservation.objects.filter(member=self.request.user.member)
-        return Reservation.objects.all()
+            return queryset.filter(member_id=self.request.user.member_id)
+        return queryset
 
     def perform_create(self, serializer):
         if self.request.user.role == 'member':
@@ -473,7 +652,31 @@ class ReservationViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # A held copy goes to the next in line when its reservation is closed
+        reservation = serializer.save()
+        if reservation.status != 'Active':
+            release_hold(reservation)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        release_hold(instance)
+        instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def position(self, request, pk=None):
+        """Place of a reservation in its book's queue"""
+        reservation = self.get_object()
+        return Response({
+            'reservationID': reservation.reservationID,
+            'status': reservation.status,
+            'held_copy': reservation.copy_id,
+            'queue_position': queue_position(reservation),
+        })
+
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def cancel(self, request, pk=None):
         """Cancel a reservation"""
         reservation = self.get_object()
@@ -485,13 +688,37 @@ class ReservationViewSet(viewsets.ModelViewSet):
         
         reservation.status = 'Cancelled'
         reservation.save()
+        release_hold(reservation)
         serializer = self.get_serializer(reservation)
         return Response(serializer.data)
 
-class FineViewSet(viewsets.ModelViewSet):
+class FineViewSet(ExportMixin, QueryParamsMixin, FastListMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Fine.objects.all()
     serializer_class = FineSerializer
     permission_classes = [IsLibrarian]
+    export_filename = 'fines'
+    export_columns = {
+        'fineID': 'fineID',
+        'loan': 'loan',
+        'member_name': 'loan__member__name',
+        'book_title': 'loan__copy__book__title',
+        'amount': 'amount',
+        'payment_status': 'payment_status',
+        'payment_date': 'payment_date',
+        'days_overdue': 'days_overdue',
+        'accrued_fine': 'accrued_fine',
+    }
+    # e.g. ?min_amount=10&ordering=-days_overdue
+    filter_fields = {'status': 'payment_status', 'loan': 'loan', 'member': 'loan__member', 'book': 'loan__copy__book'}
+    lookup_filters = {
+        'min_amount': 'amount__gte', 'max_amount': 'amount__lte', 'min_days_overdue': 'days_overdue__gte',
+        'paid_from': 'payment_date__gte', 'paid_to': 'payment_date__lte',
+    }
+    ordering_fields = ('fineID', 'amount', 'days_overdue', 'accrued_fine')
+
+    def get_queryset(self):
+        # Overdue days and accrued fine come from the database, so they can be filtered and sorted on
+        return with_overdue(super().get_queryset(), 'loan__')
 
     @action(detail=True, methods=['post'])
     def pay_fine(self, request, pk=None):
@@ -509,15 +736,21 @@ class FineViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(fine)
         return Response(serializer.data)
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(CachedCatalogMixin, QueryParamsMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_namespace = 'authors'
+    lookup_filters = {'name': 'name__icontains'}
+    ordering_fields = ('authorID', 'name')
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedCatalogMixin, QueryParamsMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_namespace = 'categories'
+    lookup_filters = {'name': 'name__icontains'}
+    ordering_fields = ('categoryID', 'name')
 
 
 class DebugTokenView(APIView):
@@ -529,44 +762,70 @@ class DebugTokenView(APIView):
             'user': request.user.username,
             'role': request.user.role,
             'is_authenticated': request.user.is_authenticated,
-            'has_member': hasattr(request.user, 'member'),
-            'has_librarian': hasattr(request.user, 'librarian'),
-            'member_id': request.user.member.memberID if hasattr(request.user, 'member') else None,
-            'librarian_id': request.user.librarian.librarianID if hasattr(request.user, 'librarian') else None,
+            'has_member': request.user.member_id is not None,
+            'has_librarian': request.user.librarian_id is not None,
+            'member_id': request.user.member_id,
+            'librarian_id': request.user.librarian_id,
         })
 
 class MemberLoansView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @timed('loans.member_loans')
     def get(self, request):
         """Get all loans for the current member"""
-        # Debug prints for debugging purposes only
-        print(f"User: {request.user}")
-        print(f"User role: {request.user.role}")
-        print(f"Is authenticated: {request.user.is_authenticated}")
-        print(f"Has member attribute: {hasattr(request.user, 'member')}")
-        
         if not request.user.is_authenticated:
             return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
             
         if request.user.role != 'member':
             return Response({"error": "Not a member"}, status=status.HTTP_403_FORBIDDEN)
         
-        try:
-            member = request.user.member
-            print(f"Member ID: {member.memberID}")
-            loans = Loan.objects.filter(member=member).order_by('-issue_date')
-            print(f"Found {loans.count()} loans")
-            serializer = LoanSerializer(loans, many=True)
-            return Response(serializer.data)
-        except AttributeError:
+        if request.user.member_id is None:
             return Response(
                 {"error": "User is not properly associated with a member"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
-            print(f"Error: {str(e)}")
+
+        loans = plan_queryset(
+            Loan.objects.filter(member_id=request.user.member_id), LoanSerializer
+        ).order_by('-issue_date')
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(loans, request, view=self)
+        serializer = LoanSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class DashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Library-wide counters for librarians, the member's own account summary for members"""
+        if request.user.role == 'librarian':
+            return Response(LibrarySummarySerializer(library_summary()).data)
+
+        if request.user.role != 'member':
+            return Response({"error": "Not a member"}, status=status.HTTP_403_FORBIDDEN)
+
+        summary = member_summary(request.user.member_id) if request.user.member_id is not None else None
+        if summary is None:
             return Response(
-                {"error": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+                {"error": "User is not properly associated with a member"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(AccountSummarySerializer(summary).data)
+
+
+class MetricsView(APIView):
+    permission_classes = [IsLibrarian]
+
+    def get(self, request):
+        """Per-endpoint latency, query and serializer metrics of this process"""
+        return Response(metrics.snapshot())
+
+
+class PrometheusMetricsView(APIView):
+    permission_classes = [IsLibrarian]
+
+    def get(self, request):
+        """The same metrics in the Prometheus text format"""
+        return HttpResponse(metrics.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
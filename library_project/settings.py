@@ -14,6 +14,8 @@ from datetime import timedelta
 from pathlib import Path
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'library_app.instrumentation.InstrumentationMiddleware',
+    'library_app.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -81,16 +85,62 @@ WSGI_APPLICATION = 'library_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'librarydb',
-        'USER': 'root',
-        'PASSWORD': 'pass123',
-        'HOST': 'localhost',
-        'PORT': '3306',
+# Connection details can be overridden from the environment. For local runs
+# DATABASE_ENGINE=sqlite uses SQLite files instead of MySQL.
+if os.environ.get('DATABASE_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DATABASE_NAME', 'librarydb'),
+            'USER': os.environ.get('DATABASE_USER', 'root'),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', 'pass123'),
+            'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DATABASE_PORT', '3306'),
+        }
     }
+
+# Persistent connections: each worker thread keeps its database connection
+# for DATABASE_CONN_MAX_AGE seconds ("none" for no limit, 0 to connect and
+# disconnect on every request) instead of opening a new one per request.
+# With DATABASE_CONN_HEALTH_CHECKS a reused connection is checked before
+# the first query of a request and replaced if the server dropped it
+# (wait_timeout, restarts), instead of failing that request. Keep
+# DATABASE_CONN_MAX_AGE below MySQL's wait_timeout. Under ASGI each request
+# runs in its own thread, so connections cannot be reused: set 0 there and
+# pool in front of the database (e.g. ProxySQL). Django's built-in pool
+# (OPTIONS['pool']) is only available for PostgreSQL.
+DATABASE_CONN_MAX_AGE = os.environ.get('DATABASE_CONN_MAX_AGE', '60')
+DATABASES['default']['CONN_MAX_AGE'] = (
+    None if DATABASE_CONN_MAX_AGE.lower() == 'none' else int(DATABASE_CONN_MAX_AGE)
+)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = (
+    os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'true').lower() in ('1', 'true', 'yes')
+)
+
+# Optional read replica (see library_app.routers): catalog browsing, other
+# GET requests, dashboards, exports and reports read from it. Set
+# REPLICA_DATABASE_HOST and/or REPLICA_DATABASE_NAME (e.g. a second SQLite
+# file); the other REPLICA_DATABASE_* values default to the primary's.
+# Leave it unset for the test suite: the replica then mirrors the test
+# database over a second connection, which cannot see uncommitted test data.
+REPLICA_SETTINGS = {
+    key: os.environ[f'REPLICA_DATABASE_{key}']
+    for key in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT') if f'REPLICA_DATABASE_{key}' in os.environ
 }
+if 'HOST' in REPLICA_SETTINGS or 'NAME' in REPLICA_SETTINGS:
+    DATABASES['replica'] = {**DATABASES['default'], **REPLICA_SETTINGS, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['library_app.routers.ReplicaRouter']
+LIBRARY_REPLICA_DATABASE = 'replica'
+# Seconds a user's reads stay on the primary after a request of theirs wrote
+LIBRARY_REPLICA_PIN_SECONDS = 10
 
 
 # Password validation
@@ -136,15 +186,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['Link', 'X-Total-Count']
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'library_app.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'library_app.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
 }
 
 # JWT settings
@@ -156,5 +209,60 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Seconds an authenticated user stays in the per-process identity cache
+LIBRARY_IDENTITY_CACHE_TTL = 60
+
+# Caches. The catalog cache holds rendered Book/Author/Category/Event
+# responses and the default cache the read-replica pins; both are
+# invalidated by writes, so every worker process must see the same cache.
+# Set CACHE_URL to a cache they share: file:///var/tmp/library_cache for
+# workers on one host, or a server, redis://host:6379/1 (needs the redis
+# package) or memcached://host:11211 (needs pymemcache). Without one the
+# caches are local to each process: fine for a single worker, but with
+# several (WEB_CONCURRENCY > 1, as set for gunicorn) another worker could
+# serve stale responses and ETags after a write, so catalog responses are
+# then not cached at all.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+SHARED_CACHE_BACKENDS = {
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+if CACHE_URL:
+    scheme, _, address = CACHE_URL.partition('://')
+    if scheme not in SHARED_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f"Unsupported CACHE_URL scheme '{scheme}'; use one of: {', '.join(SHARED_CACHE_BACKENDS)}."
+        )
+
+    def shared_cache(name):
+        if scheme == 'file':
+            # One directory per cache, so clearing one leaves the other alone
+            location = os.path.join(address, name)
+        else:
+            location = CACHE_URL if scheme == 'redis' else address
+        return {'BACKEND': SHARED_CACHE_BACKENDS[scheme], 'LOCATION': location}
+
+    CACHES = {
+        'default': {**shared_cache('default'), 'KEY_PREFIX': 'library'},
+        'catalog': {**shared_cache('catalog'), 'KEY_PREFIX': 'library-catalog', 'TIMEOUT': 300},
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'catalog': {
+            'BACKEND': (
+                'django.core.cache.backends.locmem.LocMemCache' if WEB_CONCURRENCY <= 1
+                else 'django.core.cache.backends.dummy.DummyCache'
+            ),
+            'LOCATION': 'library-catalog',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+    }
+
 # Custom user model
 AUTH_USER_MODEL = 'library_app.User'
\ No newline at end of file